@@ -0,0 +1,128 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""Load test for the experiment driver's RPC server.
+
+Simulates a number of executors, each sending heartbeat METRIC messages over
+its own connection, and reports message throughput and round trip latencies.
+
+Usage: python benchmarks/rpc_server.py [--executors 500] [--messages 20]
+"""
+
+import argparse
+import queue
+import socket
+import threading
+import time
+
+import numpy as np
+
+from maggy.core import rpc
+
+
+class _FakeTrial:
+    def get_early_stop(self):
+        return False
+
+
+class _FakeDriver:
+    """Minimal driver interface used by the OptimizationServer callbacks."""
+
+    _secret = "benchmark"
+    experiment_done = False
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.trial = _FakeTrial()
+
+    def add_message(self, msg):
+        self.queue.put(msg)
+
+    def get_trial(self, _):
+        return self.trial
+
+    def log(self, msg):
+        print(msg)
+
+
+def _executor(server_addr, partition_id, num_messages, latencies, barrier):
+    # plain sockets, the rpc.Client resolves its own address through Spark
+    msg_socket = rpc.MessageSocket()
+    sock = socket.create_connection(server_addr)
+    msg = {
+        "partition_id": partition_id,
+        "type": "METRIC",
+        "secret": _FakeDriver._secret,
+        "trial_id": "trial",
+        "logs": None,
+    }
+    barrier.wait()
+    for step in range(num_messages):
+        msg["data"] = {"value": 0.5, "step": step}
+        start = time.perf_counter()
+        msg_socket.send(sock, msg)
+        msg_socket.receive(sock)
+        latencies.append(time.perf_counter() - start)
+    sock.close()
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run(num_executors, num_messages):
+    # bind to localhost directly, resolving the driver address requires Spark
+    rpc.SERVER_HOST_PORT = ("127.0.0.1", _free_port())
+    driver = _FakeDriver()
+    server = rpc.OptimizationServer(num_executors)
+    server_addr = server.start(driver)
+    latencies = []
+    barrier = threading.Barrier(num_executors + 1)
+    threads = [
+        threading.Thread(
+            target=_executor,
+            args=(server_addr, i, num_messages, latencies, barrier),
+            daemon=True,
+        )
+        for i in range(num_executors)
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - start
+    server.stop()
+    lat = np.array(latencies) * 1000
+    print(
+        "{:8.0f} msg/s, latency p50 {:6.2f} ms, p99 {:6.2f} ms".format(
+            len(latencies) / duration,
+            np.percentile(lat, 50),
+            np.percentile(lat, 99),
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--executors", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=20)
+    args = parser.parse_args()
+    print("{} executors, {} messages each".format(args.executors, args.messages))
+    run(args.executors, args.messages)
@@ -0,0 +1,197 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""Microbenchmark of promotion decisions in successive halving brackets.
+
+Runs a simulated experiment through a Hyperband `SHIteration` and through
+`Asha`, with a fixed number of busy executors, and compares the rung
+leaderboards against scanning and sorting all trials of a rung on every
+decision, like both used to do. Only the time spent in the pruner and optimizer
+calls is measured.
+
+Usage: python benchmarks/rung_leaderboard.py [--n-configs 1000 10000 20000]
+"""
+
+import argparse
+import math
+import random
+import time
+
+from maggy import Searchspace
+from maggy.optimizer import RandomSearch
+from maggy.optimizer.asha import Asha
+from maggy.pruner.hyperband import SHIteration
+from maggy.trial import Trial
+
+
+class LinearSHIteration(SHIteration):
+    """looks up every trial of the rung and sorts them for every promotion decision"""
+
+    def _update_leaderboard(self, rung):
+        for trial in self.configs[rung]:
+            if not self.trial_metric_getter(trial["actual_trial_id"]):
+                return trial["actual_trial_id"]
+        trial_ids = [trial["actual_trial_id"] for trial in self.configs[rung]]
+        for trial_id, metric in self.trial_metric_getter(trial_ids).items():
+            self.leaderboards[rung].add(trial_id, metric)
+        return None
+
+
+class LinearAsha(Asha):
+    """collects and sorts the finalized trials of every rung for every promotion
+    decision"""
+
+    def _update_leaderboards(self):
+        pass
+
+    def _promote(self, rung_k):
+        finished = [x for x in self.rungs[rung_k] if x.status == Trial.FINALIZED]
+        number = len(finished) // self.reduction_factor
+        promoted = self.promoted.setdefault(rung_k, [])
+        if number - len(promoted) <= 0:
+            return None
+        finished.sort(key=lambda x: x.final_metric, reverse=self.direction == "max")
+        for trial in finished[:number]:
+            if trial.trial_id not in promoted:
+                promoted.append(trial.trial_id)
+                return trial
+        return None
+
+
+def make_optimizer(optimizer, searchspace):
+    optimizer.searchspace = searchspace
+    optimizer.trial_store = {}
+    optimizer.final_store = []
+    optimizer.direction = "min"
+    return optimizer
+
+
+def finalize(optimizer, trial, rng):
+    trial.status = Trial.FINALIZED
+    trial.final_metric = rng.random() / trial.params["budget"]
+    optimizer.trial_store.pop(trial.trial_id)
+    optimizer.final_store.append(trial)
+
+
+def run_sh_iteration(iteration_cls, n_configs, eta, n_workers, searchspace):
+    """runs one bracket, trials are created like `BaseAsyncBO.get_suggestion()`
+    does for promoted configs"""
+    rng = random.Random(0)
+    optimizer = make_optimizer(RandomSearch(), searchspace)
+    ns, budgets = [], []
+    while n_configs >= 1:
+        ns.append(n_configs)
+        budgets.append(len(budgets) + 1)
+        n_configs //= eta
+    iteration = iteration_cls(
+        ns, budgets, 0, optimizer.get_metrics_dict, lambda msg: None
+    )
+    iteration.state = SHIteration.RUNNING
+
+    running = []
+    elapsed = 0.0
+    while iteration.state != SHIteration.FINISHED:
+        start = time.perf_counter()
+        next_run = iteration.get_next_run() if len(running) < n_workers else None
+        elapsed += time.perf_counter() - start
+        if next_run is None:
+            if not running:
+                continue
+            finalize(optimizer, running.pop(rng.randrange(len(running))), rng)
+            continue
+        if next_run["trial_id"] is None:
+            params = searchspace.get_random_parameter_values(1)[0]
+        else:
+            params = optimizer.get_hparams_dict(next_run["trial_id"])[
+                next_run["trial_id"]
+            ].copy()
+        params["budget"] = next_run["budget"]
+        trial = Trial(params)
+        optimizer.trial_store[trial.trial_id] = trial
+        start = time.perf_counter()
+        iteration.report_trial(next_run["trial_id"], trial.trial_id)
+        elapsed += time.perf_counter() - start
+        running.append(trial)
+    return len(optimizer.final_store), elapsed
+
+
+def run_asha(asha_cls, n_configs, eta, n_workers, searchspace):
+    rng = random.Random(0)
+    # highest rung that is reached after about `n_configs` trials
+    max_rung = int(math.log(n_configs, eta)) - 1
+    asha = make_optimizer(asha_cls(eta, 1, eta ** max_rung), searchspace)
+    asha.num_trials = n_configs
+    asha.initialize()
+
+    running = []
+    for _ in range(n_workers):
+        trial = asha.get_suggestion()
+        asha.trial_store[trial.trial_id] = trial
+        running.append(trial)
+    elapsed = 0.0
+    while running:
+        finished = running.pop(rng.randrange(len(running)))
+        finalize(asha, finished, rng)
+        start = time.perf_counter()
+        trial = asha.get_suggestion(finished)
+        elapsed += time.perf_counter() - start
+        if trial is None:
+            continue
+        asha.trial_store[trial.trial_id] = trial
+        running.append(trial)
+    return len(asha.final_store), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--n-configs", type=int, nargs="+", default=[1000, 10000, 20000]
+    )
+    parser.add_argument("--eta", type=int, default=3)
+    parser.add_argument("--n-workers", type=int, default=32)
+    args = parser.parse_args()
+
+    searchspace = Searchspace(
+        lr=("DOUBLE", [0.0001, 0.1]), units=("INTEGER", [16, 512])
+    )
+    runs = [
+        ("SHIteration", run_sh_iteration, LinearSHIteration, SHIteration),
+        ("Asha", run_asha, LinearAsha, Asha),
+    ]
+    print(
+        "{:>12} {:>10} {:>9} {:>12} {:>17} {:>9}".format(
+            "", "n_configs", "n_trials", "linear [s]", "leaderboard [s]", "speedup"
+        )
+    )
+    for name, run, linear_cls, leaderboard_cls in runs:
+        for n_configs in args.n_configs:
+            common = (n_configs, args.eta, args.n_workers, searchspace)
+            n_trials, linear = run(linear_cls, *common)
+            _, leaderboard = run(leaderboard_cls, *common)
+            print(
+                "{:>12} {:>10} {:>9} {:>12.2f} {:>17.2f} {:>8.1f}x".format(
+                    name,
+                    n_configs,
+                    n_trials,
+                    linear,
+                    leaderboard,
+                    linear / leaderboard,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
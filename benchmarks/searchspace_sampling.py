@@ -0,0 +1,143 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""Microbenchmark of random config sampling.
+
+Times the GP candidates drawn with `Searchspace.sample_batch` against sampling
+every config as a dict with the `random` module and transforming the dicts,
+like `GP.sampling_routine` used to do. Then compares how well `random`,
+`halton` and `lhs` designs cover the searchspace: the mean distance of
+uniform test points to their nearest config, lower is better.
+
+Usage: python benchmarks/searchspace_sampling.py [--n-points 1000 10000]
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from maggy import Searchspace
+
+
+def make_searchspace():
+    return Searchspace(
+        lr=("DOUBLE", [0.0001, 0.1]),
+        dropout=("DOUBLE", [0.0, 0.5]),
+        layers=("INTEGER", [1, 8]),
+        units=("INTEGER", [16, 512]),
+        optimizer=("CATEGORICAL", ["adam", "sgd", "rmsprop"]),
+    )
+
+
+def dict_sampling(searchspace, n_points):
+    configs = []
+    for _ in range(n_points):
+        params = {}
+        for name, hparam_type in searchspace.names().items():
+            feasible_region = searchspace.get(name)
+            if hparam_type == Searchspace.DOUBLE:
+                params[name] = random.uniform(*feasible_region)
+            elif hparam_type == Searchspace.INTEGER:
+                params[name] = random.randint(*feasible_region)
+            else:
+                params[name] = random.choice(feasible_region)
+        configs.append(params)
+    return searchspace.transform_batch(
+        np.array([searchspace.dict_to_list(params) for params in configs]),
+        normalize_categorical=True,
+    )
+
+
+def dispersion(unit, test_points):
+    distances = np.sqrt(((test_points[:, None, :] - unit[None, :, :]) ** 2).sum(-1))
+    return distances.min(axis=1).mean()
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n-points", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--n-configs", type=int, nargs="+", default=[8, 16, 32, 64])
+    parser.add_argument("--n-dims", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    searchspace = make_searchspace()
+    # builds the column layout of the searchspace
+    searchspace.sample_batch(1)
+    print(
+        "{:>10} {:>12} {:>12} {:>9}".format(
+            "n_points", "dicts [ms]", "batch [ms]", "speedup"
+        )
+    )
+    for n_points in args.n_points:
+        dicts = timed(
+            lambda n_points=n_points: dict_sampling(searchspace, n_points),
+            args.repeat,
+        )
+        batch = timed(
+            lambda n_points=n_points: searchspace.sample_batch(
+                n_points, normalize_categorical=True
+            ),
+            args.repeat,
+        )
+        print(
+            "{:>10} {:>12.2f} {:>12.2f} {:>8.1f}x".format(
+                n_points, dicts * 1e3, batch * 1e3, dicts / batch
+            )
+        )
+
+    rng = np.random.default_rng(0)
+    test_points = rng.random((2000, args.n_dims))
+    print()
+    print(
+        "mean distance to the nearest config, {} dimensions, {} designs each".format(
+            args.n_dims, args.repeat
+        )
+    )
+    print(
+        "{:>10}".format("n_configs")
+        + "".join("{:>10}".format(method) for method in Searchspace.SAMPLING_METHODS)
+    )
+    for n_configs in args.n_configs:
+        row = "{:>10}".format(n_configs)
+        for method in Searchspace.SAMPLING_METHODS:
+            row += "{:>10.4f}".format(
+                np.mean(
+                    [
+                        dispersion(
+                            Searchspace._sample_unit(
+                                n_configs, args.n_dims, rng, method
+                            ),
+                            test_points,
+                        )
+                        for _ in range(args.repeat)
+                    ]
+                )
+            )
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
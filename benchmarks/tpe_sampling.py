@@ -0,0 +1,127 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""Microbenchmark of TPE suggestion time.
+
+Compares the vectorized `TPE.sampling_routine` against drawing and scoring
+every candidate on its own with `KDEMultivariate.pdf`, like TPE used to do.
+
+Usage: python benchmarks/tpe_sampling.py [--n-samples 24 1000 10000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import scipy.stats as sps
+import statsmodels.api as sm
+
+from maggy import Searchspace
+from maggy.optimizer.bayes.tpe import TPE
+
+
+def make_tpe(n_observations):
+    searchspace = Searchspace(
+        lr=("DOUBLE", [0.0001, 0.1]),
+        dropout=("DOUBLE", [0.0, 0.5]),
+        layers=("INTEGER", [1, 8]),
+        units=("INTEGER", [16, 512]),
+        optimizer=("CATEGORICAL", ["adam", "sgd", "rmsprop"]),
+    )
+    tpe = TPE()
+    tpe.searchspace = searchspace
+    var_type = tpe._get_statsmodel_vartype()
+
+    rng = np.random.RandomState(0)
+    models = {}
+    for name in ["good", "bad"]:
+        data = np.column_stack(
+            [
+                rng.rand(n_observations, 4),
+                rng.randint(0, 3, size=n_observations),
+            ]
+        )
+        models[name] = sm.nonparametric.KDEMultivariate(
+            data=data, var_type=var_type, bw=tpe.bw_estimation
+        )
+    tpe.models[0] = models
+    return tpe
+
+
+def sequential_sampling(tpe, n_samples):
+    kde_good = tpe.models[0]["good"]
+    kde_bad = tpe.models[0]["bad"]
+    best_improvement = -np.inf
+    best_sample = None
+    for _ in range(n_samples):
+        obs = kde_good.data[np.random.randint(0, len(kde_good.data))]
+        sample_vector = []
+        for mean, bw, hparam_spec in zip(obs, kde_good.bw, tpe.searchspace.items()):
+            if hparam_spec["type"] == tpe.searchspace.CATEGORICAL:
+                if np.random.rand() < (1 - bw):
+                    sample_vector.append(int(mean))
+                else:
+                    sample_vector.append(np.random.randint(len(hparam_spec["values"])))
+            else:
+                bw = max(bw, tpe.min_bw) * tpe.bw_factor
+                sample_vector.append(
+                    sps.truncnorm.rvs(-mean / bw, (1 - mean) / bw, loc=mean, scale=bw)
+                )
+        ei_val = max(1e-32, kde_good.pdf(sample_vector)) / max(
+            kde_bad.pdf(sample_vector), 1e-32
+        )
+        if ei_val > best_improvement:
+            best_improvement = ei_val
+            best_sample = sample_vector
+    return best_sample
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n-samples", type=int, nargs="+", default=[24, 1000, 10000])
+    parser.add_argument("--n-observations", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tpe = make_tpe(args.n_observations)
+    print(
+        "{:>10} {:>16} {:>16} {:>9}".format(
+            "n_samples", "sequential [ms]", "vectorized [ms]", "speedup"
+        )
+    )
+    for n_samples in args.n_samples:
+        tpe.n_samples = n_samples
+        sequential = timed(
+            lambda n_samples=n_samples: sequential_sampling(tpe, n_samples),
+            args.repeat,
+        )
+        vectorized = timed(lambda: tpe.sampling_routine(0), args.repeat)
+        print(
+            "{:>10} {:>16.2f} {:>16.2f} {:>8.1f}x".format(
+                n_samples, sequential * 1e3, vectorized * 1e3, sequential / vectorized
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
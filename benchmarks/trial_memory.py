@@ -0,0 +1,103 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""Memory benchmark of the metric curves of many trials.
+
+Measures the memory of trials with full metric curves, like the driver keeps
+them in its final store. The slotted `Trial` with typed arrays is compared
+against a trial that keeps the curve in lists and a dict of boxed floats,
+like `Trial` used to do.
+
+Usage: python benchmarks/trial_memory.py [--n-trials 100000] [--n-steps 100]
+"""
+
+import argparse
+import gc
+import threading
+import tracemalloc
+
+from maggy.trial import Trial
+
+
+class ListTrial(object):
+    """Trial with the previous storage: lists and a dict per curve."""
+
+    def __init__(self, params):
+        self.trial_type = "optimization"
+        self.trial_id = Trial._generate_id(params)
+        self.params = params
+        self.status = Trial.PENDING
+        self.early_stop = False
+        self.final_metric = None
+        self.metric_history = []
+        self.step_history = []
+        self.metric_dict = {}
+        self.start = None
+        self.duration = None
+        self.lock = threading.RLock()
+        self.info_dict = {}
+
+    def append_metric(self, metric_data):
+        for step, value in zip(metric_data["steps"], metric_data["values"]):
+            if step not in self.metric_dict:
+                self.metric_dict[step] = value
+                self.metric_history.append(value)
+                self.step_history.append(step)
+
+
+def measure(trial_cls, n_trials, n_steps):
+    gc.collect()
+    tracemalloc.start()
+    trials = []
+    for i in range(n_trials):
+        trial = trial_cls({"lr": i / n_trials, "layers": i % 8})
+        # metric values as they arrive in heartbeats, one batch per 10 steps
+        for first in range(0, n_steps, 10):
+            steps = range(first, min(first + 10, n_steps))
+            trial.append_metric(
+                {
+                    "steps": list(steps),
+                    "values": [1.0 / (step + i + 1) for step in steps],
+                }
+            )
+        trials.append(trial)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n-trials", type=int, default=100000)
+    parser.add_argument("--n-steps", type=int, default=100)
+    args = parser.parse_args()
+
+    print("{} trials with {} steps each".format(args.n_trials, args.n_steps))
+    print("{:>10} {:>12} {:>16}".format("trial", "memory [MB]", "bytes per trial"))
+    results = {}
+    for name, trial_cls in [("lists", ListTrial), ("arrays", Trial)]:
+        memory = measure(trial_cls, args.n_trials, args.n_steps)
+        results[name] = memory
+        print(
+            "{:>10} {:>12.1f} {:>16.0f}".format(
+                name, memory / 2 ** 20, memory / args.n_trials
+            )
+        )
+    print("reduction: {:.1f}x".format(results["lists"] / results["arrays"]))
+
+
+if __name__ == "__main__":
+    main()
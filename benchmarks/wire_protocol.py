@@ -0,0 +1,137 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""Microbenchmark of the binary wire protocol against cloudpickle.
+
+Compares encode/decode time and bytes on the wire of typical RPC messages.
+
+Usage: python benchmarks/wire_protocol.py [--repeat 20000]
+"""
+
+import argparse
+import timeit
+from array import array
+
+from pyspark import cloudpickle
+
+from maggy.core import wire
+
+MESSAGES = {
+    "METRIC": {
+        "partition_id": 12,
+        "type": "METRIC",
+        "secret": "4f3c2a1b0e9d8c7b",
+        "trial_id": "3f2a9c1d7e6b5a40",
+        "logs": None,
+        "data": {
+            "value": 0.8734,
+            "step": 120,
+            "steps": array("d", [120.0]),
+            "values": array("d", [0.8734]),
+            "logs": None,
+        },
+    },
+    "METRIC+logs": {
+        "partition_id": 12,
+        "type": "METRIC",
+        "secret": "4f3c2a1b0e9d8c7b",
+        "trial_id": "3f2a9c1d7e6b5a40",
+        "logs": "epoch 12: loss 0.3123, accuracy 0.8734\n" * 5,
+        "data": {
+            "value": 0.8734,
+            "step": 120,
+            "steps": array("d", [120.0]),
+            "values": array("d", [0.8734]),
+            "logs": None,
+        },
+    },
+    "METRIC batch": {
+        "partition_id": 12,
+        "type": "METRIC",
+        "secret": "4f3c2a1b0e9d8c7b",
+        "trial_id": "3f2a9c1d7e6b5a40",
+        "logs": None,
+        "data": {
+            "value": 0.8989,
+            "step": 375,
+            "steps": array("d", range(120, 376)),
+            "values": array("d", [0.8734 + i / 1e4 for i in range(256)]),
+            "logs": None,
+        },
+    },
+    "FINAL": {
+        "partition_id": 12,
+        "type": "FINAL",
+        "secret": "4f3c2a1b0e9d8c7b",
+        "trial_id": "3f2a9c1d7e6b5a40",
+        "logs": None,
+        "data": 0.8989,
+    },
+    "GET": {
+        "partition_id": 12,
+        "type": "GET",
+        "secret": "4f3c2a1b0e9d8c7b",
+        "data": None,
+    },
+    "TRIAL": {
+        "type": "TRIAL",
+        "trial_id": "3f2a9c1d7e6b5a40",
+        "data": {"learning_rate": 0.0031, "layers": 4, "optimizer": "adam"},
+    },
+    "OK": {"type": "OK"},
+    "LOG": {
+        "type": "OK",
+        "ex_logs": None,
+        "num_trials": 100,
+        "to_date": 37,
+        "stopped": 4,
+        "metric": 0.9121,
+    },
+}
+
+
+def run(repeat):
+    print(
+        "{:<12} {:>6} {:>6} {:>10} {:>10} {:>10} {:>10}".format(
+            "message", "pickle", "wire", "pkl enc", "wire enc", "pkl dec", "wire dec"
+        )
+    )
+    print(
+        "{:<12} {:>6} {:>6} {:>10} {:>10} {:>10} {:>10}".format(
+            "", "bytes", "bytes", "us", "us", "us", "us"
+        )
+    )
+    for name, msg in MESSAGES.items():
+        pickled = cloudpickle.dumps(msg)
+        encoded = wire.encode(msg)
+        assert wire.decode(encoded) == msg
+        timings = [
+            timeit.timeit(lambda msg=msg: cloudpickle.dumps(msg), number=repeat),
+            timeit.timeit(lambda msg=msg: wire.encode(msg), number=repeat),
+            timeit.timeit(lambda data=pickled: cloudpickle.loads(data), number=repeat),
+            timeit.timeit(lambda data=encoded: wire.decode(data), number=repeat),
+        ]
+        print(
+            "{:<12} {:>6} {:>6} {:>10.2f} {:>10.2f} {:>10.2f} {:>10.2f}".format(
+                name, len(pickled), len(encoded), *[1e6 * t / repeat for t in timings]
+            )
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20000)
+    run(parser.parse_args().repeat)
@@ -16,6 +16,7 @@
 
 import os
 import shutil
+import socket
 import warnings
 
 from maggy import util
@@ -143,7 +144,7 @@ class BaseEnv:
         else:
             server_sock.bind(server_host_port)
 
-        server_sock.listen(10)
+        server_sock.listen(socket.SOMAXCONN)
 
         return server_sock, server_host_port
 
@@ -16,6 +16,7 @@
 
 import json
 import os
+import socket
 
 import hsfs
 from hops import constants as hopsconstants
@@ -173,7 +174,7 @@ class HopsworksEnv(BaseEnv):
         else:
             server_sock.bind(server_host_port)
 
-        server_sock.listen(10)
+        server_sock.listen(socket.SOMAXCONN)
 
         return server_sock, server_host_port
 
@@ -0,0 +1,140 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+
+class AsyncWriter(object):
+    """Write-behind writer for the `dump()` calls of an environment.
+
+    Files are queued by `dump()` and written by a background thread, so the
+    caller does not wait for the file system, e.g. for an HDFS round trip on
+    Hopsworks. Writes to a path that is still queued are coalesced, only the
+    latest data is written. The queue is bounded by `max_pending` paths,
+    `dump()` blocks while it is full. The background thread takes all queued
+    files at once and writes them as one batch.
+
+    Failed writes are passed to `error_callback` and kept until the next call
+    of `flush()`, which returns them.
+    """
+
+    def __init__(
+        self,
+        env,
+        max_pending: int = 1000,
+        error_callback: Optional[Callable[[str, Exception], None]] = None,
+    ):
+        """
+        :param env: Environment that writes the files, e.g. `BaseEnv`.
+        :param max_pending: Maximum number of queued paths.
+        :param error_callback: Called with the path and the exception of every
+            failed write.
+        """
+        if max_pending < 1:
+            raise ValueError(
+                "Expected max_pending to be at least 1, got {}".format(max_pending)
+            )
+        self.env = env
+        self.max_pending = max_pending
+        self.error_callback = error_callback
+        self._pending = OrderedDict()
+        # number of files taken from `_pending` that are currently written
+        self._in_progress = 0
+        self._failures = []
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def dump(self, data, path: str) -> None:
+        """Queues `data` to be written to `path`.
+
+        :param data: Data to write, as accepted by `env.dump()`.
+        :param path: Path of the file.
+
+        :raises RuntimeError: If the writer was closed.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Cannot write {}, writer is closed".format(path))
+            if path in self._pending:
+                # coalesce with the queued write, keep the position in the queue
+                self._pending[path] = data
+                return
+            while len(self._pending) >= self.max_pending:
+                self._cond.wait()
+            self._pending[path] = data
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> List[Tuple[str, Exception]]:
+        """Waits until all queued files are written.
+
+        :param timeout: Maximum number of seconds to wait, wait until done if
+            None.
+
+        :returns: Path and exception of the writes that failed since the last
+            flush.
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: not self._pending and not self._in_progress, timeout
+            )
+            failures, self._failures = self._failures, []
+        return failures
+
+    def close(self, timeout: Optional[float] = None) -> List[Tuple[str, Exception]]:
+        """Writes all queued files and stops the background thread.
+
+        :param timeout: Maximum number of seconds to wait for queued files.
+
+        :returns: Path and exception of the writes that failed since the last
+            flush.
+        """
+        failures = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        return failures
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                batch = list(self._pending.items())
+                self._pending.clear()
+                self._in_progress = len(batch)
+                # there is space in the queue again
+                self._cond.notify_all()
+
+            failures = []
+            for path, data in batch:
+                try:
+                    self.env.dump(data, path)
+                except Exception as exc:  # pylint: disable=broad-except
+                    failures.append((path, exc))
+                    if self.error_callback is not None:
+                        self.error_callback(path, exc)
+
+            with self._cond:
+                self._failures.extend(failures)
+                self._in_progress = 0
+                self._cond.notify_all()
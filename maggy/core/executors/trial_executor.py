@@ -21,6 +21,7 @@ Module to produce the wrapper function to be executed by the executors.
 import builtins as __builtin__
 import inspect
 import json
+import multiprocessing
 import traceback
 from typing import Callable, Any
 
@@ -40,6 +41,7 @@ def trial_executor_fn(
     secret: str,
     optimization_key: str,
     log_dir: str,
+    trials_per_executor: int = 1,
 ) -> Callable:
     """
     Wraps the user supplied training function in order to be passed to the Spark Executors.
@@ -53,6 +55,8 @@ def trial_executor_fn(
     :param secret: Secret string to authenticate messages.
     :param optimization key: Key of the preformance metric that should be optimized.
     :param log_dir: Location of the logger file directory on the file system.
+    :param trials_per_executor: Number of trials run at once on each executor.
+        Every trial slot runs in a forked worker process.
 
     :returns: Patched function to execute on the Spark executors.
     """
@@ -62,6 +66,8 @@ def trial_executor_fn(
 
         :param _: Necessary catch for the iterator given by Spark to the
         function upon foreach calls. Can safely be disregarded.
+
+        :raises RuntimeError: If a trial slot of the executor failed.
         """
         env = EnvSing.get_instance()
 
@@ -70,22 +76,54 @@ def trial_executor_fn(
         # get task context information to determine executor identifier
         partition_id, task_attempt = util.get_partition_attempt_id()
 
-        client = rpc.Client(
-            server_addr, partition_id, task_attempt, hb_interval, secret
-        )
+        if trials_per_executor == 1:
+            _run_slot(partition_id, partition_id, task_attempt)
+            return
+
+        # every slot has its own client, reporter and heartbeat
+        context = multiprocessing.get_context("fork")
+        workers = [
+            context.Process(
+                target=_run_slot,
+                args=(
+                    partition_id,
+                    rpc.slot_id(partition_id, slot, trials_per_executor),
+                    task_attempt,
+                ),
+            )
+            for slot in range(trials_per_executor)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        num_failed = sum(1 for worker in workers if worker.exitcode != 0)
+        if num_failed > 0:
+            raise RuntimeError(
+                "{} of {} trial slots of executor {} failed, see the executor "
+                "logs.".format(num_failed, trials_per_executor, partition_id)
+            )
+
+    def _run_slot(partition_id: int, slot_id: int, task_attempt: int) -> None:
+        """Registers a trial slot with the experiment driver and runs the
+        trials assigned to it.
+
+        :param partition_id: Partition ID of the Spark executor.
+        :param slot_id: Worker ID of the slot, the partition ID if there is
+            only one slot per executor.
+        :param task_attempt: Attempt number of the Spark task.
+        """
+        env = EnvSing.get_instance()
+
+        client = rpc.Client(server_addr, slot_id, task_attempt, hb_interval, secret)
         log_file = (
-            log_dir
-            + "/executor_"
-            + str(partition_id)
-            + "_"
-            + str(task_attempt)
-            + ".log"
+            log_dir + "/executor_" + str(slot_id) + "_" + str(task_attempt) + ".log"
         )
 
         # save the builtin print
         original_print = __builtin__.print
 
-        reporter = Reporter(log_file, partition_id, task_attempt, original_print)
+        reporter = Reporter(log_file, slot_id, task_attempt, original_print)
 
         def maggy_print(*args, **kwargs):
             """Maggy custom print() function."""
@@ -101,7 +139,8 @@ def trial_executor_fn(
             host_port = client_addr[0] + ":" + str(client_addr[1])
 
             exec_spec = {}
-            exec_spec["partition_id"] = partition_id
+            exec_spec["partition_id"] = slot_id
+            exec_spec["executor_id"] = partition_id
             exec_spec["task_attempt"] = task_attempt
             exec_spec["host_port"] = host_port
             exec_spec["trial_id"] = None
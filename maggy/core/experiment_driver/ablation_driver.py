@@ -147,8 +147,25 @@ class AblationDriver(OptimizationDriver):
         :param trial: Trial to fetch from the controller (default ``None``).
             None autofetches the next available trial.
         """
+        if self._resumed_trials:
+            return self._resumed_trials.popleft()
         return self.controller.get_trial(trial)
 
+    def controller_get_batch(self, n: int) -> list:
+        """Gets trials for ``n`` executors that are waiting at the same time.
+
+        :param n: Number of waiting executors.
+
+        :returns: Up to ``n`` trials, possibly followed by `None` if there are
+            no trials remaining in the experiment.
+        """
+        suggestions = []
+        while len(suggestions) < n:
+            suggestions.append(self.controller_get_next())
+            if not isinstance(suggestions[-1], Trial):
+                break
+        return suggestions
+
     def prep_results(self, duration_str: str) -> str:
         """Writes and returns the results of the experiment into one string and
         returns it.
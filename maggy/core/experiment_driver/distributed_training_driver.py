@@ -120,10 +120,7 @@ class DistributedTrainingDriver(Driver):
         :param msg: Message from the executors. Contains logs to be written to
             jupyter and the DFS.
         """
-        logs = msg.get("logs", None)
-        if logs is not None:
-            with self.log_lock:
-                self.executor_logs = self.executor_logs + logs
+        self.add_executor_logs(msg)
 
     def _final_msg_callback(self, msg: dict) -> None:
         """Appends the test result from the workers to the result list.
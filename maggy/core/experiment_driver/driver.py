@@ -14,6 +14,8 @@
 #   limitations under the License.
 #
 
+import heapq
+import itertools
 import time
 import os
 import queue
@@ -26,13 +28,85 @@ from typing import Callable, Tuple
 
 from maggy import util
 from maggy.experiment_config import LagomConfig
+from maggy.core import logbuffer
 from maggy.core.rpc import Server
 from maggy.core.environment.singleton import EnvSing
-
+from maggy.core.environment.writer import AsyncWriter
 
 DRIVER_SECRET = None
 
 
+class DispatchStats(object):
+    """Bookkeeping for the message digestion thread.
+
+    Records how long messages wait in the queue before their callback is
+    executed (dispatch latency), how long the callbacks run and how much CPU
+    time the digestion thread and the driver process consume.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.num_dispatched = 0
+        self.num_deferred = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.total_handling = 0.0
+        self.digest_cpu_time = 0.0
+        self.num_assigned = 0
+        self.total_assign_latency = 0.0
+        self.max_assign_latency = 0.0
+        self.start_wall = time.time()
+        self.start_cpu = time.process_time()
+
+    def record(self, latency: float, handling: float) -> None:
+        """Records a dispatched message.
+
+        :param latency: Seconds the message waited before being dispatched.
+        :param handling: Seconds the callback took to process the message.
+        """
+        with self.lock:
+            self.num_dispatched += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            self.total_handling += handling
+
+    def record_assignment(self, latency: float) -> None:
+        """Records the delay between assigning a trial and its start on the
+        executor.
+
+        :param latency: Seconds between assignment and start.
+        """
+        with self.lock:
+            self.num_assigned += 1
+            self.total_assign_latency += latency
+            self.max_assign_latency = max(self.max_assign_latency, latency)
+
+    def to_dict(self) -> dict:
+        """Returns a summary of the dispatcher statistics.
+
+        :returns: Dict with message counts, latencies in milliseconds, the
+            delay from trial assignment to trial start and CPU utilization of
+            the driver process and the digestion thread.
+        """
+        with self.lock:
+            wall = max(time.time() - self.start_wall, 1e-9)
+            num = max(self.num_dispatched, 1)
+            num_assigned = max(self.num_assigned, 1)
+            return {
+                "dispatched": self.num_dispatched,
+                "deferred": self.num_deferred,
+                "avg_latency_ms": 1000 * self.total_latency / num,
+                "max_latency_ms": 1000 * self.max_latency,
+                "avg_handling_ms": 1000 * self.total_handling / num,
+                "avg_assign_to_start_ms": 1000
+                * self.total_assign_latency
+                / num_assigned,
+                "max_assign_to_start_ms": 1000 * self.max_assign_latency,
+                "digest_cpu_util": self.digest_cpu_time / wall,
+                "driver_cpu_util": (time.process_time() - self.start_cpu) / wall,
+            }
+
+
 class Driver(ABC):
     """Abstract base driver class for the experiment drivers.
 
@@ -45,6 +119,13 @@ class Driver(ABC):
     """
 
     SECRET_BYTES = 8
+    # Upper bound for blocking on the message queue, so the digestion thread
+    # notices when the driver is stopped.
+    MAX_QUEUE_WAIT = 1.0
+    # Seconds stop() waits for the digestion thread to finish its callback.
+    STOP_TIMEOUT = 5.0
+    # Number of log lines kept per executor until they are sent to sparkmagic.
+    EXECUTOR_LOG_LINES = 1000
 
     def __init__(self, config: LagomConfig, app_id: int, run_id: int):
         """Sets up the RPC server, message queue and logs.
@@ -71,10 +152,16 @@ class Driver(ABC):
         self._secret = DRIVER_SECRET
         # Logging related initialization
         self._message_q = queue.Queue()
+        self._deferred_msgs = []
+        self._deferred_lock = threading.Lock()
+        self._deferred_count = itertools.count()
+        self._digest_thread = None
+        self.dispatch_stats = DispatchStats()
         self.message_callbacks = {}
         self._register_msg_callbacks()
         self.worker_done = False
-        self.executor_logs = ""
+        # partition_id -> LogBuffer of the logs not yet sent to sparkmagic
+        self.executor_logs = {}
         self.log_lock = threading.RLock()
         self.log_dir = EnvSing.get_instance().get_logdir(app_id, run_id)
         log_file = self.log_dir + "/maggy.log"
@@ -82,6 +169,11 @@ class Driver(ABC):
         if not EnvSing.get_instance().exists(log_file):
             EnvSing.get_instance().dump("", log_file)
         self.log_file_handle = EnvSing.get_instance().open_file(log_file, flags="w")
+        # Experiment files are written in the background, so message callbacks
+        # do not wait for the file system.
+        self.writer = AsyncWriter(
+            EnvSing.get_instance(), error_callback=self._write_error_callback
+        )
         self.exception = None
         self.result = None
 
@@ -184,29 +276,60 @@ class Driver(ABC):
     def _start_worker(self) -> None:
         """Starts the message digestion worker thread.
 
-        The worker tries to pop messages from the queue and matches their type
-        keyword with any registered callbacks from the message_callback
+        The worker blocks on the queue until a message arrives and matches its
+        type keyword with any registered callbacks from the message_callback
         dictionary. The callback then gets called with the popped message.
+        Deferred messages are kept in a heap ordered by their due time and are
+        moved to the queue once they are due, the worker only wakes up when
+        either a message arrives or the next deferred message becomes due.
         """
 
         def _digest_queue(self):
+            cpu_start = time.thread_time()
             try:
                 while not self.worker_done:
+                    timeout = self._release_deferred_messages()
                     try:
-                        msg = self._message_q.get_nowait()
+                        item = self._message_q.get(timeout=timeout)
                     except queue.Empty:
-                        msg = {"type": None}
-                    if msg["type"] in self.message_callbacks.keys():
-                        self.message_callbacks[msg["type"]](
-                            msg
-                        )  # Execute registered callbacks.
+                        continue
+                    if item is None:  # Wake-up token, re-evaluate deadlines.
+                        continue
+                    enqueued, msg = item
+                    callback = self.message_callbacks.get(msg["type"], None)
+                    if callback is not None:
+                        start = time.time()
+                        callback(msg)  # Execute registered callbacks.
+                        self.dispatch_stats.record(
+                            start - enqueued, time.time() - start
+                        )
             except Exception as exc:  # pylint: disable=broad-except
                 self.log(exc)
                 self.exception = exc
                 self.server.stop()
                 raise
+            finally:
+                self.dispatch_stats.digest_cpu_time = time.thread_time() - cpu_start
+
+        self._digest_thread = threading.Thread(
+            target=_digest_queue, args=(self,), daemon=True
+        )
+        self._digest_thread.start()
 
-        threading.Thread(target=_digest_queue, args=(self,), daemon=True).start()
+    def _release_deferred_messages(self) -> float:
+        """Moves all due deferred messages to the message queue.
+
+        :returns: Seconds until the next deferred message is due, capped at
+            `MAX_QUEUE_WAIT`.
+        """
+        now = time.time()
+        with self._deferred_lock:
+            while self._deferred_msgs and self._deferred_msgs[0][0] <= now:
+                due, _, msg, _ = heapq.heappop(self._deferred_msgs)
+                self._message_q.put((due, msg))
+            if self._deferred_msgs:
+                return min(self._deferred_msgs[0][0] - now, self.MAX_QUEUE_WAIT)
+        return self.MAX_QUEUE_WAIT
 
     @abstractmethod
     def _register_msg_callbacks(self) -> None:
@@ -221,7 +344,45 @@ class Driver(ABC):
 
         :param msg: Message to put into the queue.
         """
-        self._message_q.put(msg)
+        self._message_q.put((time.time(), msg))
+
+    def add_deferred_message(
+        self, msg: dict, delay: float, wakeup: bool = True
+    ) -> None:
+        """Adds a message to the message queue once `delay` seconds passed.
+
+        Deferred messages are released earlier if `wakeup_deferred()` is
+        called, e.g. because the controller might be able to schedule again.
+
+        :param msg: Message to put into the queue.
+        :param delay: Delay in seconds.
+        :param wakeup: If False, the message is only released when it is due,
+            e.g. for periodic timers (default ``True``).
+        """
+        with self._deferred_lock:
+            heapq.heappush(
+                self._deferred_msgs,
+                (time.time() + delay, next(self._deferred_count), msg, wakeup),
+            )
+        with self.dispatch_stats.lock:
+            self.dispatch_stats.num_deferred += 1
+        if threading.current_thread() is not self._digest_thread:
+            # Make sure the worker recomputes its timeout.
+            self._message_q.put(None)
+
+    def wakeup_deferred(self) -> None:
+        """Releases the deferred messages that were added with `wakeup` to the
+        message queue immediately."""
+        now = time.time()
+        with self._deferred_lock:
+            pending = []
+            for entry in sorted(self._deferred_msgs):
+                if entry[3]:
+                    self._message_q.put((now, entry[2]))
+                else:
+                    pending.append(entry)
+            # sorted lists are valid heaps
+            self._deferred_msgs[:] = pending
 
     def get_logs(self) -> Tuple[dict, str]:
         """Returns the current experiment status and executor logs to send them
@@ -231,18 +392,53 @@ class Driver(ABC):
         executor log strings.
         """
         with self.log_lock:
-            temp = self.executor_logs
             # clear the executor logs since they are being sent
-            self.executor_logs = ""
-            return self.result, temp
+            logs = "".join(
+                self.executor_logs[partition_id].drain()
+                for partition_id in sorted(self.executor_logs)
+            )
+            return self.result, logs
+
+    def add_executor_logs(self, msg: dict) -> None:
+        """Adds the logs of an executor message to the bounded log buffer of
+        the executor.
+
+        :param msg: Message from an executor, possibly containing logs.
+        """
+        logs = msg.get("logs", None)
+        if logs is None:
+            return
+        logs = logbuffer.decompress(logs)
+        with self.log_lock:
+            buffer = self.executor_logs.get(msg["partition_id"])
+            if buffer is None:
+                buffer = logbuffer.LogBuffer(self.EXECUTOR_LOG_LINES)
+                self.executor_logs[msg["partition_id"]] = buffer
+            buffer.extend(logs)
 
     def stop(self) -> None:
-        """Stop the Driver's worker thread and server."""
+        """Stop the Driver's worker thread and server and write all queued
+        experiment files."""
         self.worker_done = True
+        self._message_q.put(None)
         self.server.stop()
+        if self._digest_thread is not None:
+            # the digestion thread records its CPU time when it exits
+            self._digest_thread.join(self.STOP_TIMEOUT)
+        # callbacks still running could queue more writes
+        self.writer.close()
+        self.log("Message dispatcher stats: {}".format(self.dispatch_stats.to_dict()))
         self.log_file_handle.flush()
         self.log_file_handle.close()
 
+    def _write_error_callback(self, path: str, exc: Exception) -> None:
+        """Logs a failed write of the background writer.
+
+        :param path: Path of the file that could not be written.
+        :param exc: The exception raised by the write.
+        """
+        self.log("Failed to write {}: {!r}".format(path, exc))
+
     def log(self, log_msg: str) -> None:
         """Logs a string to the maggy driver log file.
 
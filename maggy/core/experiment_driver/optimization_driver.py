@@ -14,10 +14,12 @@
 #   limitations under the License.
 #
 
+import math
 import os
 import time
 import json
-from typing import Callable, Optional, Union
+from collections import deque
+from typing import Callable, List, Optional, Union
 
 from maggy import util, tensorboard
 from maggy.searchspace import Searchspace
@@ -28,6 +30,9 @@ from maggy.trial import Trial
 from maggy.core.experiment_driver.driver import Driver
 from maggy.core.rpc import OptimizationServer
 from maggy.core.environment.singleton import EnvSing
+from maggy.core.journal import Journal
+from maggy.core.result_cache import ResultCache
+from maggy.core.suggestion_service import SuggestionService
 from maggy.core.executors.trial_executor import trial_executor_fn
 from maggy.experiment_config import AblationConfig, OptimizationConfig
 
@@ -49,6 +54,13 @@ class OptimizationDriver(Driver):
         "faulty_none": None,
         "gridsearch": GridSearch,
     }
+    # Idle executors are retried as soon as a trial finalizes. The interval is
+    # only a safety net for controllers that become ready on their own.
+    IDLE_RETRY_INTERVAL = 1.0
+    # Executors which did not send a heartbeat for this many seconds, or ten
+    # heartbeat intervals if longer, are considered departed, e.g. because
+    # dynamic allocation released them.
+    EXECUTOR_TIMEOUT = 60.0
 
     def __init__(self, config: OptimizationConfig, app_id: int, run_id: int):
         """Performs argument checks and initializes the optimization
@@ -68,14 +80,30 @@ class OptimizationDriver(Driver):
         self.maggy_log = ""
         self.job_end = None
         self.duration = None
+        # Journal of the trials, to resume the experiment if the driver fails.
+        self.journal = Journal(EnvSing.get_instance(), self.log_dir)
+        # Unfinished trials of a resumed experiment or of departed executors,
+        # scheduled before new ones.
+        self._resumed_trials = deque()
+        # Results of trials evaluated in previous experiments, opt-in.
+        self.result_cache = None
+        # Executors waiting for a trial, served together by the IDLE callback.
+        self._idle_executors = {}
+        self._idle_scheduled = False
+        # Worker process running the controller, opt-in.
+        self.suggestion_service = None
         # Interrupt init for AblationDriver.
         if isinstance(config, AblationConfig):
             return
         self.num_trials = config.num_trials
+        self.trials_per_executor = config.trials_per_executor
+        # no more executors than needed to run all trials at once
         self.num_executors = min(
-            util.num_executors(self.spark_context), self.num_trials
+            util.num_executors(self.spark_context),
+            math.ceil(self.num_trials / self.trials_per_executor),
         )
-        self.server = OptimizationServer(self.num_executors)
+        # every trial slot registers as a separate worker
+        self.server = OptimizationServer(self.num_executors * self.trials_per_executor)
         self.searchspace = self._init_searchspace(config.searchspace)
         self.controller = self._init_controller(config.optimizer, self.searchspace)
         # if optimizer has pruner, num trials is determined by pruner
@@ -86,7 +114,8 @@ class OptimizationDriver(Driver):
             # number of trials need to be determined depending on searchspace of user.
             self.num_trials = self.controller.get_num_trials(config.searchspace)
 
-        self.earlystop_check = self._init_earlystop_check(config.es_policy)
+        self.earlystop_rule = self._init_earlystop_rule(config.es_policy)
+        self.earlystop_check = self.earlystop_rule.earlystop_check
         self.es_interval = config.es_interval
         self.es_min = config.es_min
         if isinstance(config.direction, str) and config.direction.lower() in [
@@ -101,14 +130,52 @@ class OptimizationDriver(Driver):
                     str(config.direction), type(config.direction).__name__
                 )
             )
-        self.result = {"best_val": "n.a.", "num_trials": 0, "early_stopped": 0}
+        self.result = {
+            "best_val": "n.a.",
+            "num_trials": 0,
+            "early_stopped": 0,
+            "cached": 0,
+        }
+        if config.cache_dir:
+            self.result_cache = ResultCache(
+                EnvSing.get_instance(),
+                config.cache_dir,
+                config.cache_version,
+                config.optimization_key,
+            )
         # Init controller and set references to data
         self.controller.num_trials = self.num_trials
         self.controller.searchspace = self.searchspace
         self.controller.trial_store = self._trial_store
         self.controller.final_store = self._final_store
         self.controller.direction = self.direction
+        if config.warm_start:
+            self.warm_start(config.warm_start)
         self.controller._initialize(exp_dir=self.log_dir)
+        if config.suggestion_buffer > 0:
+            self.suggestion_service = SuggestionService(
+                self.controller, config.suggestion_buffer
+            )
+
+    def init(self, job_start: float) -> None:
+        """Starts the suggestion service, if enabled, the RPC server, message
+        digestion worker and the periodic check for departed executors.
+
+        :param job_start: Time of the job start.
+        """
+        if self.suggestion_service:
+            # forked after resuming, so the controller is up to date
+            self.suggestion_service.start(self.wakeup_deferred)
+        super().init(job_start)
+        # periodic, so wake-ups for retries must not run it early
+        self.add_deferred_message(
+            {"type": "CHECK"}, self._executor_timeout(), wakeup=False
+        )
+
+    def _executor_timeout(self) -> float:
+        """Returns the seconds without heartbeat after which an executor is
+        considered departed."""
+        return max(self.EXECUTOR_TIMEOUT, 10 * self.hb_interval)
 
     def _exp_startup_callback(self) -> None:
         """Registers the hp config to tensorboard upon experiment startup."""
@@ -150,9 +217,10 @@ class OptimizationDriver(Driver):
 
         :param exc: The exception to handle.
         """
-        self.controller._close_log()
-        if self.controller.pruner:
-            self.controller.pruner._close_log()
+        if self.suggestion_service:
+            self.suggestion_service.stop()
+        else:
+            self.controller._shutdown()
         if self.exception:
             raise self.exception  # pylint: disable=raising-bad-type
         raise exc
@@ -175,13 +243,15 @@ class OptimizationDriver(Driver):
             self._secret,
             self.config.optimization_key,
             self.log_dir,
+            self.trials_per_executor,
         )
 
     def _register_msg_callbacks(self) -> None:
         """Registers message callbacks for heartbeat responses to spark
         magic, blacklist messages to exclude hp configurations, final callbacks
         to process experiment results, idle callbacks for finished executors,
-        and registration callbacks for the clients to exchange connection info.
+        registration callbacks for the clients to exchange connection info and
+        check callbacks to requeue the trials of departed executors.
         """
         for key, call in (
             ("METRIC", self._metric_msg_callback),
@@ -189,6 +259,7 @@ class OptimizationDriver(Driver):
             ("FINAL", self._final_msg_callback),
             ("IDLE", self._idle_msg_callback),
             ("REG", self._register_msg_callback),
+            ("CHECK", self._check_msg_callback),
         ):
             self.message_callbacks[key] = call
 
@@ -201,7 +272,94 @@ class OptimizationDriver(Driver):
 
         :returns: A new trial for hp optimization.
         """
-        return self.controller.get_suggestion(trial)
+        if self._resumed_trials:
+            return self._resumed_trials.popleft()
+        suggestion = self._get_suggestions(1, trial)[0]
+        while isinstance(suggestion, Trial) and self._record_new_trial(suggestion):
+            suggestion = self._get_suggestions(1, suggestion)[0]
+        return suggestion
+
+    def controller_get_batch(self, n: int) -> list:
+        """Gets trials for ``n`` executors that are waiting at the same time.
+
+        Resumed and requeued trials come first, the remaining trials are
+        sampled by the controller as one batch.
+
+        :param n: Number of waiting executors.
+
+        :returns: Up to ``n`` trials, possibly followed by `None` if there are
+            no trials remaining in the experiment or "IDLE" if the controller
+            has to wait for running trials.
+        """
+        suggestions = []
+        while self._resumed_trials and len(suggestions) < n:
+            suggestions.append(self._resumed_trials.popleft())
+        while len(suggestions) < n:
+            batch = self._get_suggestions(n - len(suggestions))
+            suggestions.extend(
+                suggestion
+                for suggestion in batch
+                if not (
+                    isinstance(suggestion, Trial) and self._record_new_trial(suggestion)
+                )
+            )
+            if not isinstance(batch[-1], Trial):
+                break
+        return suggestions
+
+    def _get_suggestions(self, n: int, trial: Optional[Trial] = None) -> list:
+        """Gets up to ``n`` new trials from the controller, or the suggestions
+        the suggestion service has ready.
+
+        :param n: Number of trials.
+        :param trial: The last finalized trial, if any. The suggestion service
+            is notified of finalized trials by `_finalize_trial()` instead.
+
+        :returns: The suggestions, see `AbstractOptimizer.get_suggestions()`.
+        """
+        if self.suggestion_service:
+            return self.suggestion_service.get_suggestions(n)
+        return self.controller.get_suggestions(n, trial)
+
+    def _record_new_trial(self, trial: Trial) -> bool:
+        """Journals a new trial of the controller and finalizes it right away
+        if its result is cached.
+
+        :param trial: The new trial.
+
+        :returns: True if the trial was finalized with its cached result.
+        """
+        cached = self._load_cached_result(trial)
+        self.journal.trial_created(trial)
+        if cached:
+            # cached trials are finalized right away instead of being dispatched
+            self.log("Using the cached result of trial {}".format(trial.trial_id))
+            self.journal.trial_metrics(
+                trial.trial_id, trial.step_history, trial.metric_history
+            )
+            self._finalize_trial(trial)
+        return cached
+
+    def _load_cached_result(self, trial: Trial) -> bool:
+        """Fills a new trial with its cached result, if the result cache is
+        enabled and contains the hparams of the trial.
+
+        :param trial: The new trial.
+
+        :returns: True if the trial was finalized with the cached result.
+        """
+        if self.result_cache is None:
+            return False
+        entry = self.result_cache.get(trial)
+        if entry is None:
+            return False
+        with trial.lock:
+            trial.append_metric({"steps": entry["steps"], "values": entry["values"]})
+            trial.status = Trial.FINALIZED
+            trial.final_metric = entry["final_metric"]
+            trial.duration = 0
+            trial.info_dict["cached"] = True
+        return True
 
     def get_trial(self, trial_id: int) -> Trial:
         """Returns a trial by ID from the trial store.
@@ -219,9 +377,169 @@ class OptimizationDriver(Driver):
         """
         self._trial_store[trial.trial_id] = trial
 
+    def _assign_trial(self, trial: Trial, partition_id: int) -> None:
+        """Schedules a trial on an executor and records the assignment in the
+        journal.
+
+        :param trial: The trial to be assigned.
+        :param partition_id: Partition ID of the executor.
+        """
+        with trial.lock:
+            trial.start = time.time()
+            trial.status = Trial.SCHEDULED
+            # store before assigning, the reservation wakes up waiting GETs
+            self.add_trial(trial)
+            assigned = self.server.reservations.assign_trial(
+                partition_id, trial.trial_id
+            )
+        if not assigned:
+            # the executor departed in the meantime
+            self._requeue_trial(trial)
+            return
+        self.journal.trial_assigned(trial.trial_id, partition_id)
+
+    def _requeue_trial(self, trial: Trial) -> None:
+        """Resets a trial which could not be completed by its executor and
+        schedules it before any new trial.
+
+        :param trial: The trial to run again.
+        """
+        with trial.lock:
+            trial.status = Trial.PENDING
+            trial.start = None
+            trial.early_stop = False
+            trial.clear_metrics()
+        self._resumed_trials.append(trial)
+        # executors that are still running or join later have to pick it up
+        self.experiment_done = False
+        if not self.server.reservations.get():
+            self.log(
+                "No executor left to run requeued trial {}, waiting for an "
+                "executor to join".format(trial.trial_id)
+            )
+        self.wakeup_deferred()
+
+    def warm_start(self, log_dirs: List[str]) -> None:
+        """Loads the finalized trials of previous experiments into the
+        controller.
+
+        Has to be called before the controller is initialized.
+
+        :param log_dirs: Log directories of previous experiments, containing a
+            `trial.json` file per trial.
+        """
+        env = EnvSing.get_instance()
+        trials = []
+        for log_dir in log_dirs:
+            for entry in env.ls(log_dir):
+                # ls returns names locally and full paths on HDFS
+                trial_file = (
+                    log_dir + "/" + entry.rstrip("/").split("/")[-1] + "/trial.json"
+                )
+                if not env.exists(trial_file):
+                    continue
+                try:
+                    with env.open_file(trial_file, flags="r") as fd:
+                        trials.append(Trial.from_json(fd.read()))
+                except (ValueError, KeyError) as exc:
+                    self.log("Could not load {}: {}".format(trial_file, exc))
+        num_ignored = self.controller.warm_start(trials)
+        self.log(
+            "Warm-started {} with {} trials of previous experiments, ignored {} "
+            "duplicate, unfinished or incompatible trials.".format(
+                self.controller.name(),
+                len(self.controller.prior_trials),
+                num_ignored,
+            )
+        )
+
+    def resume(self, log_dir: str) -> None:
+        """Resumes a previous run of the experiment from its journal.
+
+        Replays the trials of the previous run in the order they were created
+        and finalized. Every created trial is replayed through the controller,
+        so the controller and its pruner reach the same state as in the
+        previous run. Finalized trials are restored with their metrics and are
+        not run again. Trials that were not finalized are scheduled before any
+        new trial. The replayed records are appended to the journal of this
+        run, so it can be resumed as well.
+
+        :param log_dir: Log directory of the run to resume.
+
+        :raises FileNotFoundError: If there is no journal in `log_dir`.
+        """
+        records = Journal.read(EnvSing.get_instance(), log_dir)
+        last_finalized = None
+        for record in records:
+            if record["type"] == Journal.CREATE:
+                trial = Journal.to_trial(record)
+                suggestion = self.controller.replay_suggestion(trial, last_finalized)
+                if (
+                    not isinstance(suggestion, Trial)
+                    or suggestion.trial_id != trial.trial_id
+                ):
+                    # the controller diverged, the remaining trials will be run again
+                    self.log(
+                        "Could not replay trial {}, controller suggested {}. "
+                        "Stop resuming.".format(trial.trial_id, suggestion)
+                    )
+                    break
+                self.add_trial(suggestion)
+                self.journal.trial_created(suggestion)
+            elif record["trial_id"] not in self._trial_store:
+                # trial was not replayed or has been finalized already
+                continue
+            elif record["type"] == Journal.METRIC:
+                trial = self.get_trial(record["trial_id"])
+                trial.append_metric(
+                    {"steps": record["steps"], "values": record["values"]}
+                )
+            elif record["type"] == Journal.FINAL:
+                trial = self.get_trial(record["trial_id"])
+                trial.status = Trial.FINALIZED
+                trial.final_metric = record["final_metric"]
+                trial.duration = record["duration"]
+                if record["early_stop"]:
+                    trial.set_early_stop()
+                self._final_store.append(trial)
+                self._trial_store.pop(trial.trial_id)
+                self.earlystop_rule.trial_finalized(trial, self.direction)
+                # metrics of unfinished trials are not copied, they are run again
+                self.journal.trial_metrics(
+                    trial.trial_id, trial.step_history, trial.metric_history
+                )
+                self.journal.trial_finalized(trial)
+                self._update_result(trial)
+                self.writer.dump(
+                    trial.to_json(),
+                    self.log_dir + "/" + trial.trial_id + "/trial.json",
+                )
+                last_finalized = trial
+
+        # trials that were created or running when the previous run stopped
+        for trial in self._trial_store.values():
+            trial.status = Trial.PENDING
+            trial.clear_metrics()
+            self._resumed_trials.append(trial)
+        if self._final_store:
+            self.maggy_log = self._update_maggy_log()
+        self.log(
+            "Resumed experiment from {}: {} finalized trials restored, {} trials "
+            "to run again".format(
+                log_dir, len(self._final_store), len(self._resumed_trials)
+            )
+        )
+
+    def stop(self) -> None:
+        """Stops the driver and closes the journal."""
+        super().stop()
+        self.journal.close()
+
     def finalize(self, job_end: float) -> dict:
         """Saves a summary of the experiment to a dict and logs it in the DFS.
 
+        Waits until all queued experiment files are written.
+
         :param job_end: Time of the job end.
 
         :returns: The experiment summary dict.
@@ -232,11 +550,28 @@ class OptimizationDriver(Driver):
         results = self.prep_results(duration_str)
         print(results)
         self.log(results)
-        EnvSing.get_instance().dump(
+        self.writer.dump(
             json.dumps(self.result, default=util.json_default_numpy),
             self.log_dir + "/result.json",
         )
-        EnvSing.get_instance().dump(self.json(), self.log_dir + "/maggy.json")
+        self.writer.dump(self.json(), self.log_dir + "/maggy.json")
+        # the experiment files have to be written when the experiment returns
+        failures = self.writer.flush()
+        if failures:
+            print(
+                "Warning: Failed to write {} experiment files, see maggy.log: {}".format(
+                    len(failures), [path for path, _ in failures]
+                )
+            )
+        if self._resumed_trials:
+            # all executors departed before running them
+            print(
+                "Warning: {} requeued trials were not run, no executor was left: "
+                "{}".format(
+                    len(self._resumed_trials),
+                    [trial.trial_id for trial in self._resumed_trials],
+                )
+            )
         return self.result
 
     def prep_results(self, duration_str: str) -> str:
@@ -247,7 +582,11 @@ class OptimizationDriver(Driver):
 
         :returns: The formatted experiment results summary string.
         """
-        self.controller._finalize_experiment(self._final_store)
+        if self.suggestion_service:
+            # finalizes the controller in its process
+            self.suggestion_service.stop()
+        else:
+            self.controller._finalize_experiment(self._final_store)
         results = (
             "\n------ "
             + self.controller.name()
@@ -268,6 +607,8 @@ class OptimizationDriver(Driver):
             "EARLY STOPPED Trials -- " + str(self.result["early_stopped"]) + "\n"
             "Total job time " + duration_str + "\n"
         )
+        if self.result_cache is not None:
+            results += "CACHED Trials -- " + str(self.result["cached"]) + "\n"
         return results
 
     def config_to_dict(self) -> dict:
@@ -337,7 +678,7 @@ class OptimizationDriver(Driver):
         metric = trial.final_metric
         param_string = trial.params
         trial_id = trial.trial_id
-        num_epochs = len(trial.metric_history)
+        num_epochs = len(trial.metric_array)
 
         # pop function values and trial_type from parameters, since we don't need them
         param_string.pop("dataset_function", None)
@@ -355,11 +696,14 @@ class OptimizationDriver(Driver):
                 "metric_list": [metric],
                 "num_trials": 1,
                 "early_stopped": 0,
+                "cached": 0,
                 "num_epochs": num_epochs,
                 "trial_id": trial_id,
             }
             if trial.early_stop:
                 self.result["early_stopped"] += 1
+            if trial.info_dict.get("cached"):
+                self.result["cached"] += 1
             return
         else:
             if self.direction == "max":
@@ -390,6 +734,8 @@ class OptimizationDriver(Driver):
 
         if trial.early_stop:
             self.result["early_stopped"] += 1
+        if trial.info_dict.get("cached"):
+            self.result["cached"] += 1
 
     def _update_maggy_log(self) -> None:
         """Creates the status of a maggy experiment with a progress bar."""
@@ -414,6 +760,8 @@ class OptimizationDriver(Driver):
             + " - metric "
             + str(self.result["best_val"])
         )
+        if self.result_cache is not None:
+            log += " - CACHED " + str(self.result["cached"])
         return log
 
     def _metric_msg_callback(self, msg: dict) -> None:
@@ -425,14 +773,20 @@ class OptimizationDriver(Driver):
 
         :param msg: The metric message from the message queue.
         """
-        logs = msg.get("logs", None)
-        if logs is not None:
-            with self.log_lock:
-                self.executor_logs = self.executor_logs + logs
+        self.add_executor_logs(msg)
 
         step = None
+        prev_step = 0
         if msg["trial_id"] is not None and msg["data"] is not None:
-            step = self.get_trial(msg["trial_id"]).append_metric(msg["data"])
+            trial = self.get_trial(msg["trial_id"])
+            num_steps = len(trial.metric_array)
+            if num_steps:
+                prev_step = trial.get_history(num_steps - 1)[0][0]
+            step = trial.append_metric(msg["data"])
+            if step is not None:
+                self.journal.trial_metrics(
+                    trial.trial_id, *trial.get_history(num_steps)
+                )
 
         # maybe these if statements should be in a function
         # also this could be made a separate message
@@ -442,7 +796,8 @@ class OptimizationDriver(Driver):
         if self.earlystop_check != NoStoppingRule.earlystop_check:
             if len(self._final_store) > self.es_min:
                 if step is not None and step != 0:
-                    if step % self.es_interval == 0:
+                    # a batch of metrics can skip over the interval boundary
+                    if step // self.es_interval > prev_step // self.es_interval:
                         try:
                             to_stop = self.earlystop_check(
                                 self.get_trial(msg["trial_id"]),
@@ -466,7 +821,11 @@ class OptimizationDriver(Driver):
         trial = self.get_trial(msg["trial_id"])
         with trial.lock:
             trial.status = Trial.SCHEDULED
-            self.server.reservations.assign_trial(msg["partition_id"], msg["trial_id"])
+            assigned = self.server.reservations.assign_trial(
+                msg["partition_id"], msg["trial_id"]
+            )
+        if not assigned:
+            self._requeue_trial(trial)
 
     def _final_msg_callback(self, msg: dict) -> None:
         """Final message callback.
@@ -476,10 +835,7 @@ class OptimizationDriver(Driver):
         :param msg: The final executor message from the message queue.
         """
         trial = self.get_trial(msg["trial_id"])
-        logs = msg.get("logs", None)
-        if logs is not None:
-            with self.log_lock:
-                self.executor_logs = self.executor_logs + logs
+        self.add_executor_logs(msg)
 
         # finalize the trial object
         with trial.lock:
@@ -487,9 +843,38 @@ class OptimizationDriver(Driver):
             trial.final_metric = msg["data"]
             trial.duration = util.seconds_to_milliseconds(time.time() - trial.start)
 
+        self._finalize_trial(trial)
+        # results of early stopped trials are not final
+        if self.result_cache is not None and not trial.early_stop:
+            self.result_cache.put(trial, self.writer)
+
+        # assign new trial
+        trial = self.controller_get_next(trial)
+        if trial is None:
+            # set before assigning, so the server releases all waiting GETs
+            self.experiment_done = True
+            self.server.reservations.assign_trial(msg["partition_id"], None)
+        elif trial == "IDLE":
+            self.server.reservations.assign_trial(msg["partition_id"], None)
+            self._add_idle_executor(msg["partition_id"])
+        else:
+            self._assign_trial(trial, msg["partition_id"])
+        # the finalized trial might unblock the controller for idle executors
+        self.wakeup_deferred()
+
+    def _finalize_trial(self, trial: Trial) -> None:
+        """Moves a finalized trial to the final store, records it and updates
+        the experiment result.
+
+        :param trial: The finalized trial.
+        """
         # move trial to the finalized ones
         self._final_store.append(trial)
-        self._trial_store.pop(trial.trial_id)
+        self._trial_store.pop(trial.trial_id, None)
+        self.earlystop_rule.trial_finalized(trial, self.direction)
+        self.journal.trial_finalized(trial)
+        if self.suggestion_service:
+            self.suggestion_service.trial_finalized(trial)
 
         # update result dictionary
         self._update_result(trial)
@@ -497,85 +882,93 @@ class OptimizationDriver(Driver):
         self.maggy_log = self._update_maggy_log()
         self.log(self.maggy_log)
 
-        EnvSing.get_instance().dump(
+        self.writer.dump(
             trial.to_json(),
             self.log_dir + "/" + trial.trial_id + "/trial.json",
         )
 
-        # assign new trial
-        trial = self.controller_get_next(trial)
-        if trial is None:
-            self.server.reservations.assign_trial(msg["partition_id"], None)
-            self.experiment_done = True
-        elif trial == "IDLE":
-            self.add_message(
-                {
-                    "type": "IDLE",
-                    "partition_id": msg["partition_id"],
-                    "idle_start": time.time(),
-                }
-            )
-            self.server.reservations.assign_trial(msg["partition_id"], None)
-        else:
-            with trial.lock:
-                trial.start = time.time()
-                trial.status = Trial.SCHEDULED
-                self.server.reservations.assign_trial(
-                    msg["partition_id"], trial.trial_id
-                )
-                self.add_trial(trial)
-
     def _idle_msg_callback(self, msg: dict) -> None:
         """Idle message callback.
 
-        Tries to trigger another trial for the idle executor.
+        Tries to trigger trials for all idle executors with one batch of
+        suggestions, so the controller does not update its model for every
+        single executor, e.g. when many executors register at once.
 
         :param msg: The idle message from the message queue.
         """
-        # execute only every 0.1 seconds but do not block thread
-        if time.time() - msg["idle_start"] > 0.1:
-            trial = self.controller_get_next()
+        self._idle_scheduled = False
+        if not self._idle_executors:
+            return
+        for trial in self.controller_get_batch(len(self._idle_executors)):
             if trial is None:
-                self.server.reservations.assign_trial(msg["partition_id"], None)
                 self.experiment_done = True
+                for partition_id in list(self._idle_executors):
+                    self.server.reservations.assign_trial(partition_id, None)
+                self._idle_executors.clear()
             elif trial == "IDLE":
-                # reset timeout
-                msg["idle_start"] = time.time()
-                self.add_message(msg)
+                # retry once woken up by a final message or the retry interval
+                self._schedule_idle(self.IDLE_RETRY_INTERVAL)
             else:
-                with trial.lock:
-                    trial.start = time.time()
-                    trial.status = Trial.SCHEDULED
-                    self.server.reservations.assign_trial(
-                        msg["partition_id"], trial.trial_id
-                    )
-                    self.add_trial(trial)
+                partition_id = next(iter(self._idle_executors))
+                del self._idle_executors[partition_id]
+                self._assign_trial(trial, partition_id)
+
+    def _add_idle_executor(self, partition_id: int) -> None:
+        """Adds an executor to the executors waiting for a trial.
+
+        :param partition_id: Partition ID of the executor.
+        """
+        self._idle_executors[partition_id] = time.time()
+        if self._idle_scheduled:
+            # a retry might be pending, but there could be requeued trials
+            self.wakeup_deferred()
         else:
-            self.add_message(msg)
+            # executors registering in the meantime are served in the same batch
+            self._schedule_idle(0)
+
+    def _schedule_idle(self, delay: float) -> None:
+        """Schedules the IDLE callback, unless it is already scheduled.
+
+        :param delay: Delay in seconds.
+        """
+        if not self._idle_scheduled:
+            self._idle_scheduled = True
+            self.add_deferred_message({"type": "IDLE"}, delay)
+
+    def _check_msg_callback(self, msg: dict) -> None:
+        """Check message callback.
+
+        Removes the executors which did not send a heartbeat within the
+        executor timeout and requeues their trials, so they are run by the
+        remaining executors or by executors joining later.
+
+        :param msg: The check message from the message queue.
+        """
+        timeout = self._executor_timeout()
+        departed = self.server.reservations.remove_departed(timeout)
+        for partition_id, trial_id in departed.items():
+            self._idle_executors.pop(partition_id, None)
+            # executors that stopped after the experiment leave silently
+            trial = self._trial_store.get(trial_id, None)
+            if trial is not None:
+                self.log(
+                    "Executor {} departed, requeued trial {}".format(
+                        partition_id, trial_id
+                    )
+                )
+                self._requeue_trial(trial)
+        if not self.worker_done:
+            self.add_deferred_message(msg, timeout, wakeup=False)
 
     def _register_msg_callback(self, msg: dict) -> None:
         """Register message callback.
 
-        Assigns trials on worker registration if available.
+        Queues the registered worker for a trial, workers registering at the
+        same time get their trials from one batch of suggestions.
 
         :param msg: The blacklist message from the message queue.
         """
-        trial = self.controller_get_next()
-        if trial is None:
-            self.server.reservations.assign_trial(msg["partition_id"], None)
-            self.experiment_done = True
-        elif trial == "IDLE":
-            # reset timeout
-            msg["idle_start"] = time.time()
-            self.add_message(msg)
-        else:
-            with trial.lock:
-                trial.start = time.time()
-                trial.status = Trial.SCHEDULED
-                self.server.reservations.assign_trial(
-                    msg["partition_id"], trial.trial_id
-                )
-                self.add_trial(trial)
+        self._add_idle_executor(msg["partition_id"])
 
     @staticmethod
     def _init_searchspace(searchspace: Searchspace) -> Searchspace:
@@ -641,7 +1034,9 @@ class OptimizationDriver(Driver):
             )
 
     @staticmethod
-    def _init_earlystop_check(es_policy: Union[str, AbstractEarlyStop]) -> Callable:
+    def _init_earlystop_rule(
+        es_policy: Union[str, AbstractEarlyStop]
+    ) -> AbstractEarlyStop:
         """Checks for a valid early stop policy.
 
         :param es_policy: The early stop policy to be checked.
@@ -649,7 +1044,7 @@ class OptimizationDriver(Driver):
         :raises TypeError: In case the policy is of wrong type or not in the
             set of supported stopping policies.
 
-        :returns: The validated early stopping policy.
+        :returns: The validated early stopping policy instance.
         """
         if not isinstance(es_policy, (str, AbstractEarlyStop)):
             raise TypeError(
@@ -672,6 +1067,6 @@ class OptimizationDriver(Driver):
             rule = (
                 MedianStoppingRule if es_policy.lower() == "median" else NoStoppingRule
             )
-            return rule.earlystop_check
+            return rule()
         print("Custom Early Stopping policy initialized.")
-        return es_policy.earlystop_check
+        return es_policy
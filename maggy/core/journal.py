@@ -0,0 +1,188 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""Append-only journal of the trials of an experiment.
+
+The driver appends a record whenever a trial is created, assigned to an
+executor, reports metrics or is finalized. Every record is a JSON object,
+prefixed by its length and CRC32 checksum. A record that was only partially
+written when the driver died fails the checksum, reading stops at the first
+such record. The journal is flushed after every finalized trial, so no
+finished trial is lost.
+"""
+
+import json
+import struct
+import threading
+import zlib
+from typing import List
+
+from maggy import util
+from maggy.trial import Trial
+
+# payload length and CRC32 checksum of the payload
+RECORD = struct.Struct(">II")
+
+
+class Journal(object):
+    """Writes and reads the journal in the log directory of an experiment."""
+
+    FILE_NAME = "journal.bin"
+
+    # record types
+    CREATE = "CREATE"
+    ASSIGN = "ASSIGN"
+    METRIC = "METRIC"
+    FINAL = "FINAL"
+
+    def __init__(self, env, log_dir: str):
+        """
+        :param env: Environment used to open the journal file.
+        :param log_dir: Log directory of the experiment.
+        """
+        self.env = env
+        self.path = Journal.get_path(log_dir)
+        self._fd = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_path(log_dir: str) -> str:
+        """Returns the path of the journal in `log_dir`."""
+        return log_dir + "/" + Journal.FILE_NAME
+
+    def trial_created(self, trial: Trial) -> None:
+        """Records a trial that was created by the controller.
+
+        :param trial: The new trial.
+        """
+        self._append(
+            {
+                "type": Journal.CREATE,
+                "trial_id": trial.trial_id,
+                "trial_type": trial.trial_type,
+                "params": trial.params,
+                "info_dict": trial.info_dict,
+            }
+        )
+
+    def trial_assigned(self, trial_id: str, partition_id: int) -> None:
+        """Records the assignment of a trial to an executor.
+
+        :param trial_id: ID of the trial.
+        :param partition_id: Partition ID of the executor.
+        """
+        self._append(
+            {
+                "type": Journal.ASSIGN,
+                "trial_id": trial_id,
+                "partition_id": partition_id,
+            }
+        )
+
+    def trial_metrics(self, trial_id: str, steps: list, values: list) -> None:
+        """Records new steps of the metric history of a trial.
+
+        :param trial_id: ID of the trial.
+        :param steps: The new steps.
+        :param values: Metrics of the new steps.
+        """
+        self._append(
+            {
+                "type": Journal.METRIC,
+                "trial_id": trial_id,
+                "steps": steps,
+                "values": values,
+            }
+        )
+
+    def trial_finalized(self, trial: Trial) -> None:
+        """Records a finalized trial and flushes the journal.
+
+        :param trial: The finalized trial.
+        """
+        self._append(
+            {
+                "type": Journal.FINAL,
+                "trial_id": trial.trial_id,
+                "final_metric": trial.final_metric,
+                "early_stop": trial.early_stop,
+                "duration": trial.duration,
+            },
+            flush=True,
+        )
+
+    def close(self) -> None:
+        """Flushes and closes the journal file."""
+        with self._lock:
+            if self._fd is not None and not self._fd.closed:
+                self._fd.flush()
+                self._fd.close()
+
+    def _append(self, record: dict, flush: bool = False) -> None:
+        payload = json.dumps(
+            record, separators=(",", ":"), default=util.json_default_numpy
+        ).encode("utf-8")
+        with self._lock:
+            if self._fd is None:
+                self._fd = self.env.open_file(self.path, flags="ab")
+            self._fd.write(RECORD.pack(len(payload), zlib.crc32(payload)) + payload)
+            if flush:
+                self._fd.flush()
+
+    @staticmethod
+    def read(env, log_dir: str) -> List[dict]:
+        """Reads all complete records of the journal in `log_dir`.
+
+        :param env: Environment used to open the journal file.
+        :param log_dir: Log directory of the experiment.
+
+        :raises FileNotFoundError: If there is no journal in `log_dir`.
+
+        :returns: The records in the order they were written.
+        """
+        path = Journal.get_path(log_dir)
+        if not env.exists(path):
+            raise FileNotFoundError("No experiment journal found at {}".format(path))
+        with env.open_file(path, flags="rb") as fd:
+            data = fd.read()
+
+        records = []
+        offset = 0
+        while offset + RECORD.size <= len(data):
+            length, checksum = RECORD.unpack_from(data, offset)
+            payload = data[offset + RECORD.size : offset + RECORD.size + length]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                # record was not written completely
+                break
+            records.append(json.loads(payload.decode("utf-8")))
+            offset += RECORD.size + length
+        return records
+
+    @staticmethod
+    def to_trial(record: dict) -> Trial:
+        """Creates the trial of a `CREATE` record.
+
+        :param record: A record of type `CREATE`.
+
+        :returns: The trial in state `PENDING`.
+        """
+        trial = Trial(
+            record["params"],
+            trial_type=record["trial_type"],
+            info_dict=record["info_dict"],
+        )
+        trial.trial_id = record["trial_id"]
+        return trial
@@ -0,0 +1,113 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""Bounded buffers for the executor logs shipped to the driver.
+
+Executors buffer the lines printed for Jupyter until the next heartbeat, the
+driver buffers them per executor until Sparkmagic polls them. Both buffers
+keep a fixed number of lines, overly long lines are truncated and the oldest
+lines are dropped if nobody drains the buffer. Large chunks of logs can be
+compressed for the transport in METRIC and FINAL messages.
+"""
+
+import zlib
+from collections import deque
+from typing import Union
+
+
+class LogBuffer(object):
+    """Ring buffer of log lines with line-level truncation.
+
+    If the buffer is full, the oldest lines are overwritten and counted as
+    dropped. The number of dropped lines is reported in the drained logs.
+    """
+
+    TRUNCATED = " [truncated]"
+
+    def __init__(self, max_lines: int = 1000, max_line_length: int = 2000):
+        """
+        :param max_lines: Number of lines kept in the buffer.
+        :param max_line_length: Lines are truncated to this many characters.
+        """
+        self.lines = deque(maxlen=max_lines)
+        self.max_line_length = max_line_length
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.lines)
+
+    def append(self, line: str) -> None:
+        """Appends a single line, `line` must not contain line breaks."""
+        if len(line) > self.max_line_length:
+            line = line[: self.max_line_length] + LogBuffer.TRUNCATED
+        if len(self.lines) == self.lines.maxlen:
+            self.dropped += 1
+        self.lines.append(line)
+
+    def extend(self, text: str) -> None:
+        """Appends all lines of `text`."""
+        lines = text.splitlines()
+        # lines which would be overwritten right away are not copied
+        excess = len(lines) - self.lines.maxlen
+        if excess > 0:
+            lines = lines[excess:]
+        self.dropped += max(len(self.lines) + len(lines) - self.lines.maxlen, 0)
+        self.dropped += max(excess, 0)
+        limit = self.max_line_length
+        self.lines.extend(
+            line if len(line) <= limit else line[:limit] + LogBuffer.TRUNCATED
+            for line in lines
+        )
+
+    def drain(self) -> str:
+        """Removes all lines from the buffer.
+
+        :returns: The lines joined by line breaks, preceded by a note on the
+            number of dropped lines, or an empty string.
+        """
+        lines = list(self.lines)
+        if self.dropped > 0:
+            lines.insert(0, "[{} log lines dropped]".format(self.dropped))
+        self.lines.clear()
+        self.dropped = 0
+        if not lines:
+            return ""
+        return "\n".join(lines) + "\n"
+
+
+def compress(logs: str, min_size: int) -> Union[str, bytes, None]:
+    """Prepares logs for the transport in a message.
+
+    :param logs: Logs to send.
+    :param min_size: Logs with at least this many characters are compressed
+        with zlib, no compression if None.
+
+    :returns: None if there are no logs, the zlib compressed logs or `logs`.
+    """
+    if not logs:
+        return None
+    if min_size is not None and len(logs) >= min_size:
+        return zlib.compress(logs.encode("utf-8"))
+    return logs
+
+
+def decompress(logs: Union[str, bytes, None]) -> str:
+    """Restores logs prepared with `compress`."""
+    if logs is None:
+        return ""
+    if isinstance(logs, bytes):
+        return zlib.decompress(logs).decode("utf-8")
+    return logs
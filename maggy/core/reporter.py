@@ -18,28 +18,96 @@
 API Module for the user to include in his training code.
 
 """
+
 import threading
+import time
+from array import array
 from datetime import datetime
 
 from maggy import constants
 from maggy.core import exceptions
+from maggy.core.logbuffer import LogBuffer
 
 from maggy.core.environment.singleton import EnvSing
 
 
+class MetricBuffer(object):
+    """Ring buffer of broadcasted (step, value, timestamp) triples.
+
+    The triples are kept in preallocated arrays of doubles. If the buffer is
+    full, the oldest entries are overwritten and counted as dropped.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.steps = array("d", bytes(8 * capacity))
+        self.values = array("d", bytes(8 * capacity))
+        self.times = array("d", bytes(8 * capacity))
+        self.start = 0
+        self.size = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, step, value, timestamp):
+        """Appends a triple, a repeated step only updates the latest value."""
+        if self.size > 0:
+            last = (self.start + self.size - 1) % self.capacity
+            if self.steps[last] == step:
+                self.values[last] = value
+                self.times[last] = timestamp
+                return
+        if self.size == self.capacity:
+            self.start = (self.start + 1) % self.capacity
+            self.size -= 1
+            self.dropped += 1
+        idx = (self.start + self.size) % self.capacity
+        self.steps[idx] = step
+        self.values[idx] = value
+        self.times[idx] = timestamp
+        self.size += 1
+
+    def drain(self):
+        """Removes all entries from the buffer.
+
+        :returns: Tuple of the steps and values arrays in broadcast order.
+        """
+        end = self.start + self.size
+        if end <= self.capacity:
+            steps = self.steps[self.start : end]
+            values = self.values[self.start : end]
+        else:
+            end -= self.capacity
+            steps = self.steps[self.start :] + self.steps[:end]
+            values = self.values[self.start :] + self.values[:end]
+        self.start = 0
+        self.size = 0
+        return steps, values
+
+
 class Reporter(object):
     """
     Thread-safe store for sending a metric and logs from executor to driver
     """
 
+    # capacity of the metric ring buffer
+    BUFFER_SIZE = 4096
+    # number of buffered metrics which trigger a heartbeat before hb_interval
+    FLUSH_SIZE = 256
+    # number of log lines kept for Jupyter between two heartbeats
+    LOG_LINES = 1000
+
     def __init__(self, log_file, partition_id, task_attempt, print_executor):
         self.metric = None
         self.step = -1
+        self.buffer = MetricBuffer(self.BUFFER_SIZE)
+        self.flush_event = threading.Event()
         self.lock = threading.RLock()
         self.stop = False
         self.trial_id = None
         self.trial_log_file = None
-        self.logs = ""
+        self.logs = LogBuffer(self.LOG_LINES)
         self.log_file = log_file
         self.partition_id = partition_id
         self.task_attempt = task_attempt
@@ -97,6 +165,9 @@ class Reporter(object):
             else:
                 self.step = step
                 self.metric = metric
+                self.buffer.append(step, metric, time.time())
+                if len(self.buffer) >= self.FLUSH_SIZE:
+                    self.flush_event.set()
             if self.stop:
                 raise exceptions.EarlyStopException(metric)
 
@@ -118,7 +189,7 @@ class Reporter(object):
                 if jupyter:
                     jupyter_log = str(self.partition_id) + ": " + log_msg
                     self.trial_fd.write(env.str_or_byte(msg))
-                    self.logs = self.logs + jupyter_log + "\n"
+                    self.logs.extend(jupyter_log)
                 else:
                     self.fd.write(env.str_or_byte(msg))
                     if self.trial_fd:
@@ -136,9 +207,26 @@ class Reporter(object):
     def get_data(self):
         """Returns the metric and logs to be sent to the experiment driver."""
         with self.lock:
-            log_to_send = self.logs
-            self.logs = ""
-            return self.metric, self.step, log_to_send
+            return self.metric, self.step, self.logs.drain()
+
+    def get_batch(self):
+        """Returns all buffered steps and values since the last call."""
+        with self.lock:
+            self.flush_event.clear()
+            if self.buffer.dropped > 0:
+                self.log(
+                    "Dropped {} metrics, the heartbeat could not keep up.".format(
+                        self.buffer.dropped
+                    ),
+                    False,
+                )
+                self.buffer.dropped = 0
+            return self.buffer.drain()
+
+    def wait_for_flush(self, timeout):
+        """Blocks until the metric buffer should be flushed or `timeout`
+        seconds passed."""
+        self.flush_event.wait(timeout)
 
     def reset(self):
         """
@@ -148,6 +236,7 @@ class Reporter(object):
         with self.lock:
             self.metric = None
             self.step = -1
+            self.buffer.drain()
             self.stop = False
             self.trial_id = None
             self.fd.flush()
@@ -0,0 +1,124 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""Content-addressed cache of trial results.
+
+Results are keyed by the trial id, which is a hash of the hparams of the
+trial, a user-supplied version tag of the training code and data, and the
+optimization key. Each result is stored as a JSON file named after the key,
+so the cache can be shared between experiments and can live in the
+experiment file system or in a local directory.
+"""
+
+import hashlib
+import json
+from typing import Optional
+
+from maggy import util
+from maggy.trial import Trial
+
+
+class ResultCache(object):
+    """Stores and looks up the results of finalized trials in `cache_dir`."""
+
+    def __init__(
+        self, env, cache_dir: str, version: str = "", optimization_key: str = "metric"
+    ):
+        """
+        :param env: Environment used to access the cache directory.
+        :param cache_dir: Directory of the cache, created if it does not exist.
+        :param version: Version tag of the training code and data. Results of
+            other versions are not used.
+        :param optimization_key: Name of the optimized metric.
+        """
+        self.env = env
+        self.cache_dir = cache_dir.rstrip("/")
+        self.version = version
+        self.optimization_key = optimization_key
+        if not env.exists(self.cache_dir):
+            env.mkdir(self.cache_dir)
+        # the cache is listed once, so misses do not touch the file system
+        self._keys = set(
+            entry.rstrip("/").split("/")[-1][: -len(".json")]
+            for entry in env.ls(self.cache_dir)
+            if entry.endswith(".json")
+        )
+
+    def __len__(self):
+        return len(self._keys)
+
+    def key(self, trial: Trial) -> str:
+        """Returns the cache key of `trial`."""
+        return hashlib.md5(
+            json.dumps([trial.trial_id, self.version, self.optimization_key]).encode(
+                "utf-8"
+            )
+        ).hexdigest()
+
+    def get_path(self, key: str) -> str:
+        """Returns the path of the cache entry with `key`."""
+        return self.cache_dir + "/" + key + ".json"
+
+    def get(self, trial: Trial) -> Optional[dict]:
+        """Looks up the result of a trial with the same hparams as `trial`.
+
+        :param trial: The trial to look up.
+
+        :returns: The cached result with the keys `final_metric`, `steps`,
+            `values` and `duration`, or None if there is no usable entry.
+        """
+        key = self.key(trial)
+        if key not in self._keys:
+            return None
+        try:
+            with self.env.open_file(self.get_path(key), flags="r") as fd:
+                entry = json.loads(fd.read())
+        except (IOError, ValueError):
+            return None
+        if (
+            entry.get("trial_id") != trial.trial_id
+            or entry.get("version") != self.version
+            or entry.get("optimization_key") != self.optimization_key
+        ):
+            return None
+        return entry
+
+    def put(self, trial: Trial, writer=None) -> None:
+        """Stores the result of a finalized trial.
+
+        :param trial: The finalized trial.
+        :param writer: Optional `AsyncWriter` to write the entry in the
+            background.
+        """
+        key = self.key(trial)
+        data = json.dumps(
+            {
+                "trial_id": trial.trial_id,
+                "version": self.version,
+                "optimization_key": self.optimization_key,
+                "params": trial.params,
+                "final_metric": trial.final_metric,
+                "steps": trial.step_history,
+                "values": trial.metric_history,
+                "duration": trial.duration,
+            },
+            default=util.json_default_numpy,
+        )
+        if writer is not None:
+            writer.dump(data, self.get_path(key))
+        else:
+            self.env.dump(data, self.get_path(key))
+        self._keys.add(key)
@@ -16,8 +16,9 @@
 
 from __future__ import annotations
 
+import collections
 import secrets
-import select
+import selectors
 import socket
 import struct
 import threading
@@ -25,8 +26,7 @@ import time
 import typing
 from typing import Any
 
-from pyspark import cloudpickle
-
+from maggy.core import logbuffer, wire
 from maggy.core.environment.singleton import EnvSing
 from maggy.trial import Trial
 
@@ -36,28 +36,64 @@ if typing.TYPE_CHECKING:  # Avoid circular import error.
 
 MAX_RETRIES = 3
 BUFSIZE = 1024 * 2
+# seconds a client asks the server to hold a GET or QUERY request
+LONG_POLL_TIMEOUT = 10.0
+# upper bound for holding requests on the server
+MAX_LONG_POLL_TIMEOUT = 60.0
+# logs with at least this many characters are sent zlib compressed, None
+# disables the compression
+LOG_COMPRESS_SIZE = 4096
+HEADER = struct.Struct(">I")
 
 SERVER_HOST_PORT = None
 
 
+def slot_id(partition_id, slot, trials_per_executor):
+    """Returns the worker id of a trial slot of a Spark executor.
+
+    With one trial per executor, the id of the only slot is the partition id.
+
+    Args:
+        :partition_id: Partition id of the Spark executor.
+        :slot: Index of the slot in the executor.
+        :trials_per_executor: Number of trial slots per executor.
+    """
+    return partition_id * trials_per_executor + slot
+
+
 class Reservations(object):
     """Thread-safe store for worker reservations.
 
+    A reservation is made per trial slot. An executor running several trials
+    at once registers every slot on its own, with the ``slot_id()`` as its
+    ``partition_id``, so slots are scheduled as separate workers.
+
+    With elastic membership, ``required`` is only the maximum number of
+    workers. The reservations are done as soon as the first worker registers,
+    workers can join at any time and workers which were not seen for a while
+    can be removed as departed.
+
     Needs to be thread-safe mainly because the server listener thread can add
     reservations while the experiment driver might modify something on a
     reservation.
     """
 
-    def __init__(self, required):
+    def __init__(self, required, elastic=False):
         """
 
         Args:
-            required:
+            required: Number of workers to wait for, the maximum number of
+                workers if ``elastic``.
+            elastic: Whether workers can join and leave during the experiment.
         """
         self.required = required
+        self.elastic = elastic
         self.lock = threading.RLock()
         self.reservations = {}
         self.check_done = False
+        # called with the partition id whenever an assignment changes, or
+        # with None once all reservations are fulfilled
+        self.listener = None
 
     def add(self, meta):
         """
@@ -72,10 +108,15 @@ class Reservations(object):
                 "task_attempt": meta["task_attempt"],
                 "trial_id": meta["trial_id"],
                 "num_executors": self.required,
+                # Spark partition of the slot
+                "executor_id": meta.get("executor_id", meta["partition_id"]),
+                "last_seen": time.time(),
             }
 
-            if self.remaining() == 0:
+            if self.elastic or self.remaining() == 0:
                 self.check_done = True
+        if self.check_done and self.listener is not None:
+            self.listener(None)
 
     def done(self):
         """Returns True if the ``required`` number of reservations have been fulfilled."""
@@ -91,7 +132,48 @@ class Reservations(object):
         """Get a count of remaining/unfulfilled reservations."""
         with self.lock:
             num_registered = len(self.reservations)
-            return self.required - num_registered
+            return max(self.required - num_registered, 0)
+
+    def touch(self, partition_id):
+        """Records that the worker with ``partition_id`` is alive.
+
+        Args:
+            :partition_id: An id to identify the spark executor.
+
+        Returns:
+            False if the worker is not registered, e.g. because it departed.
+        """
+        with self.lock:
+            reservation = self.reservations.get(partition_id, None)
+            if reservation is None:
+                return False
+            reservation["last_seen"] = time.time()
+            return True
+
+    def remove_departed(self, timeout):
+        """Removes the workers which were not seen for ``timeout`` seconds.
+
+        Args:
+            :timeout: Seconds after which a silent worker counts as departed.
+
+        Returns:
+            A dictionary of the departed partition ids and the ids of the
+            trials assigned to them.
+        """
+        deadline = time.time() - timeout
+        with self.lock:
+            departed = {
+                partition_id: reservation["trial_id"]
+                for partition_id, reservation in self.reservations.items()
+                if reservation["last_seen"] < deadline
+            }
+            for partition_id in departed:
+                del self.reservations[partition_id]
+        # answers held requests of the departed workers
+        if self.listener is not None:
+            for partition_id in departed:
+                self.listener(partition_id)
+        return departed
 
     def get_assigned_trial(self, partition_id):
         """Get the ``trial_id`` of the trial assigned to ``partition_id``.
@@ -116,9 +198,19 @@ class Reservations(object):
         Args:
             partition_id --
             trial {[type]} -- [description]
+
+        Returns:
+            False if the worker is not registered (anymore).
         """
         with self.lock:
-            self.reservations.get(partition_id, None)["trial_id"] = trial_id
+            reservation = self.reservations.get(partition_id, None)
+            if reservation is None:
+                return False
+            reservation["trial_id"] = trial_id
+        # notify outside of the lock, the listener may query the reservations
+        if self.listener is not None:
+            self.listener(partition_id)
+        return True
 
 
 class MessageSocket(object):
@@ -134,25 +226,21 @@ class MessageSocket(object):
         Returns:
 
         """
-        msg = None
-        data = b""
-        recv_done = False
-        recv_len = -1
-        while not recv_done:
-            buf = sock.recv(BUFSIZE)
-            if buf is None or len(buf) == 0:
+        header = bytearray(HEADER.size)
+        self._recv_into(sock, memoryview(header))
+        data = bytearray(HEADER.unpack(header)[0])
+        self._recv_into(sock, memoryview(data))
+        return self.decode(data)
+
+    @staticmethod
+    def _recv_into(sock, view):
+        """Fills ``view`` with bytes received on ``sock``."""
+        received = 0
+        while received < len(view):
+            num = sock.recv_into(view[received:], min(BUFSIZE, len(view) - received))
+            if num == 0:
                 raise Exception("socket closed")
-            if recv_len == -1:
-                recv_len = struct.unpack(">I", buf[:4])[0]
-                data += buf[4:]
-                recv_len -= len(data)
-            else:
-                data += buf
-                recv_len -= len(buf)
-            recv_done = recv_len == 0
-
-        msg = cloudpickle.loads(data)
-        return msg
+            received += num
 
     def send(self, sock, msg):
         """
@@ -165,28 +253,130 @@ class MessageSocket(object):
         Returns:
 
         """
-        data = cloudpickle.dumps(msg)
-        buf = struct.pack(">I", len(data)) + data
-        sock.sendall(buf)
+        sock.sendall(self.frame(self.encode(msg)))
+
+    @staticmethod
+    def encode(msg):
+        """Serializes a message dictionary to bytes."""
+        return wire.encode(msg)
+
+    @staticmethod
+    def decode(data):
+        """Deserializes a message dictionary from a bytes-like object."""
+        return wire.decode(data)
+
+    @staticmethod
+    def frame(data):
+        """Prefixes serialized message ``data`` with its length."""
+        return HEADER.pack(len(data)) + data
+
+
+class _Connection(object):
+    """Per-connection state of the server's selector loop.
+
+    Incoming bytes are received straight into a preallocated buffer which is
+    only reallocated when a larger message arrives. Outgoing responses are
+    queued and written as far as the socket accepts them without blocking.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.closed = False
+        self.header = bytearray(HEADER.size)
+        self.header_view = memoryview(self.header)
+        self.buffer = bytearray(BUFSIZE)
+        self.view = memoryview(self.buffer)
+        self.expected = -1
+        self.received = 0
+        self.out = collections.deque()
+
+    def read_payload(self):
+        """Reads from the socket until a message is complete or no more bytes
+        are available.
+
+        :returns: The payload of the next complete message as a memoryview,
+            None if it is not complete yet. The payload is only valid until
+            the next call, so it needs to be decoded first.
+        """
+        while True:
+            if self.expected >= 0 and self.received == self.expected:
+                self.expected, self.received = -1, 0
+                return self.view[: HEADER.unpack(self.header)[0]]
+            if self.expected < 0:
+                target = self.header_view[self.received :]
+            else:
+                target = self.view[self.received : self.expected]
+            try:
+                num = self.sock.recv_into(target)
+            except (BlockingIOError, InterruptedError):
+                return None
+            if num == 0:
+                raise ConnectionError("socket closed")
+            self.received += num
+            if self.expected < 0 and self.received == HEADER.size:
+                self.expected = HEADER.unpack(self.header)[0]
+                self.received = 0
+                if self.expected > len(self.buffer):
+                    self.buffer = bytearray(max(self.expected, 2 * len(self.buffer)))
+                    self.view = memoryview(self.buffer)
+
+    def queue(self, data):
+        """Queues serialized, framed message ``data`` for sending."""
+        self.out.append(memoryview(data))
+
+    def flush(self):
+        """Writes queued data until the socket would block.
+
+        :returns: True if all queued data was written.
+        """
+        while self.out:
+            try:
+                num = self.sock.send(self.out[0])
+            except (BlockingIOError, InterruptedError):
+                return False
+            if num == len(self.out[0]):
+                self.out.popleft()
+            else:
+                self.out[0] = self.out[0][num:]
+        return True
 
 
 class Server(MessageSocket):
-    """Simple socket server with length prefixed pickle messages"""
+    """Simple socket server with length prefixed pickle messages.
+
+    All connections are multiplexed on a single thread with a selector, using
+    non-blocking reads and writes. Message callbacks are executed on the
+    selector thread, they only hand messages over to the experiment driver.
+
+    Callbacks can answer a long-poll request with the response type "WAIT".
+    The request is then held until the reservations change or its timeout
+    expires and is answered by running the callback again.
+    """
 
     reservations = None
     done = False
 
-    def __init__(self, num_executors):
+    def __init__(self, num_executors, elastic=False):
         """
 
         Args:
             num_executors:
+            elastic: Whether executors can join and leave during the
+                experiment, see ``Reservations``.
         """
         if not num_executors > 0:
             raise ValueError("Number of executors has to be greater than zero!")
-        self.reservations = Reservations(num_executors)
+        self.reservations = Reservations(num_executors, elastic)
         self.callback_list = []
         self.message_callbacks = self._register_callbacks()
+        self._selector = None
+        self._responses = collections.deque()
+        self._wakeup_r = None
+        self._wakeup_w = None
+        self._exp_driver = None
+        self._waiting = {}
+        self._waiting_lock = threading.Lock()
+        self.reservations.listener = self._notify_waiting
 
     def await_reservations(self, sc, status={}, timeout=600):
         """
@@ -213,17 +403,17 @@ class Server(MessageSocket):
         print("All reservations completed.")
         return self.reservations.get()
 
-    def _handle_message(self, sock, msg, exp_driver):
+    def _handle_message(self, msg, exp_driver):
         """
         Handles a  message dictionary. Expects a 'type' and 'data' attribute in
         the message dictionary.
 
         Args:
-            sock:
             msg:
+            exp_driver:
 
         Returns:
-
+            The response dictionary.
         """
         msg_type = msg["type"]
         resp = {}
@@ -233,7 +423,7 @@ class Server(MessageSocket):
             )  # Prepare response in callback.
         except KeyError:
             resp["type"] = "ERR"
-        MessageSocket.send(self, sock, resp)
+        return resp
 
     def _register_callbacks(self):
         message_callbacks = {}
@@ -255,45 +445,176 @@ class Server(MessageSocket):
         server_sock, SERVER_HOST_PORT = EnvSing.get_instance().connect_host(
             server_sock, SERVER_HOST_PORT, exp_driver
         )
+        server_sock.setblocking(False)
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(server_sock, selectors.EVENT_READ, "accept")
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ, "wakeup")
+        self._exp_driver = exp_driver
 
         def _listen(self, sock, driver):
-            CONNECTIONS = []
-            CONNECTIONS.append(sock)
-
             while not self.done:
-                read_socks, _, _ = select.select(CONNECTIONS, [], [], 1)
-                for sock in read_socks:
-                    if sock == server_sock:
-                        client_sock, client_addr = sock.accept()
-                        CONNECTIONS.append(client_sock)
-                        _ = client_addr
+                timeout = self._expire_waiting()
+                for key, mask in self._selector.select(timeout=timeout):
+                    if key.data == "accept":
+                        self._accept(sock)
+                    elif key.data == "wakeup":
+                        self._drain_responses()
                     else:
-                        try:
-                            msg = self.receive(sock)
-                            # raise exception if secret does not match
-                            # so client socket gets closed
-                            if not secrets.compare_digest(
-                                msg["secret"], exp_driver._secret
-                            ):
-                                exp_driver.log(
-                                    "SERVER secret: {}".format(exp_driver._secret)
-                                )
-                                exp_driver.log(
-                                    "ERROR: wrong secret {}".format(msg["secret"])
-                                )
-                                raise Exception
-
-                            self._handle_message(sock, msg, driver)
-                        except Exception:
-                            sock.close()
-                            CONNECTIONS.remove(sock)
-            server_sock.close()
+                        if mask & selectors.EVENT_READ:
+                            self._read(key.data, driver)
+                        if mask & selectors.EVENT_WRITE and not key.data.closed:
+                            self._write(key.data)
+            for key in list(self._selector.get_map().values()):
+                key.fileobj.close()
+            self._selector.close()
+            self._wakeup_w.close()
 
         threading.Thread(
             target=_listen, args=(self, server_sock, exp_driver), daemon=True
         ).start()
         return SERVER_HOST_PORT
 
+    def _accept(self, server_sock):
+        """Accepts all pending client connections."""
+        while True:
+            try:
+                client_sock, _ = server_sock.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            client_sock.setblocking(False)
+            client_sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = _Connection(client_sock)
+            self._selector.register(client_sock, selectors.EVENT_READ, conn)
+
+    def _close(self, conn):
+        """Unregisters and closes a client connection."""
+        if not conn.closed:
+            conn.closed = True
+            self._selector.unregister(conn.sock)
+            conn.sock.close()
+
+    def _read(self, conn, exp_driver):
+        """Reads and dispatches all complete messages of a connection."""
+        try:
+            payload = conn.read_payload()
+            while payload is not None:
+                msg = self.decode(payload)
+                # close the client socket if the secret does not match
+                if not secrets.compare_digest(msg["secret"], exp_driver._secret):
+                    exp_driver.log("SERVER secret: {}".format(exp_driver._secret))
+                    exp_driver.log("ERROR: wrong secret {}".format(msg["secret"]))
+                    raise Exception
+                data = self._process(conn, msg, exp_driver)
+                if data is not None:
+                    self._respond(conn, data)
+                payload = conn.read_payload()
+        except Exception:
+            self._close(conn)
+
+    def _process(self, conn, msg, exp_driver):
+        """Handles a message and returns the framed response, or None if the
+        request is held as long-poll request."""
+        resp = self._handle_message(msg, exp_driver)
+        if resp.get("type") == "WAIT":
+            # check again under the lock, so no notification can be missed
+            with self._waiting_lock:
+                resp = self._handle_message(msg, exp_driver)
+                if resp.get("type") == "WAIT":
+                    timeout = min(msg["data"]["wait"], MAX_LONG_POLL_TIMEOUT)
+                    self._waiting[(msg["partition_id"], msg["type"])] = (
+                        conn,
+                        msg,
+                        time.time() + timeout,
+                    )
+                    return None
+        return self.frame(self.encode(resp))
+
+    def _notify_waiting(self, partition_id):
+        """Answers held requests of ``partition_id`` (or all held requests if
+        None) which can be completed now."""
+        exp_driver = self._exp_driver
+        wake_all = partition_id is None or getattr(exp_driver, "experiment_done", False)
+        # called from the driver thread, check under the lock as the server
+        # thread might be holding a request right now
+        with self._waiting_lock:
+            if not self._waiting:
+                return
+            for key in list(self._waiting.keys()):
+                if not wake_all and key[0] != partition_id:
+                    continue
+                conn, msg, _ = self._waiting[key]
+                resp = self._handle_message(msg, exp_driver)
+                if resp.get("type") != "WAIT":
+                    del self._waiting[key]
+                    self._push_response(conn, self.frame(self.encode(resp)))
+
+    def _expire_waiting(self):
+        """Answers held requests whose timeout expired.
+
+        :returns: Seconds until the next held request expires, at most one.
+        """
+        if not self._waiting:
+            return 1
+        now = time.time()
+        timeout = 1
+        with self._waiting_lock:
+            for key in list(self._waiting.keys()):
+                conn, msg, deadline = self._waiting[key]
+                if deadline <= now:
+                    del self._waiting[key]
+                    msg = dict(msg, data=None)  # answer without waiting
+                    resp = self._handle_message(msg, self._exp_driver)
+                    self._push_response(conn, self.frame(self.encode(resp)))
+                else:
+                    timeout = min(timeout, deadline - now)
+        return timeout
+
+    def _push_response(self, conn, data):
+        """Hands a response to the selector thread, None closes the
+        connection."""
+        self._responses.append((conn, data))
+        try:
+            self._wakeup_w.send(b"\0")
+        except OSError:
+            pass  # wake-up already pending or server stopped
+
+    def _drain_responses(self):
+        """Sends the responses prepared outside of the selector loop."""
+        try:
+            while self._wakeup_r.recv(BUFSIZE):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        while self._responses:
+            conn, data = self._responses.popleft()
+            if conn.closed:
+                continue
+            if data is None:
+                self._close(conn)
+            else:
+                self._respond(conn, data)
+
+    def _respond(self, conn, data):
+        """Queues a response and writes it without blocking the loop."""
+        conn.queue(data)
+        self._write(conn)
+
+    def _write(self, conn):
+        """Flushes a connection, only waiting for writability if needed."""
+        try:
+            flushed = conn.flush()
+        except OSError:
+            self._close(conn)
+            return
+        events = selectors.EVENT_READ
+        if not flushed:
+            events |= selectors.EVENT_WRITE
+        if self._selector.get_key(conn.sock).events != events:
+            self._selector.modify(conn.sock, events, conn)
+
     def stop(self):
         """
         Stop the server's socket listener.
@@ -302,15 +623,20 @@ class Server(MessageSocket):
 
 
 class OptimizationServer(Server):
-    """Implements the server for hyperparameter optimization and ablation."""
+    """Implements the server for hyperparameter optimization and ablation.
+
+    Executor membership is elastic: trials are scheduled as soon as the first
+    executor registers. Executors removed as departed by the driver are told
+    to stop and their results are dropped, since their trials run elsewhere.
+    """
 
     def __init__(self, num_executors: int):
         """Registers the callbacks for message handling.
 
-        :param num_executors: Number of Spark executors scheduled for the
+        :param num_executors: Maximum number of Spark executors of the
             experiment.
         """
-        super().__init__(num_executors)
+        super().__init__(num_executors, elastic=True)
         self.callback_list = [
             ("REG", self._register_callback),
             ("QUERY", self._query_callback),
@@ -345,19 +671,24 @@ class OptimizationServer(Server):
             exp_driver.add_message(msg)
         resp["type"] = "OK"
 
-    def _query_callback(self, resp: dict, *_: Any) -> None:
+    def _query_callback(self, resp: dict, msg: dict, *_: Any) -> None:
         """Query message callback.
 
         Checks if all executors have been registered successfully on the server.
         """
         resp["type"] = "QUERY"
         resp["data"] = self.reservations.done()
+        if not resp["data"] and _long_poll(msg):
+            resp["type"] = "WAIT"
 
     def _metric_callback(self, resp: dict, msg: dict, exp_driver: Driver) -> None:
         """Metric message callback.
 
         Determines if a trial should be stopped or not.
         """
+        if not self.reservations.touch(msg["partition_id"]):
+            resp["type"] = "GSTOP"
+            return
         exp_driver.add_message(msg)
         if msg["trial_id"] is None:
             resp["type"] = "OK"
@@ -374,25 +705,35 @@ class OptimizationServer(Server):
 
         Resets the reservation to avoid sending the trial again.
         """
-        self.reservations.assign_trial(msg["partition_id"], None)
         resp["type"] = "OK"
+        if not self.reservations.touch(msg["partition_id"]):
+            return
+        self.reservations.assign_trial(msg["partition_id"], None)
         # add metric msg to the exp driver queue
         exp_driver.add_message(msg)
 
     def _get_callback(self, resp: dict, msg: dict, exp_driver: Driver) -> None:
         # lookup reservation to find assigned trial
         trial_id = self.reservations.get_assigned_trial(msg["partition_id"])
+        departed = not self.reservations.touch(msg["partition_id"])
         # trial_id needs to be none because experiment_done can be true but
         # the assigned trial might not be finalized yet
-        if exp_driver.experiment_done and trial_id is None:
+        if departed or exp_driver.experiment_done and trial_id is None:
             resp["type"] = "GSTOP"
+        elif trial_id is None and _long_poll(msg):
+            # hold the request until a trial gets assigned
+            resp["type"] = "WAIT"
+            return
         else:
             resp["type"] = "TRIAL"
         resp["trial_id"] = trial_id
         # retrieve trial information
         if trial_id is not None:
-            resp["data"] = exp_driver.get_trial(trial_id).params
-            exp_driver.get_trial(trial_id).status = Trial.RUNNING
+            trial = exp_driver.get_trial(trial_id)
+            resp["data"] = trial.params
+            if trial.status == Trial.SCHEDULED and trial.start is not None:
+                exp_driver.dispatch_stats.record_assignment(time.time() - trial.start)
+            trial.status = Trial.RUNNING
         else:
             resp["data"] = None
 
@@ -482,13 +823,15 @@ class DistributedTrainingServer(Server):
         exp_driver.add_message(msg)
         resp["type"] = "OK"
 
-    def _query_callback(self, resp: dict, *_: Any) -> None:
+    def _query_callback(self, resp: dict, msg: dict, *_: Any) -> None:
         """Query message callback.
 
         Checks if all executors have been registered successfully on the server.
         """
         resp["type"] = "QUERY"
         resp["data"] = self.reservations.done()
+        if not resp["data"] and _long_poll(msg):
+            resp["type"] = "WAIT"
 
     def _final_callback(self, resp: dict, msg: dict, exp_driver: Driver) -> None:
         """Final message callback.
@@ -499,6 +842,12 @@ class DistributedTrainingServer(Server):
         exp_driver.add_message(msg)
 
 
+def _long_poll(msg: dict) -> bool:
+    """Returns True if the request asks the server to hold it."""
+    data = msg.get("data")
+    return isinstance(data, dict) and data.get("wait", 0) > 0
+
+
 class Client(MessageSocket):
     """Client to register and await node reservations.
 
@@ -533,10 +882,7 @@ class Client(MessageSocket):
 
         if msg_type == "FINAL" or msg_type == "METRIC":
             msg["trial_id"] = trial_id
-            if logs == "":
-                msg["logs"] = None
-            else:
-                msg["logs"] = logs
+            msg["logs"] = logbuffer.compress(logs, LOG_COMPRESS_SIZE)
         msg["data"] = msg_data
         done = False
         tries = 0
@@ -575,8 +921,9 @@ class Client(MessageSocket):
     def await_reservations(self):
         done = False
         while not done:
-            done = self._request(self.sock, "QUERY").get("data", False)
-            time.sleep(1)
+            done = self._request(self.sock, "QUERY", {"wait": LONG_POLL_TIMEOUT}).get(
+                "data", False
+            )
         print("All executors registered: {}".format(done))
         return done
 
@@ -585,8 +932,8 @@ class Client(MessageSocket):
             while not self.done:
                 backoff = True  # Allow to tolerate HB failure on shutdown (once)
                 with reporter.lock:
-                    metric, step, logs = reporter.get_data()
-                    data = {"value": metric, "step": step}
+                    data = self._metric_data(reporter)
+                    logs = data.pop("logs")
                     try:
                         resp = self._request(
                             self.hb_sock, "METRIC", data, reporter.get_trial_id(), logs
@@ -598,20 +945,37 @@ class Client(MessageSocket):
                             continue
                         raise OSError from err
                     self._handle_message(resp, reporter)
-                time.sleep(self.hb_interval)
+                reporter.wait_for_flush(self.hb_interval)
 
         threading.Thread(target=_heartbeat, args=(self, reporter), daemon=True).start()
         reporter.log("Started metric heartbeat", False)
 
+    @staticmethod
+    def _metric_data(reporter):
+        """Collects the latest metric, the buffered metric batch and the logs
+        of the reporter for a METRIC message."""
+        metric, step, logs = reporter.get_data()
+        steps, values = reporter.get_batch()
+        return {
+            "value": metric,
+            "step": step,
+            "steps": steps,
+            "values": values,
+            "logs": logs,
+        }
+
     def get_suggestion(self, reporter):
-        """Blocking call to get new parameter combination."""
+        """Blocking call to get new parameter combination.
+
+        The server holds the request until a trial is assigned or the long-poll
+        timeout expires.
+        """
         while not self.done:
-            resp = self._request(self.sock, "GET")
+            resp = self._request(self.sock, "GET", {"wait": LONG_POLL_TIMEOUT})
             trial_id, parameters = self._handle_message(resp, reporter) or (None, None)
 
             if trial_id is not None:
                 break
-            time.sleep(1)
         return trial_id, parameters
 
     def get_exec_config(self, timeout=60):
@@ -654,7 +1018,12 @@ class Client(MessageSocket):
         # make sure heartbeat thread can't send between sending final metric
         # and resetting the reporter
         with reporter.lock:
-            _, _, logs = reporter.get_data()
+            data = self._metric_data(reporter)
+            logs = data.pop("logs")
+            if len(data["steps"]) > 0:
+                # send metrics buffered since the last heartbeat
+                self._request(self.sock, "METRIC", data, reporter.get_trial_id(), logs)
+                logs = None
             resp = self._request(
                 self.sock, "FINAL", metric, reporter.get_trial_id(), logs
             )
@@ -0,0 +1,280 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""Runs the controller of an optimization experiment in a separate process.
+
+Fitting surrogate models holds the GIL for a long time, which delays the RPC
+server and the message digestion of the driver. With the suggestion service,
+the controller runs in a forked worker process and keeps a buffer of
+suggestions ready ahead of demand. The driver only takes ready suggestions
+and reports finalized trials, both without waiting for the controller.
+
+Suggestions are sampled ahead of time, so they might not use the results of
+the trials that finished most recently.
+"""
+
+import collections
+import multiprocessing
+import threading
+import traceback
+from typing import Callable, Optional
+
+from maggy.trial import Trial
+
+# fields of a finalized trial the controller gets from the driver
+FINAL_FIELDS = (
+    "status",
+    "early_stop",
+    "final_metric",
+    "metric_history",
+    "step_history",
+    "duration",
+    "info_dict",
+)
+
+# seconds until the worker samples again after the controller returned IDLE,
+# unless a trial is finalized before
+IDLE_RETRY_INTERVAL = 1.0
+
+
+class SuggestionService(object):
+    """Driver side of the worker process running the controller.
+
+    Messages are tuples of a type and data. The driver sends `FINAL` with the
+    fields of a finalized trial, `TAKEN` when it took a suggestion and `STOP`
+    at the end of the experiment. The worker sends `TRIAL` for every new
+    suggestion, `DONE` once the controller has no trials left and `ERROR` with
+    the traceback if the controller failed.
+    """
+
+    def __init__(self, controller, buffer_size: int):
+        """
+        :param controller: The initialized controller of the experiment. It
+            must not be used by the driver anymore once the service started.
+        :param buffer_size: Number of suggestions to keep ready.
+        """
+        if not buffer_size > 0:
+            raise ValueError("Suggestion buffer size has to be greater than zero!")
+        self.controller = controller
+        self.buffer_size = buffer_size
+        self._ready = collections.deque()
+        self._done = False
+        self._error = None
+        self._lock = threading.Lock()
+        self._conn = None
+        self._process = None
+        self._on_ready = None
+
+    def start(self, on_ready: Optional[Callable] = None) -> None:
+        """Forks the worker process and starts receiving its suggestions.
+
+        :param on_ready: Called without arguments when a suggestion becomes
+            ready while none were ready, or when the controller is finished or
+            failed.
+        """
+        self._on_ready = on_ready
+        # buffered log lines would be written by both processes
+        for logger in (self.controller, self.controller.pruner):
+            if logger is not None and logger.fd is not None:
+                logger.fd.flush()
+        conn, worker_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.get_context("fork").Process(
+            target=_serve,
+            args=(self.controller, worker_conn, self.buffer_size),
+            daemon=True,
+        )
+        self._process.start()
+        worker_conn.close()
+        self._conn = conn
+        threading.Thread(target=self._receive, daemon=True).start()
+
+    def _receive(self) -> None:
+        """Receives the messages of the worker until it exits."""
+        while True:
+            try:
+                msg_type, data = self._conn.recv()
+            except (EOFError, OSError):
+                with self._lock:
+                    notify = not self._done and self._error is None
+                    if notify:
+                        self._error = "The worker process exited."
+                if notify and self._on_ready is not None:
+                    self._on_ready()
+                break
+            with self._lock:
+                if msg_type == "TRIAL":
+                    # the driver only waits for suggestions if none are ready
+                    notify = not self._ready
+                    self._ready.append(_to_trial(data))
+                else:
+                    notify = True
+                    if msg_type == "DONE":
+                        self._done = True
+                    elif msg_type == "ERROR":
+                        self._error = data
+            if notify and self._on_ready is not None:
+                self._on_ready()
+
+    def get_suggestions(self, n: int) -> list:
+        """Takes up to `n` ready suggestions, without waiting for the worker.
+
+        :param n: Number of suggestions needed.
+
+        :raises RuntimeError: If the controller failed in the worker process.
+
+        :returns: Up to `n` trials, followed by "IDLE" if not enough
+            suggestions are ready yet or by None if the controller is finished,
+            like `AbstractOptimizer.get_suggestions()`.
+        """
+        with self._lock:
+            if self._error is not None:
+                raise RuntimeError(
+                    "The suggestion process failed:\n{}".format(self._error)
+                )
+            suggestions = []
+            while self._ready and len(suggestions) < n:
+                suggestions.append(self._ready.popleft())
+            if len(suggestions) < n:
+                suggestions.append(None if self._done else "IDLE")
+        if suggestions and isinstance(suggestions[0], Trial):
+            self._send("TAKEN", sum(isinstance(s, Trial) for s in suggestions))
+        return suggestions
+
+    def trial_finalized(self, trial: Trial) -> None:
+        """Reports a finalized trial to the controller.
+
+        :param trial: The finalized trial.
+        """
+        data = {field: getattr(trial, field) for field in FINAL_FIELDS}
+        data.update(_from_trial(trial))
+        self._send("FINAL", data)
+
+    def stop(self, timeout: float = 60) -> None:
+        """Finalizes the controller in the worker process and waits for it to
+        exit.
+
+        :param timeout: Seconds to wait before the worker is terminated.
+        """
+        if self._process is not None:
+            try:
+                self._send("STOP", None)
+            except OSError:
+                pass  # the worker already exited
+            self._process.join(timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._conn.close()
+            self._process = None
+        # the worker closed its own copies of the log files
+        for logger in (self.controller, self.controller.pruner):
+            if logger is not None and logger.fd is not None:
+                logger._close_log()
+
+    def _send(self, msg_type: str, data) -> None:
+        """Sends a message to the worker process."""
+        with self._lock:
+            self._conn.send((msg_type, data))
+
+
+def _from_trial(trial: Trial) -> dict:
+    """Returns the fields needed to create `trial` again in another process."""
+    return {
+        "trial_id": trial.trial_id,
+        "trial_type": trial.trial_type,
+        "params": trial.params,
+        "info_dict": trial.info_dict,
+    }
+
+
+def _to_trial(data: dict) -> Trial:
+    """Creates a trial from the fields of `_from_trial()`."""
+    trial = Trial(
+        data["params"], trial_type=data["trial_type"], info_dict=data["info_dict"]
+    )
+    trial.trial_id = data["trial_id"]
+    return trial
+
+
+def _serve(controller, conn, buffer_size: int) -> None:
+    """Main loop of the worker process.
+
+    Keeps `buffer_size` suggestions ready, sampled in batches with
+    `get_suggestions()`, and adds the finalized trials reported by the driver
+    to the final store of the controller before sampling again.
+
+    :param controller: The controller of the experiment.
+    :param conn: Connection to the driver.
+    :param buffer_size: Number of suggestions to keep ready.
+    """
+    num_ready = 0
+    done = False
+    idle = False
+    last_finalized = None
+    try:
+        while True:
+            can_sample = not done and num_ready < buffer_size
+            if can_sample:
+                timeout = IDLE_RETRY_INTERVAL if idle else 0
+            else:
+                timeout = None
+            if conn.poll(timeout):
+                msg_type, data = conn.recv()
+                if msg_type == "STOP":
+                    controller._finalize_experiment(controller.final_store)
+                    return
+                elif msg_type == "TAKEN":
+                    num_ready -= data
+                elif msg_type == "FINAL":
+                    last_finalized = _finalize(controller, data)
+                    idle = False
+                # apply all pending messages before sampling
+                continue
+            idle = False
+            for suggestion in controller.get_suggestions(
+                buffer_size - num_ready, last_finalized
+            ):
+                if isinstance(suggestion, Trial):
+                    controller.trial_store[suggestion.trial_id] = suggestion
+                    conn.send(("TRIAL", _from_trial(suggestion)))
+                    num_ready += 1
+                elif suggestion is None:
+                    done = True
+                    conn.send(("DONE", None))
+                else:
+                    idle = True
+            last_finalized = None
+    except Exception:  # pylint: disable=broad-except
+        conn.send(("ERROR", traceback.format_exc()))
+    finally:
+        conn.close()
+
+
+def _finalize(controller, data: dict) -> Trial:
+    """Moves a trial finalized by the driver to the final store of the
+    controller.
+
+    :param controller: The controller of the experiment.
+    :param data: The fields of the finalized trial.
+
+    :returns: The finalized trial.
+    """
+    trial = controller.trial_store.pop(data["trial_id"], None)
+    if trial is None:
+        trial = _to_trial(data)
+    for field in FINAL_FIELDS:
+        setattr(trial, field, data[field])
+    controller.final_store.append(trial)
+    return trial
@@ -0,0 +1,472 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""Binary encoding of the messages exchanged between driver and executors.
+
+Every encoded message starts with a fixed-width header of a two byte magic,
+the protocol version, the message type and the body layout. The frequent
+request shapes, i.e. polls carrying only the partition id and secret and
+heartbeats with a single metric, e.g. FINAL, use fixed struct layouts. Other messages
+of a known type are encoded as a list of (field id, value) pairs, values are
+tagged and struct packed. Values that cannot be represented, e.g. user
+defined objects, fall back to cloudpickle. Messages of unknown type are
+pickled as a whole.
+
+Arrays, e.g. the batched steps and values of metric heartbeats, are sent as
+raw little endian items. Arrays of integral numbers are delta-encoded instead:
+the tag is followed by the typecode of the array, the typecode of the deltas,
+the first item as 8 byte signed integer, the byte length of the deltas and
+the differences between consecutive items as little endian items of the
+narrowest signed type that fits all of them. Steps usually grow by a constant
+stride, so they take one byte per item instead of eight.
+"""
+
+import struct
+import sys
+from array import array
+from itertools import accumulate, chain
+from enum import IntEnum
+
+from pyspark import cloudpickle
+
+MAGIC = b"MG"
+VERSION = 2
+
+HEADER = struct.Struct(">2sBBB")
+FIELD = struct.Struct(">B")
+LENGTH = struct.Struct(">I")
+INT = struct.Struct(">q")
+FLOAT = struct.Struct(">d")
+
+INT_MIN = -(2**63)
+INT_MAX = 2**63 - 1
+
+
+class MsgType(IntEnum):
+    """Message types of requests and responses."""
+
+    PICKLE = 0  # whole message is pickled, no schema
+    REG = 1
+    QUERY = 2
+    METRIC = 3
+    FINAL = 4
+    GET = 5
+    LOG = 6
+    EXEC_CONFIG = 7
+    OK = 8
+    ERR = 9
+    STOP = 10
+    GSTOP = 11
+    TRIAL = 12
+
+
+class Layout(IntEnum):
+    """Body layouts of encoded messages."""
+
+    GENERIC = 0
+    POLL = 1  # partition_id, secret, long-poll wait
+    HEARTBEAT = 2  # partition_id, secret, trial_id, logs, float data
+
+
+class Field(IntEnum):
+    """Ids of the known message dictionary keys."""
+
+    PARTITION_ID = 0
+    SECRET = 1
+    TRIAL_ID = 2
+    LOGS = 3
+    DATA = 4
+    EX_LOGS = 5
+    NUM_TRIALS = 6
+    TO_DATE = 7
+    STOPPED = 8
+    METRIC = 9
+    OTHER = 255  # followed by the key as tagged value
+
+
+_TYPE_IDS = {msg_type.name: int(msg_type) for msg_type in MsgType}
+_TYPE_NAMES = {int(msg_type): msg_type.name for msg_type in MsgType}
+_FIELD_IDS = {field.name.lower(): field for field in Field if field != Field.OTHER}
+_FIELD_NAMES = {int(field): name for name, field in _FIELD_IDS.items()}
+
+# value tags
+_NONE = ord("N")
+_TRUE = ord("T")
+_FALSE = ord("F")
+_INT = ord("i")
+_FLOAT = ord("d")
+_STR = ord("s")
+_BYTES = ord("b")
+_LIST = ord("l")
+_TUPLE = ord("t")
+_DICT = ord("m")
+_PICKLE = ord("p")
+_ARRAY = ord("a")
+_DELTA = ord("D")
+
+_TAG_INT = struct.Struct(">Bq")
+_TAG_FLOAT = struct.Struct(">Bd")
+_TAG_LENGTH = struct.Struct(">BI")
+_TAG_ARRAY = struct.Struct(">BcI")
+_TAG_DELTA = struct.Struct(">BccqI")
+# signed typecodes of the deltas, from narrow to wide
+_DELTA_TYPECODES = "bhiq"
+
+# partition_id and long-poll wait, negative if data is None
+_POLL = struct.Struct(">id")
+_POLL_KEYS = frozenset(["partition_id", "type", "secret", "data"])
+# partition_id, flags, value, secret, trial_id and logs lengths
+_HEARTBEAT = struct.Struct(">iBdHHI")
+_HEARTBEAT_KEYS = frozenset(
+    ["partition_id", "type", "secret", "trial_id", "logs", "data"]
+)
+_HAS_TRIAL_ID = 1
+_HAS_LOGS = 2
+_DATA_FLOAT = 4
+_LOGS_BYTES = 8  # compressed logs
+
+
+def encode(msg: dict) -> bytes:
+    """Encodes a message dictionary.
+
+    :param msg: Message with a "type" key.
+
+    :returns: The encoded message.
+    """
+    msg_type = _TYPE_IDS.get(msg.get("type"), MsgType.PICKLE)
+    if msg_type == MsgType.PICKLE:
+        return HEADER.pack(MAGIC, VERSION, msg_type, Layout.GENERIC) + (
+            cloudpickle.dumps(msg)
+        )
+    body = _encode_fixed(msg, msg_type)
+    if body is not None:
+        return body
+
+    out = [
+        HEADER.pack(MAGIC, VERSION, msg_type, Layout.GENERIC),
+        LENGTH.pack(len(msg) - 1),
+    ]
+    for key, value in msg.items():
+        if key == "type":
+            continue
+        field = _FIELD_IDS.get(key, Field.OTHER)
+        out.append(FIELD.pack(field))
+        if field == Field.OTHER:
+            _encode_value(key, out)
+        _encode_value(value, out)
+    return b"".join(out)
+
+
+def decode(data) -> dict:
+    """Decodes a message encoded with `encode`.
+
+    :param data: Bytes-like object holding the encoded message.
+
+    :returns: The message dictionary.
+
+    :raises ValueError: If the data is not a message of this protocol version.
+    """
+    magic, version, msg_type, layout = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(
+            "Unsupported message protocol {}, version {}.".format(magic, version)
+        )
+    if msg_type == MsgType.PICKLE:
+        return cloudpickle.loads(memoryview(data)[HEADER.size :])
+
+    msg_type = _TYPE_NAMES[msg_type]
+    data = bytes(data)
+    if layout != Layout.GENERIC:
+        return _decode_fixed(data, msg_type, layout)
+    msg = {"type": msg_type}
+    (num_fields,) = LENGTH.unpack_from(data, HEADER.size)
+    offset = HEADER.size + LENGTH.size
+    for _ in range(num_fields):
+        field = data[offset]
+        offset += 1
+        if field == Field.OTHER:
+            key, offset = _decode_value(data, offset)
+        else:
+            key = _FIELD_NAMES[field]
+        msg[key], offset = _decode_value(data, offset)
+    return msg
+
+
+def _encode_fixed(msg: dict, msg_type: int):
+    """Encodes poll and heartbeat requests with their fixed layouts.
+
+    :returns: The encoded message or None if it does not fit a fixed layout.
+    """
+    keys = msg.keys()
+    if type(msg["partition_id"] if "partition_id" in msg else None) is not int:
+        return None
+    secret = msg.get("secret")
+    if type(secret) is not str:
+        return None
+    if keys == _POLL_KEYS:
+        data = msg["data"]
+        if data is None:
+            wait = -1.0
+        elif type(data) is dict and data.keys() == {"wait"}:
+            wait = data["wait"]
+            if type(wait) is not float or not wait >= 0:
+                return None
+        else:
+            return None
+        return b"".join(
+            [
+                HEADER.pack(MAGIC, VERSION, msg_type, Layout.POLL),
+                _POLL.pack(msg["partition_id"], wait),
+                secret.encode("utf-8"),
+            ]
+        )
+    if keys != _HEARTBEAT_KEYS:
+        return None
+    flags, value = 0, 0.0
+    trial_id, logs, data = msg["trial_id"], msg["logs"], msg["data"]
+    if type(trial_id) is str:
+        flags |= _HAS_TRIAL_ID
+        trial_id = trial_id.encode("utf-8")
+    elif trial_id is None:
+        trial_id = b""
+    else:
+        return None
+    if type(logs) is str:
+        flags |= _HAS_LOGS
+        logs = logs.encode("utf-8")
+    elif type(logs) is bytes:
+        flags |= _HAS_LOGS | _LOGS_BYTES
+    elif logs is None:
+        logs = b""
+    else:
+        return None
+    if type(data) is float:
+        flags |= _DATA_FLOAT
+        value = data
+    elif data is not None:
+        return None
+    secret = secret.encode("utf-8")
+    if len(secret) > 0xFFFF or len(trial_id) > 0xFFFF:
+        return None
+    return b"".join(
+        [
+            HEADER.pack(MAGIC, VERSION, msg_type, Layout.HEARTBEAT),
+            _HEARTBEAT.pack(
+                msg["partition_id"],
+                flags,
+                value,
+                len(secret),
+                len(trial_id),
+                len(logs),
+            ),
+            secret,
+            trial_id,
+            logs,
+        ]
+    )
+
+
+def _decode_fixed(data: bytes, msg_type: str, layout: int) -> dict:
+    """Decodes a message with a fixed layout."""
+    offset = HEADER.size
+    if layout == Layout.POLL:
+        partition_id, wait = _POLL.unpack_from(data, offset)
+        return {
+            "partition_id": partition_id,
+            "type": msg_type,
+            "secret": data[offset + _POLL.size :].decode("utf-8"),
+            "data": None if wait < 0 else {"wait": wait},
+        }
+    if layout != Layout.HEARTBEAT:
+        raise ValueError("Unknown message layout {}.".format(layout))
+    (
+        partition_id,
+        flags,
+        value,
+        len_secret,
+        len_trial_id,
+        len_logs,
+    ) = _HEARTBEAT.unpack_from(data, offset)
+    offset += _HEARTBEAT.size
+    secret = data[offset : offset + len_secret].decode("utf-8")
+    offset += len_secret
+    trial_id = None
+    if flags & _HAS_TRIAL_ID:
+        trial_id = data[offset : offset + len_trial_id].decode("utf-8")
+    offset += len_trial_id
+    logs = None
+    if flags & _HAS_LOGS:
+        logs = data[offset : offset + len_logs]
+        if not flags & _LOGS_BYTES:
+            logs = logs.decode("utf-8")
+    if flags & _DATA_FLOAT:
+        metric_data = value
+    else:
+        metric_data = None
+    return {
+        "partition_id": partition_id,
+        "type": msg_type,
+        "secret": secret,
+        "trial_id": trial_id,
+        "logs": logs,
+        "data": metric_data,
+    }
+
+
+def _encode_value(value, out: list) -> None:
+    """Appends the tagged encoding of `value` to `out`."""
+    value_type = type(value)
+    if value is None:
+        out.append(b"N")
+    elif value_type is bool:
+        out.append(b"T" if value else b"F")
+    elif value_type is int and INT_MIN <= value <= INT_MAX:
+        out.append(_TAG_INT.pack(_INT, value))
+    elif value_type is float:
+        out.append(_TAG_FLOAT.pack(_FLOAT, value))
+    elif value_type is str:
+        encoded = value.encode("utf-8")
+        out.append(_TAG_LENGTH.pack(_STR, len(encoded)))
+        out.append(encoded)
+    elif value_type is bytes:
+        out.append(_TAG_LENGTH.pack(_BYTES, len(value)))
+        out.append(value)
+    elif value_type is list or value_type is tuple:
+        out.append(
+            _TAG_LENGTH.pack(_LIST if value_type is list else _TUPLE, len(value))
+        )
+        for item in value:
+            _encode_value(item, out)
+    elif value_type is dict:
+        out.append(_TAG_LENGTH.pack(_DICT, len(value)))
+        for key, item in value.items():
+            _encode_value(key, out)
+            _encode_value(item, out)
+    elif value_type is array:
+        _encode_array(value, out)
+    else:
+        pickled = cloudpickle.dumps(value)
+        out.append(_TAG_LENGTH.pack(_PICKLE, len(pickled)))
+        out.append(pickled)
+
+
+def _encode_array(value: array, out: list) -> None:
+    """Appends the delta or raw encoding of the array `value` to `out`."""
+    deltas = _delta_encode(value) if len(value) > 1 else None
+    if deltas is not None:
+        raw = _little_endian(deltas).tobytes()
+        out.append(
+            _TAG_DELTA.pack(
+                _DELTA,
+                value.typecode.encode("ascii"),
+                deltas.typecode.encode("ascii"),
+                int(value[0]),
+                len(raw),
+            )
+        )
+        out.append(raw)
+        return
+    raw = _little_endian(value).tobytes()
+    out.append(_TAG_ARRAY.pack(_ARRAY, value.typecode.encode("ascii"), len(raw)))
+    out.append(raw)
+
+
+def _delta_encode(value: array):
+    """Returns the differences between consecutive items of `value` in the
+    narrowest signed array type, or None if the items are not integral."""
+    if value.typecode in "fd":
+        if not all(map(float.is_integer, value)):
+            return None
+    elif value.typecode not in "bBhHiIlLqQ":
+        return None
+    items = [int(item) for item in value]
+    if not INT_MIN <= items[0] <= INT_MAX:
+        return None
+    # e.g. -0.0 does not survive the round trip
+    if array(value.typecode, items).tobytes() != value.tobytes():
+        return None
+    deltas = [b - a for a, b in zip(items, items[1:])]
+    for typecode in _DELTA_TYPECODES:
+        try:
+            return array(typecode, deltas)
+        except OverflowError:
+            continue
+    return None
+
+
+def _little_endian(value: array) -> array:
+    """Swaps the items of `value` between the native and little endian byte
+    order, returns `value` itself on little endian machines."""
+    if sys.byteorder == "big":
+        value = array(value.typecode, value)
+        value.byteswap()
+    return value
+
+
+def _decode_value(data: bytes, offset: int):
+    """Decodes the tagged value at `offset`.
+
+    :returns: Tuple of the value and the offset after it.
+    """
+    tag = data[offset]
+    if tag == _STR:
+        (length,) = LENGTH.unpack_from(data, offset + 1)
+        offset += 1 + LENGTH.size
+        return data[offset : offset + length].decode("utf-8"), offset + length
+    if tag == _INT:
+        return INT.unpack_from(data, offset + 1)[0], offset + 1 + INT.size
+    if tag == _FLOAT:
+        return FLOAT.unpack_from(data, offset + 1)[0], offset + 1 + FLOAT.size
+    if tag == _ARRAY:
+        _, typecode, length = _TAG_ARRAY.unpack_from(data, offset)
+        offset += _TAG_ARRAY.size
+        value = array(typecode.decode("ascii"))
+        value.frombytes(data[offset : offset + length])
+        return _little_endian(value), offset + length
+    if tag == _DELTA:
+        _, typecode, delta_typecode, first, length = _TAG_DELTA.unpack_from(
+            data, offset
+        )
+        offset += _TAG_DELTA.size
+        deltas = array(delta_typecode.decode("ascii"))
+        deltas.frombytes(data[offset : offset + length])
+        items = accumulate(chain((first,), _little_endian(deltas)))
+        return array(typecode.decode("ascii"), items), offset + length
+    if tag == _NONE:
+        return None, offset + 1
+    if tag == _TRUE:
+        return True, offset + 1
+    if tag == _FALSE:
+        return False, offset + 1
+    (length,) = LENGTH.unpack_from(data, offset + 1)
+    offset += 1 + LENGTH.size
+    if tag == _DICT:
+        items = {}
+        for _ in range(length):
+            key, offset = _decode_value(data, offset)
+            items[key], offset = _decode_value(data, offset)
+        return items, offset
+    if tag == _LIST or tag == _TUPLE:
+        items = []
+        for _ in range(length):
+            item, offset = _decode_value(data, offset)
+            items.append(item)
+        return (items if tag == _LIST else tuple(items)), offset
+    if tag == _BYTES:
+        return data[offset : offset + length], offset + length
+    if tag == _PICKLE:
+        return cloudpickle.loads(data[offset : offset + length]), offset + length
+    raise ValueError("Unknown value tag {} in message.".format(tag))
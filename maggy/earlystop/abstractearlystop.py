@@ -40,3 +40,18 @@ class AbstractEarlyStop(ABC):
         :type direction: str
         """
         pass
+
+    def trial_finalized(self, trial, direction):  # noqa: B027
+        """Hook that is called internally every time a trial finalizes, before
+        the trial is used in `earlystop_check`.
+
+        Policies can override it to update an index of the finalized trials
+        incrementally instead of scanning all of them in every check. It is
+        not abstract on purpose, the default implementation does nothing.
+
+        :param trial: The finalized Trial object.
+        :type trial: Trial
+        :param direction: A string describing the search objective, i.e. 'min'
+        or 'max'.
+        :type direction: str
+        """
@@ -14,7 +14,10 @@
 #   limitations under the License.
 #
 
-import statistics
+import bisect
+
+import numpy as np
+
 from maggy.earlystop.abstractearlystop import AbstractEarlyStop
 
 
@@ -22,39 +25,75 @@ class MedianStoppingRule(AbstractEarlyStop):
     """The Median Stopping Rule implements the simple strategy of stopping a
     trial if its performance falls below the median of other trials at similar
     points in time.
+
+    The running averages of the finalized trials are indexed when they finalize:
+    for every step there is a sorted list of the averages of all finalized
+    trials that reached the step, computed with a prefix sum over the metric
+    history. A check therefore only looks up the median at the current step of
+    the trial instead of rescanning all finalized trials.
     """
 
-    @staticmethod
-    def earlystop_check(to_check, finalized_trials, direction):
+    def __init__(self):
+        # _averages[k] is the sorted list of the averages of the first k + 1 metrics
+        self._averages = []
+        self._n_indexed = 0
+        self._finalized_trials = None
+
+    def trial_finalized(self, trial, direction):
+        self._index(trial)
+        self._n_indexed += 1
+
+    def earlystop_check(self, to_check, finalized_trials, direction):
+
+        # index trials that were finalized without calling `trial_finalized`
+        self._sync(finalized_trials)
 
-        results = []
         median = None
 
         # count step from zero so it can be used as index for array
-        step = len(to_check.metric_history)
+        step = len(to_check.metric_array)
 
         if step > 0:
 
-            for fin_trial in finalized_trials:
-
-                if len(fin_trial.metric_history) >= step:
-                    avg = sum(fin_trial.metric_history[:step]) / float(step)
-                    results.append(avg)
-
-            try:
-                median = statistics.median(results)
-            except statistics.StatisticsError as e:
+            if step > len(self._averages) or not self._averages[step - 1]:
                 raise Exception(
-                    "Warning: StatisticsError when calling early stop method\n{}".format(
-                        e
-                    )
+                    "Warning: StatisticsError when calling early stop method\n"
+                    "no median for empty data"
                 )
+            median = MedianStoppingRule._median(self._averages[step - 1])
 
             if median is not None:
                 if direction == "max":
-                    if max(to_check.metric_history) < median:
+                    if max(to_check.metric_array) < median:
                         return to_check.trial_id
                 elif direction == "min":
-                    if min(to_check.metric_history) > median:
+                    if min(to_check.metric_array) > median:
                         return to_check.trial_id
             return None
+
+    def _sync(self, finalized_trials):
+        if (
+            finalized_trials is not self._finalized_trials
+            or len(finalized_trials) < self._n_indexed
+        ):
+            self._averages = []
+            self._n_indexed = 0
+            self._finalized_trials = finalized_trials
+        for trial in finalized_trials[self._n_indexed :]:
+            self._index(trial)
+        self._n_indexed = len(finalized_trials)
+
+    def _index(self, trial):
+        history = np.asarray(trial.metric_array, dtype=float)
+        averages = np.cumsum(history) / np.arange(1, len(history) + 1)
+        while len(self._averages) < len(averages):
+            self._averages.append([])
+        for step_averages, avg in zip(self._averages, averages.tolist()):
+            bisect.insort(step_averages, avg)
+
+    @staticmethod
+    def _median(values):
+        mid = len(values) // 2
+        if len(values) % 2 == 1:
+            return values[mid]
+        return (values[mid - 1] + values[mid]) / 2
@@ -26,7 +26,7 @@ provided information.
 import atexit
 import time
 from functools import singledispatch
-from typing import Callable
+from typing import Callable, Optional
 
 from maggy import util
 from maggy.core.environment.singleton import EnvSing
@@ -49,7 +49,9 @@ RUN_ID = 1
 EXPERIMENT_JSON = {}
 
 
-def lagom(train_fn: Callable, config: LagomConfig) -> dict:
+def lagom(
+    train_fn: Callable, config: LagomConfig, resume: Optional[str] = None
+) -> dict:
     """Launches a maggy experiment, which depending on 'config' can either
     be a hyperparameter optimization, an ablation study experiment or distributed
     training. Given a search space, objective and a model training procedure `train_fn`
@@ -61,6 +63,12 @@ def lagom(train_fn: Callable, config: LagomConfig) -> dict:
 
     :param train_fn: User defined experiment containing the model training.
     :param config: An experiment configuration. For more information, see experiment_config.
+    :param resume: Log directory of a previous run of the same hyperparameter
+        optimization to resume, e.g. after the driver failed. Finalized trials
+        of that run are restored instead of being run again.
+
+    :raises ValueError: If `resume` is given for an experiment that is not a
+        hyperparameter optimization.
 
     :returns: The experiment results as a dict.
     """
@@ -71,11 +79,17 @@ def lagom(train_fn: Callable, config: LagomConfig) -> dict:
     try:
         if RUNNING:
             raise RuntimeError("An experiment is currently running.")
+        if resume is not None and not isinstance(config, OptimizationConfig):
+            raise ValueError(
+                "Only hyperparameter optimization experiments can be resumed."
+            )
         RUNNING = True
         spark_context = util.find_spark().sparkContext
         APP_ID = str(spark_context.applicationId)
         APP_ID, RUN_ID = util.register_environment(APP_ID, RUN_ID)
         driver = lagom_driver(config, APP_ID, RUN_ID)
+        if resume is not None:
+            driver.resume(resume)
         return driver.run_experiment(train_fn)
     except:  # noqa: E722
         _exception_handler(util.seconds_to_milliseconds(time.time() - job_start))
@@ -61,6 +61,11 @@ class OptimizationConfig(LagomConfig):
         name: str = "HPOptimization",
         description: str = "",
         hb_interval: int = 1,
+        warm_start: Optional[Union[str, List[str]]] = None,
+        cache_dir: Optional[str] = None,
+        cache_version: str = "",
+        trials_per_executor: int = 1,
+        suggestion_buffer: int = 0,
     ):
         """Initializes HP optimization experiment parameters.
 
@@ -76,10 +81,27 @@ class OptimizationConfig(LagomConfig):
         :param name: Experiment name.
         :param description: A description of the experiment.
         :param hb_interval: Heartbeat interval with which the server is polling.
+        :param warm_start: Log directory or list of log directories of previous experiments. Their finalized trials
+            are added to the observations of the optimizer, trials that do not fit the searchspace are ignored.
+        :param cache_dir: Directory of a result cache shared between experiments, disabled if None. Trials whose
+            hparams were evaluated before with the same `cache_version` and `optimization_key` are not run again,
+            their cached results are used.
+        :param cache_version: Version tag of the training code and data, changing it invalidates the result cache.
+        :param trials_per_executor: Number of trials run at once on each Spark executor, each in its own process.
+            Useful for small models that do not use all cores of an executor.
+        :param suggestion_buffer: Number of suggestions the optimizer keeps ready in a separate process, so slow
+            model updates do not block the driver. Suggestions might not use the most recent results. If 0, the
+            optimizer runs in the driver process.
         """
         super().__init__(name, description, hb_interval)
         if not num_trials > 0:
             raise ValueError("Number of trials should be greater than zero!")
+        if not trials_per_executor > 0:
+            raise ValueError(
+                "Number of trials per executor should be greater than zero!"
+            )
+        if suggestion_buffer < 0:
+            raise ValueError("Suggestion buffer size should not be negative!")
         self.num_trials = num_trials
         self.optimizer = optimizer
         self.optimization_key = optimization_key
@@ -88,6 +110,13 @@ class OptimizationConfig(LagomConfig):
         self.es_policy = es_policy
         self.es_interval = es_interval
         self.es_min = es_min
+        if isinstance(warm_start, str):
+            warm_start = [warm_start]
+        self.warm_start = warm_start or []
+        self.cache_dir = cache_dir
+        self.cache_version = cache_version
+        self.trials_per_executor = trials_per_executor
+        self.suggestion_buffer = suggestion_buffer
 
 
 class AblationConfig(LagomConfig):
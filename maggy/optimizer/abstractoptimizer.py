@@ -21,17 +21,21 @@ from datetime import datetime
 import numpy as np
 
 from maggy.core.environment.singleton import EnvSing
+from maggy.optimizer.observations import ConfigIndex, ObservationStore
 from maggy.pruner import Hyperband
 from maggy.trial import Trial
 
 
 class AbstractOptimizer(ABC):
-    def __init__(self, pruner=None, pruner_kwargs=None):
+    def __init__(self, pruner=None, pruner_kwargs=None, seed=None):
         """
         :param pruner: name of pruning algorithm to use. So far only `hyperband` supported
         :type pruner: str
         :param pruner_kwargs: dict of arguments for initializing pruner. See pruner classes for reference.
         :type pruner_kwargs: dict
+        :param seed: seed of the random number generator that samples random configs. If None, the sampling is
+            seeded from the `random` module.
+        :type seed: int
         """
         self.searchspace = None
         self.num_trials = None
@@ -39,6 +43,19 @@ class AbstractOptimizer(ABC):
         self.final_store = None
         self.direction = None
         self.pruner = None
+        # columnar copy of the observations in `final_store`, see `get_observations()`
+        self.observations = ObservationStore()
+        # index of the configs of all trials, see `find_duplicate()`
+        self.config_index = None
+        self._n_final_indexed = 0
+        # trial of a resumed experiment that is replayed, see `replay_suggestion()`
+        self._replay_trial = None
+        # finalized trials of previous experiments, see `warm_start()`
+        self.prior_trials = []
+        # trials suggested so far in the current batch, see `get_suggestions()`
+        self._batch_trials = None
+        # generator for `Searchspace.get_random_parameter_values()`
+        self.rng = np.random.default_rng(seed) if seed is not None else None
 
         # configure pruner
         if pruner:
@@ -70,6 +87,59 @@ class AbstractOptimizer(ABC):
         """
         pass
 
+    def get_suggestions(self, n, trial=None):
+        """Return up to `n` suggestions for executors that are waiting at the same time
+
+        The suggestions are the results of `n` consecutive calls of `get_suggestion()`, only the first call gets the
+        finished `trial`. The list ends early with `None` or `"IDLE"` as soon as no more trials can be started. While
+        the batch is sampled, its trials count as busy (see `get_busy_trials()`), so optimizers can sample diverse
+        configs from one model fit.
+
+        :param n: number of waiting executors
+        :type n: int
+        :param trial: last finished trial by an executor
+        :type trial: Trial|None
+        :return: trials, possibly followed by `None` or `"IDLE"`
+        :rtype: list
+        """
+        suggestions = []
+        self._batch_trials = []
+        try:
+            while len(suggestions) < n:
+                suggestion = self.get_suggestion(None if suggestions else trial)
+                suggestions.append(suggestion)
+                if not isinstance(suggestion, Trial):
+                    break
+                self._batch_trials.append(suggestion)
+        finally:
+            self._batch_trials = None
+        return suggestions
+
+    def get_random_hparams(self):
+        """returns a random hparam config, sampled with the generator of the optimizer
+
+        :rtype: dict
+        """
+        return self.searchspace.get_random_parameter_values(1, rng=self.rng)[0]
+
+    def in_batch(self):
+        """returns True while a batch of suggestions is sampled, see `get_suggestions()`"""
+        return self._batch_trials is not None
+
+    def get_busy_trials(self):
+        """returns the trials that are currently evaluated, including the trials suggested before in the current batch
+
+        :rtype: list[Trial]
+        """
+        busy_trials = list(self.trial_store.values())
+        if self._batch_trials:
+            busy_trials += [
+                trial
+                for trial in self._batch_trials
+                if trial.trial_id not in self.trial_store
+            ]
+        return busy_trials
+
     @abstractmethod
     def finalize_experiment(self, trials):
         """
@@ -81,6 +151,89 @@ class AbstractOptimizer(ABC):
     def name(self):
         return str(self.__class__.__name__)
 
+    def replay_suggestion(self, trial, finished_trial=None):
+        """Replays the suggestion of `trial` when an experiment is resumed
+
+        Calls `get_suggestion()` like the experiment driver did when `trial` was created, but every trial the optimizer
+        creates with `new_trial()` is replaced by `trial`. This way, the optimizer and its pruner go through the same
+        state changes as in the resumed experiment, without sampling new hparams.
+
+        :param trial: trial that was created before the experiment was resumed
+        :type trial: Trial
+        :param finished_trial: last trial that finished before `trial` was created
+        :type finished_trial: Trial|None
+        :return: the suggestion of the optimizer, `trial` if the replay was successful
+        :rtype: Trial|str|None
+        """
+        self._replay_trial = trial
+        try:
+            return self.get_suggestion(finished_trial)
+        finally:
+            self._replay_trial = None
+
+    def warm_start(self, trials):
+        """Adds finalized trials of previous experiments to the observations of the optimizer
+
+        Has to be called after the searchspace is set and before the optimizer is initialized. Trials whose hparams are
+        not a point of the current searchspace are ignored. Trials with a budget only warm-start an optimizer with a
+        pruner and vice versa. The prior trials are used like the finalized trials of the experiment, e.g. to fit the
+        surrogate models or to detect duplicate configs, but do not count towards `num_trials`.
+
+        :param trials: finalized trials of previous experiments, e.g. loaded from their `trial.json` files
+        :type trials: list[Trial]
+        :return: number of trials that were ignored
+        :rtype: int
+        """
+        prior_trials = []
+        trial_ids = set()
+        for trial in trials:
+            # previous runs of the same config have the same trial id
+            if trial.trial_id in trial_ids:
+                continue
+            if trial.status != Trial.FINALIZED or trial.final_metric is None:
+                continue
+            params = {
+                name: value for name, value in trial.params.items() if name != "budget"
+            }
+            if ("budget" in trial.params) != bool(self.pruner):
+                continue
+            if not self.searchspace.contains_params(params):
+                continue
+            # observations are stored in the order of the searchspace
+            ordered_params = {name: params[name] for name in self.searchspace.keys()}
+            if self.pruner:
+                ordered_params["budget"] = trial.params["budget"]
+            trial.params = ordered_params
+            prior_trials.append(trial)
+            trial_ids.add(trial.trial_id)
+        self.prior_trials = prior_trials
+        return len(trials) - len(prior_trials)
+
+    def replaying(self):
+        """returns True while a suggestion is replayed, see `replay_suggestion()`"""
+        return self._replay_trial is not None
+
+    def new_trial(self, params, info_dict=None):
+        """returns a new Trial with `params`, or the replayed trial if the experiment is resumed
+
+        :param params: hparams of the trial
+        :type params: dict
+        :param info_dict: additional information about the trial, see `create_trial()`
+        :type info_dict: dict
+        :rtype: Trial
+        """
+        if self._replay_trial is not None:
+            if self._replay_trial.params.get("budget") != params.get("budget"):
+                self._log(
+                    "WARNING replayed trial {} has budget {}, expected {}".format(
+                        self._replay_trial.trial_id,
+                        self._replay_trial.params.get("budget"),
+                        params.get("budget"),
+                    )
+                )
+            return self._replay_trial
+        return Trial(params, trial_type="optimization", info_dict=info_dict)
+
     def _initialize_logger(self, exp_dir):
         """Initialize logger of optimizer
 
@@ -128,11 +281,28 @@ class AbstractOptimizer(ABC):
             msg = datetime.now().isoformat() + ": " + str(msg)
             self.fd.write(EnvSing.get_instance().str_or_byte(msg + "\n"))
 
+    def _shutdown(self):
+        """Closes the logs of the optimizer and its pruner if the experiment
+        failed, without finalizing it. Optimizers holding resources, e.g.
+        worker pools, release them here as well."""
+        self._close_log()
+        if self.pruner:
+            self.pruner._close_log()
+
     def _close_log(self):
         if not self.fd.closed:
             self.fd.flush()
             self.fd.close()
 
+    def get_observations(self):
+        """returns the observation store, synced with the prior trials and the trials finalized so far
+
+        :rtype: ObservationStore
+        """
+        return self.observations.sync(
+            self.final_store, self.direction, self.searchspace, self.prior_trials
+        )
+
     def get_hparams_dict(self, trial_ids="all"):
         """returns dict of hparams of finished trials with `trial_id` as key and hparams dict as value
 
@@ -142,46 +312,22 @@ class AbstractOptimizer(ABC):
         :return: dict of trial_ids and hparams. Example: {`trial_id1`: `hparam_dict1`, ... , `trial_idn`: `hparam_dictn`}
         :rtype: dict
         """
-        # return trials with specified trial_ids or return all trials
-        include_trial = (
-            lambda x: x == trial_ids or x in trial_ids or trial_ids == "all"
-        )  # noqa: E731
-
-        hparam_dict = {
-            trial.trial_id: trial.params
-            for trial in self.final_store
-            if include_trial(trial.trial_id)
-        }
-
-        return hparam_dict
+        trials = self._get_finalized_trials(trial_ids)
+        return {trial.trial_id: trial.params for trial in trials}
 
     def get_hparams_array(self, budget=0):
         """returns array of hparams that were evaluated with `budget`
 
-        The order of the returned hparams is the same as in `final_store`
+        The order of the returned hparams is the same as in `final_store`, preceded by the prior trials
 
         :param budget: budget of trials to return
         :type budget: int
-        :return: array of hparams, shape (n_finalized_trials, n_hparams)
+        :return: read-only array of hparams, shape (n_finalized_trials, n_hparams)
         :rtype: np.ndarray[np.ndarray]
 
         # todo when budget becomes attr of Trial object ( and not part of params anymore ) adapt
         """
-
-        include_trial = lambda x: x == budget  # noqa: E731
-
-        hparams = np.array(
-            [
-                self.searchspace.dict_to_list(trial.params)
-                for trial in self.final_store
-                # include trials with given budget or include all trials if no budget is given
-                if budget == 0
-                or budget is None
-                or include_trial(trial.params["budget"])
-            ]
-        )
-
-        return hparams
+        return self.get_observations().hparams(budget=budget)
 
     def get_metrics_dict(self, trial_ids="all"):
         """returns dict of final metrics with `trial_id` as key and final metric as value
@@ -199,23 +345,15 @@ class AbstractOptimizer(ABC):
         else:
             metric_multiplier = 1
 
-        # return trials with specified trial_ids or return all trials
-        include_trial = (
-            lambda x: x == trial_ids or x in trial_ids or trial_ids == "all"
-        )  # noqa: E731
-
-        metrics = {
-            trial.trial_id: trial.final_metric * metric_multiplier
-            for trial in self.final_store
-            if include_trial(trial.trial_id)
+        trials = self._get_finalized_trials(trial_ids)
+        return {
+            trial.trial_id: trial.final_metric * metric_multiplier for trial in trials
         }
 
-        return metrics
-
     def get_metrics_array(self, budget=0, interim_metrics=False):
         """returns final metrics or metric histories of trials that were run with `budget`
 
-        The order of the returned metrics is the same as in `final_store`
+        The order of the returned metrics is the same as in `final_store`, preceded by the prior trials
 
         In case that the optimization `direction` is `max`, negate the metrics so it becomes a `min` problem
 
@@ -223,26 +361,22 @@ class AbstractOptimizer(ABC):
         :type budget: int
         :param interim_metrics: If true return metric histories, Else return final metrics
         :type interim_metrics: bool
-        :return: array of final metrics; shape (n_finalized_trials,) or
+        :return: array of final metrics (read-only); shape (n_finalized_trials,) or
                  array of arrays of metric histories; shape (n_finalized_trials, max budget) if all trials were trained
                  on max budget, else (n_finalized_trials,) → ragged array
         :rtype: np.ndarray[float|np.ndarray]
         """
+        if not interim_metrics:
+            return self.get_observations().metrics(budget=budget)
 
         include_trial = lambda x: x == budget  # noqa: E731
 
         metrics = []
-        for trial in self.final_store:
+        for trial in self.get_observations().trials().values():
             # include trials with given budget or include all trials if no budget is given
             if budget == 0 or budget is None or include_trial(trial.params["budget"]):
-                if interim_metrics:
-                    # append whole metric history of trial, note the conversion to np.array
-                    m = np.array(trial.metric_history)
-                else:
-                    # append final metric of trial
-                    m = trial.final_metric
-
-                metrics.append(m)
+                # append whole metric history of trial, note the conversion to np.array
+                metrics.append(np.array(trial.metric_array))
 
         metrics = np.array(metrics)
 
@@ -251,6 +385,15 @@ class AbstractOptimizer(ABC):
 
         return metrics
 
+    def _get_finalized_trials(self, trial_ids="all"):
+        """returns finalized trials with `trial_ids`, or all of them if `trial_ids` is `all`"""
+        trials = self.get_observations().trials()
+        if trial_ids == "all":
+            return list(trials.values())
+        if isinstance(trial_ids, str):
+            trial_ids = [trial_ids]
+        return [trials[trial_id] for trial_id in trial_ids if trial_id in trials]
+
     def hparams_exist(self, trial):
         """Checks if Trial with hparams and budget has already been started
 
@@ -260,39 +403,61 @@ class AbstractOptimizer(ABC):
         :rtype: bool
 
         """
-
-        def remove_budget(trial_params):
-            """In multi fidelity setting budget is added as key to trial.params.
-            Needs to be removed here to compare actual params defined in search space
-            """
-            return dict(
-                (k, trial_params[k])
-                for k in self.searchspace.keys()
-                if k in trial_params
+        duplicate_id = self.find_duplicate(trial)
+        if duplicate_id is None:
+            return False
+
+        if duplicate_id in self.trial_store or any(
+            busy_trial.trial_id == duplicate_id
+            for busy_trial in self._batch_trials or []
+        ):
+            self._log(
+                "WARNING Duplicate Config: Hparams {} are equal to currently evaluating Trial: {}".format(
+                    trial.params, duplicate_id
+                )
             )
+        else:
+            self._log(
+                "WARNING Duplicate Config: Hparams {} are equal to params of finished trial: {}".format(
+                    trial.params, duplicate_id
+                )
+            )
+        return True
+
+    def find_duplicate(self, trial):
+        """Returns the id of a started trial with the same hparams as `trial`, ignoring the budget
 
-        # check in finished trials
+        :param trial: trial instance to validate
+        :type trial: Trial
+        :return: trial_id of the trial with the same hparams or None
+        :rtype: str|None
+        """
         # todo when budget becomes attr of Trial object ( and not part of params anymore ), adapt the comparison
-        for idx, finished_trial in enumerate(self.final_store):
-            if remove_budget(trial.params) == remove_budget(finished_trial.params):
-                self._log(
-                    "WARNING Duplicate Config: Hparams {} are equal to params of finished trial no. {}: {}".format(
-                        trial.params, idx, finished_trial.trial_id
-                    )
-                )
-                return True
+        self._sync_config_index()
+        return self.config_index.get(trial.params)
 
-        # check in currently evaluating trials
-        for trial_id, busy_trial in self.trial_store.items():
-            if remove_budget(trial.params) == remove_budget(busy_trial.params):
-                self._log(
-                    "WARNING Duplicate Config: Hparams {} are equal to currently evaluating Trial: {}".format(
-                        trial.params, busy_trial.trial_id
-                    )
-                )
-                return True
+    def register_trial(self, trial):
+        """Adds the hparams of a trial that is handed out to the driver to the duplicate index
 
-        return False
+        :param trial: trial that will be evaluated
+        :type trial: Trial
+        """
+        self._sync_config_index()
+        self.config_index.add(trial)
+
+    def _sync_config_index(self):
+        """indexes trials that were finalized since the last call"""
+        if self.config_index is None:
+            self.config_index = ConfigIndex(self.searchspace)
+            for prior_trial in self.prior_trials:
+                self.config_index.add(prior_trial)
+            # trials handed out before the index existed
+            for busy_trial in (self.trial_store or {}).values():
+                self.config_index.add(busy_trial)
+        if self.final_store:
+            for finished_trial in self.final_store[self._n_final_indexed :]:
+                self.config_index.add(finished_trial)
+            self._n_final_indexed = len(self.final_store)
 
     def init_pruner(self, pruner, pruner_kwargs):
         """intializes pruner
@@ -373,7 +538,7 @@ class AbstractOptimizer(ABC):
         if run_budget > 0:
             hparams["budget"] = run_budget
 
-        return Trial(hparams, trial_type="optimization", info_dict=trial_info_dict)
+        return self.new_trial(hparams, info_dict=trial_info_dict)
 
     def get_max_budget(self):
         """returns maxmimum budget of experiment
@@ -381,8 +546,8 @@ class AbstractOptimizer(ABC):
         i.e. maximum of all trials in the experiment
 
         If optimizer uses a pruner, max budget can be retrieved directly from pruner,
-        Else use metric history of first finalized trial. It will be always trained with max budget in single fidelity
-        setting
+        Else use metric history of first finalized trial, or of the first prior trial. It will be always trained with
+        max budget in single fidelity setting
 
         :return: maxmimum budget of experiment
         :rtype: int
@@ -391,13 +556,14 @@ class AbstractOptimizer(ABC):
         if self.pruner:
             return self.pruner.max_budget
         else:
-            if len(self.final_store) == 0:
+            trials = self.final_store or self.prior_trials
+            if len(trials) == 0:
                 raise ValueError(
                     "At least one finalized Trial is necessary to calculate max budget"
                 )
 
             # first finalized trial is always evaluated on max budget
-            return len(self.final_store[0].metric_history)
+            return len(trials[0].metric_array)
 
     def ybest(self, budget=0):
         """Returns best metric of all currently finalized trials
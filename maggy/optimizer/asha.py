@@ -17,6 +17,7 @@
 import math
 
 from maggy.optimizer.abstractoptimizer import AbstractOptimizer
+from maggy.pruner.leaderboard import Leaderboard
 from maggy.trial import Trial
 
 
@@ -36,8 +37,8 @@ class Asha(AbstractOptimizer):
     >>> experiment.lagom(..., optimizer=asha, ...)
     """
 
-    def __init__(self, reduction_factor=2, resource_min=1, resource_max=4):
-        super().__init__()
+    def __init__(self, reduction_factor=2, resource_min=1, resource_max=4, seed=None):
+        super().__init__(seed=seed)
 
         if reduction_factor < 2 or not isinstance(reduction_factor, int):
             raise Exception(
@@ -74,6 +75,12 @@ class Asha(AbstractOptimizer):
         self.rungs = {0: []}
         # maps rung index k to trial ids of trials that were promoted
         self.promoted = {0: []}
+        # maps rung index k to the leaderboard of finalized trials in that rung
+        self.leaderboards = {0: Leaderboard(self.direction)}
+        # maps rung index k to trials in that rung that have not finalized yet
+        self.pending = {0: []}
+        # maps trial ids of finalized trials to trials
+        self.finalized = {}
 
         self.max_rung = int(
             math.floor(
@@ -91,79 +98,81 @@ class Asha(AbstractOptimizer):
                 # return None to signal end to experiment driver
                 return None
 
+            self._update_leaderboards()
+
             # for each rung
             for k in range(self.max_rung - 1, -1, -1):
                 # if rung doesn't exist yet go one lower
                 if k not in self.rungs:
                     continue
 
-                # get top_k
-                rung_finished = len(
-                    [x for x in self.rungs[k] if x.status == Trial.FINALIZED]
-                )
-
-                if (rung_finished // self.reduction_factor) - len(
-                    self.promoted.get(k, [])
-                ) > 0:
-                    candidates = self._top_k(
-                        k, (rung_finished // self.reduction_factor)
-                    )
-                else:
-                    candidates = []
+                # promote best trial of the top 1/reduction_factor of the rung that hasn't been promoted yet
+                old_trial = self._promote(k)
 
                 # if there are no candidates, check one rung below
-                if not candidates:
+                if old_trial is None:
                     continue
 
-                # select all that haven't been promoted yet
-                promotable = [
-                    t for t in candidates if t.trial_id not in self.promoted.get(k, [])
-                ]
-
-                nr_promotable = len(promotable)
-                if nr_promotable >= 1:
-                    new_rung = k + 1
-                    # sorted in decending order, take highest -> index 0
-                    old_trial = promotable[0]
-                    # make copy of params to be able to change resource
-                    params = old_trial.params.copy()
-                    params["budget"] = self.resource_min * (
-                        self.reduction_factor ** new_rung
-                    )
-                    promote_trial = Trial(params)
-
-                    # open new rung if not exists
-                    if new_rung in self.rungs:
-                        self.rungs[new_rung].append(promote_trial)
-                    else:
-                        self.rungs[new_rung] = [promote_trial]
-
-                    # remember promoted trial
-                    if k in self.promoted:
-                        self.promoted[k].append(old_trial.trial_id)
-                    else:
-                        self.promoted[k] = [old_trial.trial_id]
-
-                    return promote_trial
+                new_rung = k + 1
+                # make copy of params to be able to change resource
+                params = old_trial.params.copy()
+                params["budget"] = self.resource_min * (
+                    self.reduction_factor ** new_rung
+                )
+                promote_trial = self.new_trial(params)
+
+                # open new rung if not exists
+                if new_rung not in self.rungs:
+                    self.rungs[new_rung] = []
+                    self.leaderboards[new_rung] = Leaderboard(self.direction)
+                    self.pending[new_rung] = []
+                self.rungs[new_rung].append(promote_trial)
+                self.pending[new_rung].append(promote_trial)
+
+                return promote_trial
 
         # else return random configuration in base rung
-        params = self.searchspace.get_random_parameter_values(1)[0]
+        params = self.get_random_hparams()
         # set resource to minimum
         params["budget"] = self.resource_min
-        to_return = Trial(params)
+        to_return = self.new_trial(params)
         # add to bottom rung
         self.rungs[0].append(to_return)
+        self.pending[0].append(to_return)
         return to_return
 
     def finalize_experiment(self, trials):
         return
 
-    def _top_k(self, rung_k, number):
-        """Find top-`number` trials in `rung_k`."""
-        if number > 0:
-            filtered = [x for x in self.rungs[rung_k] if x.status == Trial.FINALIZED]
-            filtered.sort(key=lambda x: x.final_metric, reverse=True)
-            # return top k trials if finalized
-            return filtered[:number]
+    def _update_leaderboards(self):
+        """Move trials that finalized since the last call to the leaderboard of their rung."""
+        for k, pending in self.pending.items():
+            still_pending = []
+            for x in pending:
+                if x.status == Trial.FINALIZED:
+                    self.leaderboards[k].add(x.trial_id, x.final_metric)
+                    self.finalized[x.trial_id] = x
+                else:
+                    still_pending.append(x)
+            self.pending[k] = still_pending
+
+    def _promote(self, rung_k):
+        """Find the best trial of the top 1/`reduction_factor` trials in `rung_k` that wasn't promoted yet and mark
+        it as promoted. Returns None if there is no such trial."""
+        leaderboard = self.leaderboards[rung_k]
+        number = len(leaderboard) // self.reduction_factor
+        if number - len(self.promoted.get(rung_k, [])) <= 0:
+            return None
+
+        trial_id = leaderboard.promotion_candidate(number)
+        if trial_id is None:
+            return None
+
+        # remember promoted trial
+        leaderboard.promote(trial_id)
+        if rung_k in self.promoted:
+            self.promoted[rung_k].append(trial_id)
         else:
-            return []
+            self.promoted[rung_k] = [trial_id]
+
+        return self.finalized[trial_id]
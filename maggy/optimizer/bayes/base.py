@@ -21,6 +21,7 @@ from abc import abstractmethod
 import numpy as np
 
 from maggy.optimizer.abstractoptimizer import AbstractOptimizer
+from maggy.searchspace import Searchspace
 
 
 class BaseAsyncBO(AbstractOptimizer):
@@ -91,6 +92,7 @@ class BaseAsyncBO(AbstractOptimizer):
         random_fraction=0.33,
         interim_results=False,
         interim_results_interval=10,
+        warmup_sampling="random",
         **kwargs
     ):
         """
@@ -116,24 +118,28 @@ class BaseAsyncBO(AbstractOptimizer):
         :param interim_results_interval: Specifies which interim metrics are used (if interim_results==True)
                                          e.g. interval=10: the metric of every 10th epoch is used for fitting surrogate
         :type interim_results_interval: int
+        :param warmup_sampling: how the warmup configs are sampled, `random`, or `halton` and `lhs` for a space-filling
+                                design. See `Searchspace.SAMPLING_METHODS`
+        :type warmup_sampling: str
         """
         super().__init__(**kwargs)
 
         # configure warmup routine
         self.num_warmup_trials = num_warmup_trials
-        self.warmup_sampling = "random"
+        self.warmup_sampling = warmup_sampling
         self.warmup_configs = []  # keeps track of warmup warmup configs
 
-        allowed_warmup_sampling_methods = ["random"]
-        if self.warmup_sampling not in allowed_warmup_sampling_methods:
+        if self.warmup_sampling not in Searchspace.SAMPLING_METHODS:
             raise ValueError(
                 "expected warmup_sampling to be in {}, got {}".format(
-                    allowed_warmup_sampling_methods, self.warmup_sampling
+                    Searchspace.SAMPLING_METHODS, self.warmup_sampling
                 )
             )
 
         # surrogate model related aruments
         self.models = {}  # fitted model of the estimator
+        # budgets whose model was updated in the current batch
+        self._batch_budgets = set()
         self.random_fraction = random_fraction
         self.interim_results = interim_results
         self.interim_results_interval = interim_results_interval
@@ -167,6 +173,19 @@ class BaseAsyncBO(AbstractOptimizer):
         self.warmup_routine()
         self.init_model()
 
+    def get_suggestions(self, n, trial=None):
+        """Return up to `n` suggestions, sampled from one model update
+
+        Within a batch, the model of a budget is only updated once. Only with `impute` as async strategy, the
+        posterior is updated for every suggestion with a liar for the trials of the batch (constant liar), which does
+        not re-optimize the kernel hyperparameters. TPE and asynchronous thompson sampling get diverse suggestions
+        from the randomness of their sampling.
+
+        See docstring of `AbstractOptimizer.get_suggestions()` for more info
+        """
+        self._batch_budgets = set()
+        return super().get_suggestions(n, trial)
+
     def get_suggestion(self, trial=None):
         self._log("### start get_suggestion ###")
         self.sampling_time_start = time.time()
@@ -217,6 +236,7 @@ class BaseAsyncBO(AbstractOptimizer):
                         parent_trial_id, next_trial.trial_id, next_trial.params
                     )
                 )
+                self.register_trial(next_trial)
                 return next_trial
             else:
                 # start sampling procedure with given budget
@@ -239,9 +259,15 @@ class BaseAsyncBO(AbstractOptimizer):
                 run_budget=run_budget,
             )
 
-        elif np.random.rand() < self.random_fraction:
+        elif self.replaying():
+            # the experiment is resumed, `create_trial` returns the replayed trial, there is no need to sample
+            next_trial = self.create_trial(
+                hparams={}, sample_type="random", run_budget=run_budget
+            )
+
+        elif (self.rng or np.random).random() < self.random_fraction:
             # random fraction applies, sample randomly
-            hparams = self.searchspace.get_random_parameter_values(1)[0]
+            hparams = self.get_random_hparams()
             next_trial = self.create_trial(
                 hparams=hparams, sample_type="random", run_budget=run_budget
             )
@@ -251,13 +277,13 @@ class BaseAsyncBO(AbstractOptimizer):
             if self.pruner and not self.interim_results:
                 # skip model building if we already have a bigger model
                 if max(list(self.models.keys()) + [-np.inf]) <= model_budget:
-                    self.update_model(model_budget)
+                    self._update_model_once(model_budget)
             else:
-                self.update_model(model_budget)
+                self._update_model_once(model_budget)
 
             if not self.models:
                 # in case there is no model yet, sample randomly
-                hparams = self.searchspace.get_random_parameter_values(1)[0]
+                hparams = self.get_random_hparams()
                 next_trial = self.create_trial(
                     hparams=hparams, sample_type="random", run_budget=run_budget
                 )
@@ -289,7 +315,7 @@ class BaseAsyncBO(AbstractOptimizer):
         i = 0
         while self.hparams_exist(trial=next_trial):
             self._log("sample randomly to encourage exploration")
-            hparams = self.searchspace.get_random_parameter_values(1)[0]
+            hparams = self.get_random_hparams()
             next_trial = self.create_trial(
                 hparams=hparams, sample_type="random_forced", run_budget=run_budget
             )
@@ -310,6 +336,7 @@ class BaseAsyncBO(AbstractOptimizer):
                 next_trial.trial_id, next_trial.params, next_trial.info_dict
             )
         )
+        self.register_trial(next_trial)
         return next_trial
 
     def finalize_experiment(self, trials):
@@ -358,22 +385,41 @@ class BaseAsyncBO(AbstractOptimizer):
         """
         raise NotImplementedError
 
+    def _update_model_once(self, budget=0):
+        """updates the model of `budget`, but only once per batch of suggestions unless busy locations are imputed
+
+        :param budget: the budget for which model should be updated
+        :type budget: int
+        """
+        if (
+            self.in_batch()
+            and budget in self._batch_budgets
+            and not self.include_busy_locations()
+        ):
+            self._log("use model with budget {} of the current batch".format(budget))
+            return
+        self.update_model(budget)
+        if self.in_batch():
+            self._batch_budgets.add(budget)
+
     def warmup_routine(self):
         """implements logic for warming up bayesian optimization through random sampling by adding hparam configs to
         `warmup_config` list
+
+        Trials of previous experiments that warm-start the optimizer replace warmup configs, see `warm_start()`
         """
 
         # generate warmup hparam configs
-        if self.warmup_sampling == "random":
-            self.warmup_configs = self.searchspace.get_random_parameter_values(
-                self.num_warmup_trials
-            )
-        else:
-            raise NotImplementedError(
-                "warmup sampling {} doesnt exist, use random".format(
-                    self.warmup_sampling
+        num_warmup_trials = max(self.num_warmup_trials - len(self.prior_trials), 0)
+        if self.prior_trials:
+            self._log(
+                "warm-started with {} prior trials, {} warmup trials remaining".format(
+                    len(self.prior_trials), num_warmup_trials
                 )
             )
+        self.warmup_configs = self.searchspace.get_random_parameter_values(
+            num_warmup_trials, rng=self.rng, method=self.warmup_sampling
+        )
 
     def _experiment_finished(self):
         """checks if experiment is finished
@@ -416,7 +462,7 @@ class BaseAsyncBO(AbstractOptimizer):
         hparams_busy = np.array(
             [
                 self.searchspace.dict_to_list(trial.params)
-                for trial_id, trial in self.trial_store.items()
+                for trial in self.get_busy_trials()
                 if trial.info_dict["sample_type"] == "model"
                 and trial.info_dict["model_budget"] == budget
             ]
@@ -441,7 +487,7 @@ class BaseAsyncBO(AbstractOptimizer):
             )
 
         metrics_busy = np.empty(0, dtype=float)
-        for trial_id, trial in self.trial_store.items():
+        for trial in self.get_busy_trials():
             if (
                 trial.info_dict["sample_type"] == "model"
                 and trial.info_dict["model_budget"] == budget
@@ -495,9 +541,13 @@ class BaseAsyncBO(AbstractOptimizer):
         if not interim_results:
             # return final metrics only
 
-            # get hparams and final metrics of finalized trials
-            hparams = self.get_hparams_array(budget=budget)
-            metrics = self.get_metrics_array(budget=budget, interim_metrics=False)
+            # get transformed hparams and final metrics of finalized trials
+            # note that through transform, budget param gets ommited from hparams if it was existent (pruner)
+            observations = self.get_observations()
+            hparams_transform = observations.transformed_hparams(
+                budget=budget, normalize_categorical=self.normalize_categorical
+            )
+            metrics = observations.metrics(budget=budget)
 
             # if async strategy is `impute`
             if self.include_busy_locations():
@@ -514,18 +564,15 @@ class BaseAsyncBO(AbstractOptimizer):
                 )
                 # append to hparams and metrics
                 if len(hparams_busy) > 0:
-                    hparams = np.concatenate((hparams, hparams_busy))
+                    busy_transform = self.searchspace.transform_batch(
+                        hparams_busy,
+                        normalize_categorical=self.normalize_categorical,
+                    )
+                    hparams_transform = np.concatenate(
+                        (hparams_transform, busy_transform)
+                    )
                     metrics = np.concatenate((metrics, imputed_metrics))
 
-            # transform hparams
-            # note that through transform, budget param gets ommited from hparams if it was existent (pruner)
-            hparams_transform = np.apply_along_axis(
-                self.searchspace.transform,
-                1,
-                hparams,
-                normalize_categorical=self.normalize_categorical,
-            )
-
             X = hparams_transform
             y = metrics
 
@@ -539,13 +586,9 @@ class BaseAsyncBO(AbstractOptimizer):
             # return interim results and hparams augumented with budget
             # return every nth interim result according to interim_results_interval. always return first and last result
 
-            # get and transform hparams of all finalized trials
-            hparams = self.get_hparams_array(budget=budget)
-            hparams_transform = np.apply_along_axis(
-                self.searchspace.transform,
-                1,
-                hparams,
-                normalize_categorical=self.normalize_categorical,
+            # get transformed hparams of all finalized trials
+            hparams_transform = self.get_observations().transformed_hparams(
+                budget=budget, normalize_categorical=self.normalize_categorical
             )
 
             # get full metric history for all finalized trials
@@ -614,9 +657,7 @@ class BaseAsyncBO(AbstractOptimizer):
 
                 if len(hparams_busy) > 0:
                     # transform hparams
-                    hp_trans = np.apply_along_axis(
-                        self.searchspace.transform,
-                        1,
+                    hp_trans = self.searchspace.transform_batch(
                         hparams_busy,
                         normalize_categorical=self.normalize_categorical,
                     )
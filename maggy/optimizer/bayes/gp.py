@@ -14,15 +14,18 @@
 #   limitations under the License.
 #
 
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import numpy as np
 from scipy.optimize import fmin_l_bfgs_b
 
 from skopt.learning.gaussian_process import GaussianProcessRegressor
 from skopt.learning.gaussian_process.kernels import ConstantKernel
 from skopt.learning.gaussian_process.kernels import Matern
-from sklearn.base import clone
 
 from maggy.optimizer.bayes.base import BaseAsyncBO
+from maggy.optimizer.bayes.surrogate import IncrementalGP
 from maggy.optimizer.bayes.acquisitions import (
     GaussianProcess_EI,
     GaussianProcess_LCB,
@@ -42,6 +45,7 @@ class GP(BaseAsyncBO):
         acq_fun_kwargs=None,
         acq_optimizer="lbfgs",
         acq_optimizer_kwargs=None,
+        refit_interval=10,
         **kwargs
     ):
         """
@@ -94,7 +98,17 @@ class GP(BaseAsyncBO):
                                    points to find local minima.
                                 - The optimal of these local minima is used to update the prior.
         :param acq_optimizer_kwargs: Additional arguments to be passed to the acquisition optimizer.
+                                     - `"n_points"`: number of randomly sampled candidates
+                                     - `"n_restarts_optimizer"`: number of `"lbfgs"` runs
+                                     - `"n_jobs"`: number of workers that evaluate the candidates in chunks and run
+                                       the `"lbfgs"` restarts concurrently. Default is 1, i.e. run serially
+                                     - `"backend"`: `"thread"` or `"process"`, the kind of workers if `n_jobs` > 1
+                                     - `"chunk_size"`: number of candidates evaluated at once, default is 1000
         :type acq_optimizer_kwargs: dict
+        :param refit_interval: Number of new observations after which the kernel hyperparameters of the surrogate
+                               are re-optimized. In between, the hyperparameters are kept fixed and the posterior is
+                               updated incrementally with the new observations and liars.
+        :type refit_interval: int
         """
         super().__init__(**kwargs)
 
@@ -161,7 +175,29 @@ class GP(BaseAsyncBO):
         else:
             self.n_points = acq_optimizer_kwargs.get("n_points", 10000)
         self.n_restarts_optimizer = acq_optimizer_kwargs.get("n_restarts_optimizer", 5)
+        self.n_jobs = acq_optimizer_kwargs.get("n_jobs", 1)
+        self.backend = acq_optimizer_kwargs.get("backend", "thread")
+        self.chunk_size = acq_optimizer_kwargs.get("chunk_size", 1000)
+        allowed_backends = {
+            "thread": ThreadPoolExecutor,
+            "process": ProcessPoolExecutor,
+        }
+        if self.backend not in allowed_backends:
+            raise ValueError(
+                "expected backend to be in {}, got {}".format(
+                    list(allowed_backends.keys()), self.backend
+                )
+            )
+        if self.n_jobs < 1 or self.chunk_size < 1:
+            raise ValueError(
+                "expected n_jobs and chunk_size to be positive integers, got {} and {}".format(
+                    self.n_jobs, self.chunk_size
+                )
+            )
         self.acq_optimizer_kwargs = acq_optimizer_kwargs
+        # workers for the acquisition optimization, created with the first suggestion
+        self._executor_cls = allowed_backends[self.backend]
+        self._executor = None
 
         # configure impute strategy
         if self.async_strategy == "impute":
@@ -174,8 +210,18 @@ class GP(BaseAsyncBO):
                 )
             self.impute_strategy = impute_strategy
 
+        if refit_interval < 1:
+            raise ValueError(
+                "expected refit_interval to be a positive integer, got {}".format(
+                    refit_interval
+                )
+            )
+        self.refit_interval = refit_interval
+
         # estimator that has not been fit on any data.
         self.base_model = None
+        # incrementally updated surrogate per budget, the fitted models are in `self.models`
+        self.surrogates = {}
 
         if self.async_strategy == "impute":
             self._log("Impute Strategy: {}".format(self.impute_strategy))
@@ -183,34 +229,23 @@ class GP(BaseAsyncBO):
     def sampling_routine(self, budget=0):
         # even with BFGS as optimizer we want to sample a large number
         # of points and then pick the best ones as starting points
-        random_hparams = self.searchspace.get_random_parameter_values(self.n_points)
-        random_hparams_list = np.array(
-            [self.searchspace.dict_to_list(hparams) for hparams in random_hparams]
+        X = self.searchspace.sample_batch(
+            self.n_points, rng=self.rng, normalize_categorical=True
         )
         y_opt = self.ybest(budget)
 
-        # transform configs
-        X = np.apply_along_axis(
-            self.searchspace.transform,
-            1,
-            random_hparams_list,
-            normalize_categorical=True,
-        )
-
         if self.interim_results:
             # Always sample with max budget: xt ← argmax acq([x, N])
             # normalized max budget is 1 → add 1 to hparam configs
             X = np.append(X, np.ones(X.shape[0]).reshape(-1, 1), 1)
 
-        values = self.acq_fun.evaluate(
-            X=X,
-            surrogate_model=self.models[budget],
-            y_opt=y_opt,
-            acq_func_kwargs=self.acq_func_kwargs,
-        )
+        start = time.time()
+        values = self._evaluate_candidates(X, budget, y_opt)
+        evaluate_time = time.time() - start
 
         # Find the minimum of the acquisition function by randomly
         # sampling points from the space
+        start = time.time()
         if self.acq_optimizer == "sampling":
             next_x = X[np.argmin(values)]
 
@@ -223,31 +258,39 @@ class GP(BaseAsyncBO):
 
             x0 = X[np.argsort(values)[: self.n_restarts_optimizer]]
 
-            results = []
             # bounds of transformed hparams are always [0.0,1.0] ( if categorical encodings get normalized,
             # which is the case here )
             bounds = [(0.0, 1.0) for _ in self.searchspace.values()]
             if self.interim_results:
                 bounds.append((0.0, 1.0))
-            for x in x0:
-                # todo evtl. use Parallel / delayed like skopt
-                result = fmin_l_bfgs_b(
-                    func=self.acq_fun.evaluate_1_d,
-                    x0=x,
-                    args=(
-                        self.models[budget],
-                        y_opt,
-                        self.acq_func_kwargs,
-                    ),
-                    bounds=bounds,
-                    approx_grad=approx_grad,
-                    maxiter=20,
-                )
-                results.append(result)
+            args = (
+                self.acq_fun.evaluate_1_d,
+                (self.models[budget], y_opt, self.acq_func_kwargs),
+                bounds,
+                approx_grad,
+            )
+            results = self._map(_minimize_acquisition, [(x,) + args for x in x0])
 
             cand_xs = np.array([r[0] for r in results])
             cand_acqs = np.array([r[1] for r in results])
             next_x = cand_xs[np.argmin(cand_acqs)]
+        optimize_time = time.time() - start
+
+        self._log(
+            "acquisition optimization with n_jobs {}: evaluated {} candidates in {:.1f} ms, "
+            "{} {} in {:.1f} ms".format(
+                self.n_jobs,
+                X.shape[0],
+                evaluate_time * 1000,
+                self.acq_optimizer,
+                (
+                    "with {} restarts".format(len(x0))
+                    if self.acq_optimizer == "lbfgs"
+                    else ""
+                ),
+                optimize_time * 1000,
+            )
+        )
 
         # lbfgs should handle this but just in case there are
         # precision errors.
@@ -263,11 +306,49 @@ class GP(BaseAsyncBO):
 
         return hparam_dict
 
+    def finalize_experiment(self, trials):
+        self._shutdown_executor()
+
+    def _shutdown(self):
+        self._shutdown_executor()
+        super()._shutdown()
+
+    def _shutdown_executor(self):
+        """shuts down the pool of `_map`, if it was started"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _evaluate_candidates(self, X, budget, y_opt):
+        """evaluates the acquisition function on the candidates in chunks of `chunk_size`
+
+        :param X: transformed candidates, shape = (n_points, n_hparams)
+        :type X: np.ndarray
+        :return: values of the acquisition function, shape = (n_points,)
+        :rtype: np.ndarray
+        """
+        # thompson sampling draws one joint sample over all candidates
+        chunk_size = X.shape[0] if self.async_strategy == "asy_ts" else self.chunk_size
+        chunks = [
+            (self.acq_fun.evaluate, X[i : i + chunk_size])
+            + (self.models[budget], y_opt, self.acq_func_kwargs)
+            for i in range(0, X.shape[0], chunk_size)
+        ]
+        return np.concatenate(self._map(_evaluate_acquisition, chunks))
+
+    def _map(self, func, args_list):
+        """applies `func` to every tuple of arguments, concurrently if `n_jobs` > 1"""
+        if self.n_jobs == 1 or len(args_list) == 1:
+            return [func(*args) for args in args_list]
+        if self._executor is None:
+            self._executor = self._executor_cls(max_workers=self.n_jobs)
+        return list(self._executor.map(func, *zip(*args_list)))
+
     def init_model(self):
         """initializes the surrogate model of the gaussian process
 
         the model gets created with the right parameters, but is not fit with any data yet. the `base_model` will be
-        cloned in `update_model` and fit with observation data
+        cloned by the `IncrementalGP` surrogate in `update_model` and fit with observation data
         """
         # n_dims == n_hparams
         n_dims = len(self.searchspace.keys())
@@ -299,18 +380,22 @@ class GP(BaseAsyncBO):
         self._log("start updateing model with budget {}".format(budget))
 
         # check if enough observations available for model building
-        if len(self.searchspace.keys()) > len(self.get_metrics_array(budget=budget)):
+        n_observations = len(self.get_metrics_array(budget=budget))
+        if len(self.searchspace.keys()) > n_observations:
             self._log(
                 "not enough observations available to build with budget {} yet. At least {} needed, got {}".format(
                     budget,
                     len(self.searchspace.keys()),
-                    len(self.get_metrics_array(budget=budget)),
+                    n_observations,
                 )
             )
             return
 
-        # create model without any data
-        model = clone(self.base_model)
+        if budget not in self.surrogates:
+            self.surrogates[budget] = IncrementalGP(
+                self.base_model, refit_interval=self.refit_interval
+            )
+        surrogate = self.surrogates[budget]
 
         Xi, yi = self.get_XY(
             budget=budget,
@@ -318,13 +403,16 @@ class GP(BaseAsyncBO):
             interim_results_interval=self.interim_results_interval,
         )
 
-        # fit model with data
-        model.fit(Xi, yi)
+        # re-optimize kernel hyperparameters every `refit_interval` observations, else only update the posterior
+        refitted = surrogate.update(Xi, yi, n_observations=n_observations)
 
-        self._log("fitted model with data")
+        if refitted:
+            self._log("fitted model with data")
+        else:
+            self._log("updated model incrementally with data")
 
         # update model of budget
-        self.models[budget] = model
+        self.models[budget] = surrogate.model
 
     def impute_metric(self, hparams, budget=0):
         """calculates the value of the imputed metric for hparams of a currently evaluating trial.
@@ -371,3 +459,24 @@ class GP(BaseAsyncBO):
             imputed_metric = -imputed_metric
 
         return imputed_metric
+
+
+def _evaluate_acquisition(acq_fun, X, surrogate_model, y_opt, acq_func_kwargs):
+    return acq_fun(
+        X=X,
+        surrogate_model=surrogate_model,
+        y_opt=y_opt,
+        acq_func_kwargs=acq_func_kwargs,
+    )
+
+
+def _minimize_acquisition(x0, acq_fun, args, bounds, approx_grad):
+    """runs one restart of the lbfgs acquisition optimization, module level so it can be sent to worker processes"""
+    return fmin_l_bfgs_b(
+        func=acq_fun,
+        x0=x0,
+        args=args,
+        bounds=bounds,
+        approx_grad=approx_grad,
+        maxiter=20,
+    )
@@ -0,0 +1,192 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import numpy as np
+from scipy.linalg import cho_solve, cholesky, solve_triangular
+from sklearn.base import clone
+from skopt.learning.gaussian_process.gpr import _param_for_white_kernel_in_Sum
+from skopt.learning.gaussian_process.kernels import WhiteKernel
+
+
+class IncrementalGP(object):
+    """Keeps a fitted skopt `GaussianProcessRegressor` up to date without
+    refitting it from scratch for every new observation.
+
+    The kernel hyperparameters are only re-optimized every `refit_interval`
+    observations, warm started from the previous optimum. In between, the
+    hyperparameters are kept fixed and the Cholesky factor `L_` and the inverse
+    `K_inv_` of the training kernel matrix are updated for the rows that
+    changed. The design matrix returned by `get_XY` is append-only for
+    finalized trials, followed by the busy locations (liars), so usually only
+    the liars are removed and the new rows are appended, costing O(n^2 k)
+    instead of O(n^3) for k changed rows.
+    """
+
+    def __init__(self, base_model, refit_interval=10):
+        """
+        :param base_model: skopt `GaussianProcessRegressor` that has not been fit on any data
+        :type base_model: GaussianProcessRegressor
+        :param refit_interval: number of new observations after which the kernel hyperparameters are re-optimized
+        :type refit_interval: int
+        """
+        self.base_model = base_model
+        self.refit_interval = refit_interval
+        self.model = None
+        # number of observations (without liars) at the last hyperparameter fit
+        self.n_fit = 0
+        self.noise = 0.0
+        self.X = None
+        self.L = None
+        self.K_inv = None
+
+    def update(self, X, y, n_observations):
+        """updates the surrogate model with the complete training data
+
+        :param X: transformed hparams, rows of finalized trials first, followed by busy locations
+        :type X: np.ndarray
+        :param y: metrics of the rows in `X`
+        :type y: np.ndarray
+        :param n_observations: number of rows in `X` which are real observations, i.e. not imputed
+        :type n_observations: int
+        :return: True if the hyperparameters were re-optimized, False if the posterior was updated incrementally
+        :rtype: bool
+        """
+        if (
+            self.model is None
+            or X.shape[1] != self.X.shape[1]
+            or abs(n_observations - self.n_fit) >= self.refit_interval
+        ):
+            self._refit(X, y)
+            self.n_fit = n_observations
+            return True
+
+        try:
+            self._update_factor(X)
+        except np.linalg.LinAlgError:
+            # numerical issues, factorize from scratch with fixed hyperparameters
+            self._factorize(X)
+        self._update_posterior(y)
+        return False
+
+    def _refit(self, X, y):
+        """fits a new model, warm started with the previous kernel hyperparameters"""
+        model = clone(self.base_model)
+        if self.model is not None:
+            model.set_params(kernel=self._warm_start_kernel(), n_restarts_optimizer=0)
+        model.fit(X, y)
+        self.model = model
+        self.noise = model.noise_ if model.noise_ is not None else 0.0
+        self.X = model.X_train_
+        self.L = model.L_
+        self.K_inv = model.K_inv_
+
+    def _warm_start_kernel(self):
+        """returns the fitted kernel of the current model with its noise level restored
+
+        skopt sets the noise of the fitted kernel to zero for predictions and keeps it in `noise_`
+        """
+        kernel = clone(self.model.kernel_)
+        white_present, white_param = _param_for_white_kernel_in_Sum(kernel)
+        if white_present:
+            kernel.set_params(**{white_param: WhiteKernel(noise_level=self.noise)})
+        return kernel
+
+    def _kernel(self, X1, X2=None):
+        """kernel matrix with fixed hyperparameters, including noise on the diagonal if `X2` is None"""
+        if X2 is not None:
+            return self.model.kernel_(X1, X2)
+        K = self.model.kernel_(X1)
+        K[np.diag_indices_from(K)] += self.noise + self.model.alpha
+        return K
+
+    def _factorize(self, X):
+        self.X = X
+        self.L = cholesky(self._kernel(X), lower=True)
+        self.K_inv = cho_solve((self.L, True), np.eye(X.shape[0]))
+
+    def _update_factor(self, X):
+        """removes the rows that differ from the cached training data and appends the new ones"""
+        n_prefix = min(self.X.shape[0], X.shape[0])
+        same = np.all(self.X[:n_prefix] == X[:n_prefix], axis=1)
+        if not same.all():
+            n_prefix = int(np.argmin(same))
+
+        if n_prefix == 0:
+            self._factorize(X)
+            return
+        if n_prefix < self.X.shape[0]:
+            self._truncate(n_prefix)
+        if n_prefix < X.shape[0]:
+            self._extend(X[n_prefix:])
+
+    def _truncate(self, n):
+        """keeps the first `n` training rows
+
+        The Cholesky factor of a leading block is the leading block of the factor, the inverse is downdated with
+        the Schur complement: inv(K_11) = A - B inv(D) B^T for inv(K) = [[A, B], [B^T, D]]
+        """
+        A = self.K_inv[:n, :n]
+        B = self.K_inv[:n, n:]
+        D = self.K_inv[n:, n:]
+        self.K_inv = A - B.dot(cho_solve((cholesky(D, lower=True), True), B.T))
+        self.L = self.L[:n, :n]
+        self.X = self.X[:n]
+
+    def _extend(self, X_new):
+        """appends the rows `X_new` with block updates of the Cholesky factor and the inverse"""
+        n, k = self.X.shape[0], X_new.shape[0]
+        B = self._kernel(self.X, X_new)
+        C = self._kernel(X_new)
+
+        L_21 = solve_triangular(self.L, B, lower=True).T
+        # Schur complement S = C - B^T inv(K) B
+        L_22 = cholesky(C - L_21.dot(L_21.T), lower=True)
+        S_inv = cho_solve((L_22, True), np.eye(k))
+        KB = self.K_inv.dot(B)
+
+        L = np.zeros((n + k, n + k))
+        L[:n, :n] = self.L
+        L[n:, :n] = L_21
+        L[n:, n:] = L_22
+
+        K_inv = np.empty((n + k, n + k))
+        K_inv[:n, :n] = self.K_inv + KB.dot(S_inv).dot(KB.T)
+        K_inv[:n, n:] = -KB.dot(S_inv)
+        K_inv[n:, :n] = K_inv[:n, n:].T
+        K_inv[n:, n:] = S_inv
+
+        self.L = L
+        self.K_inv = K_inv
+        self.X = np.concatenate((self.X, X_new))
+
+    def _update_posterior(self, y):
+        """sets the attributes used by `predict` like `GaussianProcessRegressor.fit` does with `normalize_y=True`"""
+        model = self.model
+        y_mean = np.mean(y)
+        y_std = np.std(y)
+        if y_std < 10 * np.finfo(float).eps:
+            y_std = 1.0
+        y_train = (y - y_mean) / y_std
+
+        model.X_train_ = self.X
+        model.y_train_ = y_train
+        model._y_train_mean = y_mean
+        model._y_train_std = y_std
+        model.y_train_mean_ = y_mean
+        model.y_train_std_ = y_std
+        model.L_ = self.L
+        model.K_inv_ = self.K_inv
+        model.alpha_ = cho_solve((self.L, True), y_train)
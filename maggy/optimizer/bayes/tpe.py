@@ -14,6 +14,8 @@
 #   limitations under the License.
 #
 
+import random
+
 import numpy as np
 import statsmodels.api as sm
 import scipy.stats as sps
@@ -73,56 +75,13 @@ class TPE(BaseAsyncBO):
         self.bw_factor = bw_factor
 
     def sampling_routine(self, budget=0):
-        best_improvement = -np.inf
-        best_sample = None
-
         kde_good = self.models[budget]["good"]
         kde_bad = self.models[budget]["bad"]
 
-        # alternative way of implementation:
-        # instead of this loop, sample all configs beforehand and then optimize acquisition function like in GP
-        for sample in range(self.n_samples):
-            # randomly choose one of the `good` samples as mean
-            idx = np.random.randint(0, len(kde_good.data))
-            obs = kde_good.data[idx]
-            sample_vector = []
-
-            # loop through hparams
-            for mean, bw, hparam_spec in zip(
-                obs, kde_good.bw, self.searchspace.items()
-            ):
-
-                if hparam_spec["type"] in [
-                    self.searchspace.DOUBLE,
-                    self.searchspace.INTEGER,
-                ]:
-                    # sample for cont. hparams
-                    # clip by min bw and multiply by factor to favor more exploration
-                    bw = max(bw, self.min_bw) * self.bw_factor
-
-                    # low and high are calculated with bounds of hparamsm, because they are always [0,
-                    # 1] for transformed hparams we do not have to incorporate them explicitly
-                    # `a, b = (myclip_a - my_mean) / my_std, (myclip_b - my_mean) / my_std`
-                    # see: https://docs.scipy.org/doc/scipy/reference/generated/scipy.stats.truncnorm.html
-                    low = -mean / bw
-                    high = (1 - mean) / bw
-
-                    rv = sps.truncnorm.rvs(low, high, loc=mean, scale=bw)
-                    sample_vector.append(rv)
-                else:
-                    # sample for categorical hparams (sampling logic taken from HpBandSter)
-                    if np.random.rand() < (1 - bw):
-                        sample_vector.append(int(mean))
-                    else:
-                        n_choices = len(hparam_spec["values"])
-                        sample_vector.append(np.random.randint(n_choices))
-
-            # calculate EI for current sample
-            ei_val = self._calculate_ei(sample_vector, kde_good, kde_bad)
-
-            if ei_val > best_improvement:
-                best_improvement = ei_val
-                best_sample = sample_vector
+        # draw all candidates at once and pick the one that maximizes EI
+        samples = self._sample_candidates(kde_good, self.n_samples)
+        ei_values = self._calculate_ei(samples, kde_good, kde_bad)
+        best_sample = samples[np.argmax(ei_values)]
 
         # get original representation of hparams in dict
         best_sample_dict = self.searchspace.list_to_dict(
@@ -131,6 +90,61 @@ class TPE(BaseAsyncBO):
 
         return best_sample_dict
 
+    def _sample_candidates(self, kde_good, n_samples):
+        """Samples candidates from the kde of good observations, one column per hparam
+
+        :param kde_good: kde of good observations
+        :type kde_good: sm.KDEMultivariate
+        :param n_samples: number of candidates to draw
+        :type n_samples: int
+        :return: transformed hparams of the candidates
+        :rtype: np.ndarray(n_samples, n_hparams)
+        """
+        # without a seed, draw like `Searchspace.get_random_parameter_values()`
+        rng = self.rng
+        if rng is None:
+            rng = np.random.default_rng(random.getrandbits(64))
+
+        # randomly choose one of the `good` samples as mean for every candidate
+        idx = rng.integers(0, len(kde_good.data), size=n_samples)
+        means = kde_good.data[idx]
+        samples = np.empty_like(means, dtype=float)
+
+        # loop through hparams
+        for col, (bw, hparam_spec) in enumerate(
+            zip(kde_good.bw, self.searchspace.items())
+        ):
+            mean = means[:, col]
+            if hparam_spec["type"] in [
+                self.searchspace.DOUBLE,
+                self.searchspace.INTEGER,
+            ]:
+                # sample for cont. hparams
+                # clip by min bw and multiply by factor to favor more exploration
+                bw = max(bw, self.min_bw) * self.bw_factor
+
+                # low and high are calculated with bounds of hparamsm, because they are always [0,
+                # 1] for transformed hparams we do not have to incorporate them explicitly
+                # `a, b = (myclip_a - my_mean) / my_std, (myclip_b - my_mean) / my_std`
+                # see: https://docs.scipy.org/doc/scipy/reference/generated/scipy.stats.truncnorm.html
+                low = -mean / bw
+                high = (1 - mean) / bw
+
+                samples[:, col] = sps.truncnorm.rvs(
+                    low, high, loc=mean, scale=bw, size=n_samples, random_state=rng
+                )
+            else:
+                # sample for categorical hparams (sampling logic taken from HpBandSter)
+                n_choices = len(hparam_spec["values"])
+                keep = rng.random(n_samples) < (1 - bw)
+                samples[:, col] = np.where(
+                    keep,
+                    mean.astype(int),
+                    rng.integers(n_choices, size=n_samples),
+                )
+
+        return samples
+
     def init_model(self):
         pass
 
@@ -165,12 +179,8 @@ class TPE(BaseAsyncBO):
             )
         )
 
-        transformed_good_hparams = np.apply_along_axis(
-            self.searchspace.transform, 1, good_hparams
-        )
-        transformed_bad_hparams = np.apply_along_axis(
-            self.searchspace.transform, 1, bad_hparams
-        )
+        transformed_good_hparams = self.searchspace.transform_batch(good_hparams)
+        transformed_bad_hparams = self.searchspace.transform_batch(bad_hparams)
 
         # self._log("good: {}".format(good_hparams))
         # self._log("normalized good: {}".format(transformed_good_hparams))
@@ -254,13 +264,54 @@ class TPE(BaseAsyncBO):
     def _calculate_ei(x, kde_good, kde_bad):
         """Returns Expected Improvement for given hparams
 
-        :param x: list of hyperparameters, shape(n_hparams,)
-        :type x: list
+        :param x: hyperparameters of the candidates, shape(n_samples, n_hparams)
+        :type x: np.ndarray
         :param kde_good: kde of good observations
         :type kde_good: sm.KDEMultivariate
         :param kde_bad: pdf of kde of bad observations
         :type kde_bad: sm.KDEMultivariate of KDE instance
-        :return: expected improvement
-        :rtype: float
+        :return: expected improvement of every candidate
+        :rtype: np.ndarray(n_samples,)
         """
-        return max(1e-32, kde_good.pdf(x)) / max(kde_bad.pdf(x), 1e-32)
+        return np.maximum(TPE._kde_pdf(kde_good, x), 1e-32) / np.maximum(
+            TPE._kde_pdf(kde_bad, x), 1e-32
+        )
+
+    @staticmethod
+    def _kde_pdf(kde, x, chunk_size=2 ** 20):
+        """Evaluates the density of a kde for a batch of points
+
+        Computes the same estimate as `kde.pdf`, i.e. a product of a gaussian kernel for continuous and an
+        aitchison-aitken kernel for categorical hparams, but for all points at once instead of looping over them.
+
+        :param kde: fitted kde
+        :type kde: sm.KDEMultivariate
+        :param x: points to evaluate, shape(n_samples, n_hparams)
+        :type x: np.ndarray
+        :param chunk_size: max number of kernel values (n_points * n_observations) to hold in memory at once
+        :type chunk_size: int
+        :return: density at every point
+        :rtype: np.ndarray(n_samples,)
+        """
+        data = kde.data
+        n_obs = data.shape[0]
+        n_levels = [np.unique(data[:, col]).size for col in range(data.shape[1])]
+        is_continuous = np.array([var_type == "c" for var_type in kde.var_type])
+        norm = n_obs * np.prod(kde.bw[is_continuous])
+
+        pdf = np.empty(x.shape[0])
+        step = max(1, chunk_size // n_obs)
+        for start in range(0, x.shape[0], step):
+            x_chunk = x[start : start + step]
+            kernel = np.ones((x_chunk.shape[0], n_obs))
+            for col, (var_type, bw) in enumerate(zip(kde.var_type, kde.bw)):
+                diff = x_chunk[:, col, None] - data[None, :, col]
+                if var_type == "c":
+                    kernel *= np.exp(-(diff ** 2) / (bw ** 2 * 2.0)) / np.sqrt(
+                        2 * np.pi
+                    )
+                else:
+                    kernel *= np.where(diff == 0, 1 - bw, bw / (n_levels[col] - 1))
+            pdf[start : start + step] = kernel.sum(axis=1) / norm
+
+        return pdf
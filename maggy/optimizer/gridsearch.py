@@ -14,33 +14,170 @@
 #   limitations under the License.
 #
 
-import itertools
+import functools
+import math
+import operator
 
 from maggy import Searchspace
 from maggy.optimizer.abstractoptimizer import AbstractOptimizer
 
+_MASK64 = (1 << 64) - 1
+
+
+class Grid(object):
+    """Lazy cartesian product of the values of a searchspace
+
+    The configs are addressed by their index in the order of
+    `itertools.product`, the last hparam changing fastest. A config is decoded
+    from its index as a mixed-radix number, so the grid takes constant memory
+    however many configs it has. The traversal order maps positions to indices:
+
+        - sequential: the order of `itertools.product`
+        - strided: steps through the grid with a stride of about
+          `size / golden ratio`, so the first configs are spread over the
+          whole grid
+        - shuffled: a pseudo-random permutation that only depends on `seed`
+    """
+
+    ORDERS = ["sequential", "strided", "shuffled"]
+
+    def __init__(self, searchspace, order="sequential", seed=0):
+        """
+        :param searchspace: searchspace with only DISCRETE and CATEGORICAL hparams
+        :type searchspace: Searchspace
+        :param order: traversal order, see `ORDERS`
+        :type order: str
+        :param seed: key of the shuffled order
+        :type seed: int
+        """
+        if order not in Grid.ORDERS:
+            raise ValueError(
+                "expected order to be in {}, got {}".format(Grid.ORDERS, order)
+            )
+        self.searchspace = searchspace
+        self.order = order
+        self.seed = seed
+        self._values = [item["values"] for item in searchspace.items()]
+        self.size = functools.reduce(
+            operator.mul, (len(values) for values in self._values), 1
+        )
+        if order == "strided":
+            self._stride = max(round(self.size * (math.sqrt(5) - 1) / 2), 1)
+            while math.gcd(self._stride, self.size) != 1:
+                self._stride += 1
+        elif order == "shuffled":
+            # the permutation works on the smallest domain of 4**k >= size
+            # configs
+            self._half_bits = max((self.size - 1).bit_length() + 1, 2) // 2
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        """returns the hparams of the config at `index` in the order of
+        `itertools.product`
+
+        :rtype: dict
+        """
+        if not 0 <= index < self.size:
+            raise IndexError("grid index {} out of range".format(index))
+        hparams = [None] * len(self._values)
+        for col in range(len(self._values) - 1, -1, -1):
+            index, digit = divmod(index, len(self._values[col]))
+            hparams[col] = self._values[col][digit]
+        return self.searchspace.list_to_dict(hparams)
+
+    def get_index(self, position):
+        """returns the index of the config at `position` of the traversal order
+
+        :rtype: int
+        """
+        if not 0 <= position < self.size:
+            raise IndexError("grid position {} out of range".format(position))
+        if self.order == "strided":
+            return position * self._stride % self.size
+        if self.order == "shuffled":
+            # cycle walking: permute until the index falls into the grid,
+            # expected less than four rounds
+            index = self._feistel(position)
+            while index >= self.size:
+                index = self._feistel(index)
+            return index
+        return position
+
+    def _feistel(self, value):
+        """Bijection of [0, 4**`_half_bits`), a four round feistel network
+        keyed with `seed`"""
+        mask = (1 << self._half_bits) - 1
+        left, right = value >> self._half_bits, value & mask
+        for round_key in range(4):
+            left, right = right, left ^ (_mix(right, self.seed, round_key) & mask)
+        return left << self._half_bits | right
+
+
+def _mix(value, seed, round_key):
+    """64 bit hash of the inputs, the finalizer of splitmix64"""
+    z = (value + seed * 0x9E3779B97F4A7C15 + round_key * 0x632BE59BD9B4E019) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
 
 class GridSearch(AbstractOptimizer):
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.config_buffer = []
+    def __init__(self, order="sequential", shard=0, num_shards=1, seed=None, **kwargs):
+        """
+        :param order: order in which the grid is traversed, `sequential`,
+            `strided` or `shuffled`, see `Grid`. Strided and shuffled orders
+            cover the whole grid early, e.g. for experiments that are stopped
+            before the end.
+        :type order: str
+        :param shard: index of the shard to evaluate, between 0 and `num_shards` - 1
+        :type shard: int
+        :param num_shards: number of shards the grid is split into, e.g. to
+            evaluate it in several experiments. Shard `i` contains every
+            `num_shards`-th config of the traversal order, starting at
+            position `i`.
+        :type num_shards: int
+        :param seed: key of the shuffled order, 0 if None. Resumed experiments
+            need the same seed.
+        :type seed: int
+        """
+        super().__init__(seed=seed, **kwargs)
+        if order not in Grid.ORDERS:
+            raise ValueError(
+                "expected order to be in {}, got {}".format(Grid.ORDERS, order)
+            )
+        if not 0 <= shard < num_shards:
+            raise ValueError(
+                "expected shard to be between 0 and {}, got {}".format(
+                    num_shards - 1, shard
+                )
+            )
+        self.order = order
+        self.shard = shard
+        self.num_shards = num_shards
+        self.seed = seed or 0
+        self.grid = None
+        # number of configs of the shard suggested so far
+        self.num_suggested = 0
 
     def initialize(self):
         self._validate_searchspace(self.searchspace)
-        # create all trials ahead of time
-        self.config_buffer = self._grid_params(self.searchspace)
+        # configs are decoded from their index when they are suggested
+        self.grid = Grid(self.searchspace, self.order, self.seed)
+        self.num_suggested = 0
 
-    @classmethod
-    def get_num_trials(cls, searchspace):
+    def get_num_trials(self, searchspace):
         """For grid search the number of trials is determined by the size of the
-        cartisian product, depending on the user-set number of parameters and values
+        cartisian product, depending on the user-set number of parameters and values,
+        and the number of shards.
 
-        This method is duplicating part of the code in the `initialize()` mainly to keep
-        the flow of things the same as for other optimizers, where the user sets only
-        the number of trials to evaluate.
+        The size of the grid is computed from the number of values of each parameter,
+        without enumerating it.
         """
-        cls._validate_searchspace(searchspace)
-        return len(cls._grid_params(searchspace))
+        self._validate_searchspace(searchspace)
+        size = Grid(searchspace).size
+        return max(size - self.shard + self.num_shards - 1, 0) // self.num_shards
 
     def get_suggestion(self, trial=None):
         # sampling routine for randomsearch + pruner
@@ -49,9 +186,11 @@ class GridSearch(AbstractOptimizer):
                 "Grid search in combination with trial pruning "
                 "is currently not supported."
             )
-        elif self.config_buffer:
+        position = self.shard + self.num_suggested * self.num_shards
+        if position < self.grid.size:
             run_budget = 0
-            next_trial_params = self.config_buffer.pop()
+            next_trial_params = self.grid[self.grid.get_index(position)]
+            self.num_suggested += 1
             next_trial = self.create_trial(
                 hparams=next_trial_params,
                 sample_type="grid",
@@ -71,15 +210,6 @@ class GridSearch(AbstractOptimizer):
     def finalize_experiment(self, trials):
         return
 
-    @staticmethod
-    def _grid_params(searchspace):
-        return_list = []
-        for hparams in itertools.product(
-            *[item["values"] for item in searchspace.items()]
-        ):
-            return_list.append(searchspace.list_to_dict(hparams))
-        return return_list
-
     @staticmethod
     def _validate_searchspace(searchspace):
         if (
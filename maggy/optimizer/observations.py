@@ -0,0 +1,262 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import numpy as np
+
+
+class ObservationStore(object):
+    """Append-only columnar store of the hparams and final metrics of finalized trials.
+
+    The store mirrors the `final_store` list of the experiment driver, which only ever grows. On every access, only
+    the trials that were finalized since the last access are appended, so building the surrogate input does not
+    iterate all trials on every suggestion. Observations are kept once for all trials and once per budget, in arrays
+    that grow by doubling their capacity. Hparams, metrics and transformed hparams are returned as read-only views
+    of these arrays.
+
+    Metrics are stored negated if the optimization `direction` is `max`, so all optimizations are minimizations.
+
+    Trials of previous experiments that warm-start the optimizer are stored before the trials of `final_store`.
+    """
+
+    def __init__(self):
+        self._final_store = None
+        self._prior_trials = None
+        self._direction = None
+        self._searchspace = None
+        self._n_synced = 0
+        self._trials = {}
+        self._all = _Columns()
+        self._budgets = {}
+
+    def sync(self, final_store, direction, searchspace, prior_trials=None):
+        """appends trials that were finalized since the last call
+
+        Rebuilds the store from scratch if the `final_store` or `prior_trials` list was replaced or the direction
+        changed.
+
+        :param final_store: finalized trials of the experiment, in order of finalization
+        :type final_store: list[Trial]
+        :param direction: direction of the optimization, `max` or `min`
+        :type direction: str
+        :param searchspace: searchspace used to transform hparams
+        :type searchspace: Searchspace
+        :param prior_trials: finalized trials of previous experiments, see `AbstractOptimizer.warm_start()`
+        :type prior_trials: list[Trial]
+        :return: the synced store
+        :rtype: ObservationStore
+        """
+        if (
+            final_store is not self._final_store
+            or prior_trials is not self._prior_trials
+            or direction != self._direction
+            or searchspace is not self._searchspace
+            or len(final_store) < self._n_synced
+        ):
+            self.__init__()
+            self._final_store = final_store
+            self._prior_trials = prior_trials
+            self._direction = direction
+            self._searchspace = searchspace
+            for trial in prior_trials or []:
+                self._append(trial)
+
+        if final_store is None:
+            return self
+
+        for trial in final_store[self._n_synced :]:
+            self._append(trial)
+        self._n_synced = len(final_store)
+
+        return self
+
+    def _append(self, trial):
+        hparams = list(trial.params.values())
+        metric = trial.final_metric * (-1 if self._direction == "max" else 1)
+        self._trials[trial.trial_id] = trial
+        self._all.append(hparams, metric)
+        if "budget" in trial.params:
+            budget = trial.params["budget"]
+            if budget not in self._budgets:
+                self._budgets[budget] = _Columns()
+            self._budgets[budget].append(hparams, metric)
+
+    def __len__(self):
+        return self._all.size
+
+    def get_trial(self, trial_id):
+        """returns the finalized trial with `trial_id` or None"""
+        return self._trials.get(trial_id)
+
+    def trials(self):
+        """returns all finalized trials by trial id"""
+        return self._trials
+
+    def hparams(self, budget=0):
+        """returns hparams of trials evaluated with `budget`, all trials if `budget` is 0 or None
+
+        :return: read-only array of hparams in list representation, shape (n_trials, n_hparams)
+        :rtype: np.ndarray
+        """
+        return self._columns(budget).hparams_view()
+
+    def metrics(self, budget=0):
+        """returns final metrics of trials evaluated with `budget`, all trials if `budget` is 0 or None
+
+        :return: read-only array of final metrics, shape (n_trials,)
+        :rtype: np.ndarray
+        """
+        return self._columns(budget).metrics_view()
+
+    def transformed_hparams(self, budget=0, normalize_categorical=False):
+        """returns hparams of trials evaluated with `budget` transformed with `Searchspace.transform_batch()`
+
+        Only hparams of newly finalized trials get transformed.
+
+        :return: read-only array of transformed hparams, shape (n_trials, n_hparams)
+        :rtype: np.ndarray
+        """
+        return self._columns(budget).transformed_view(
+            self._searchspace, normalize_categorical
+        )
+
+    def _columns(self, budget):
+        if budget == 0 or budget is None:
+            return self._all
+        return self._budgets.get(budget, _Columns())
+
+
+class _Columns(object):
+    """Growable arrays of the hparams and metrics of one view of the store"""
+
+    INITIAL_CAPACITY = 16
+
+    def __init__(self):
+        self.size = 0
+        self.hparams = None
+        self.metrics = np.empty(self.INITIAL_CAPACITY)
+        # transformed hparams and number of transformed rows per value of `normalize_categorical`
+        self.transformed = {}
+
+    def append(self, hparams, metric):
+        if self.hparams is None:
+            self.hparams = np.empty((len(self.metrics), len(hparams)), dtype=object)
+        if self.size == len(self.metrics):
+            self._grow()
+        self.hparams[self.size] = hparams
+        self.metrics[self.size] = metric
+        self.size += 1
+
+    def _grow(self):
+        capacity = 2 * len(self.metrics)
+        self.metrics = _resized(self.metrics, capacity)
+        self.hparams = _resized(self.hparams, capacity)
+        self.transformed = {
+            key: (_resized(values, capacity), n_transformed)
+            for key, (values, n_transformed) in self.transformed.items()
+        }
+
+    def hparams_view(self):
+        if self.hparams is None:
+            return np.array([])
+        return _read_only(self.hparams[: self.size])
+
+    def metrics_view(self):
+        return _read_only(self.metrics[: self.size])
+
+    def transformed_view(self, searchspace, normalize_categorical):
+        n_hparams = len(searchspace.keys())
+        if normalize_categorical not in self.transformed:
+            self.transformed[normalize_categorical] = (
+                np.empty((len(self.metrics), n_hparams)),
+                0,
+            )
+        values, n_transformed = self.transformed[normalize_categorical]
+        if n_transformed < self.size:
+            values[n_transformed : self.size] = searchspace.transform_batch(
+                self.hparams[n_transformed : self.size],
+                normalize_categorical=normalize_categorical,
+            )
+            self.transformed[normalize_categorical] = (values, self.size)
+        return _read_only(values[: self.size])
+
+
+def _resized(values, capacity):
+    resized = np.empty((capacity,) + values.shape[1:], dtype=values.dtype)
+    resized[: len(values)] = values
+    return resized
+
+
+def _read_only(view):
+    view.flags.writeable = False
+    return view
+
+
+class ConfigIndex(object):
+    """Hash index of the hparam configs of all trials that were handed out or finalized.
+
+    Configs are identified by a canonical key that omits the budget and normalizes numbers, so that e.g. `3`,
+    `3.0` and `np.float64(3.0)` are the same config. The index maps each key to the id of the first trial with
+    that config, so duplicate checks cost O(1) and can report the trial they collide with.
+
+    Trials only move from the trial store to the final store, and errored trials are rescheduled with the same
+    config, so configs never have to be removed from the index.
+    """
+
+    # significant digits of floats in the canonical key
+    FLOAT_DIGITS = 12
+
+    def __init__(self, searchspace):
+        self._names = list(searchspace.keys())
+        self._index = {}
+
+    def __len__(self):
+        return len(self._index)
+
+    def key(self, params):
+        """returns the canonical key of a hparam config
+
+        :param params: hparams of a trial, can contain a `budget`
+        :type params: dict
+        :rtype: tuple
+        """
+        return tuple(
+            (name, ConfigIndex._canonical(params[name]))
+            for name in self._names
+            if name in params
+        )
+
+    def add(self, trial):
+        """adds the config of `trial`, keeps the first trial if the config is already indexed"""
+        self._index.setdefault(self.key(trial.params), trial.trial_id)
+
+    def get(self, params):
+        """returns the id of the first trial with the same config as `params` or None"""
+        return self._index.get(self.key(params))
+
+    @staticmethod
+    def _canonical(value):
+        if isinstance(value, (bool, np.bool_)):
+            return bool(value)
+        if isinstance(value, (int, float, np.number)):
+            # `+ 0.0` turns -0.0 into 0.0
+            return float("{:.{}g}".format(value, ConfigIndex.FLOAT_DIGITS)) + 0.0
+        if isinstance(value, str):
+            return str(value)
+        try:
+            hash(value)
+        except TypeError:
+            return repr(value)
+        return value
@@ -21,8 +21,20 @@ from maggy.searchspace import Searchspace
 
 
 class RandomSearch(AbstractOptimizer):
-    def __init__(self, **kwargs):
+    def __init__(self, sampling="random", **kwargs):
+        """
+        :param sampling: how the configs of all trials are sampled, `random`, or `halton` and `lhs` for a
+            space-filling design. See `Searchspace.SAMPLING_METHODS`.
+        :type sampling: str
+        """
         super().__init__(**kwargs)
+        if sampling not in Searchspace.SAMPLING_METHODS:
+            raise ValueError(
+                "expected sampling to be in {}, got {}".format(
+                    Searchspace.SAMPLING_METHODS, sampling
+                )
+            )
+        self.sampling = sampling
         self.config_buffer = []
 
     def initialize(self):
@@ -36,7 +48,7 @@ class RandomSearch(AbstractOptimizer):
             )
 
         self.config_buffer = self.searchspace.get_random_parameter_values(
-            self.num_trials
+            self.num_trials, rng=self.rng, method=self.sampling
         )
 
     def get_suggestion(self, trial=None):
@@ -72,7 +84,7 @@ class RandomSearch(AbstractOptimizer):
                 # start sampling procedure with given budget
                 parent_trial_id = None
                 run_budget = next_trial_info["budget"]
-                hparams = self.searchspace.get_random_parameter_values(1)[0]
+                hparams = self.get_random_hparams()
                 next_trial = self.create_trial(
                     hparams=hparams, sample_type="random", run_budget=run_budget
                 )
@@ -99,11 +111,26 @@ class RandomSearch(AbstractOptimizer):
                 run_budget=run_budget,
             )
 
+            # do not evaluate configs of prior trials of a warm-started experiment again
+            i = 0
+            while (
+                self.prior_trials
+                and not self.replaying()
+                and i < 3
+                and self.hparams_exist(trial=next_trial)
+            ):
+                hparams = self.get_random_hparams()
+                next_trial = self.create_trial(
+                    hparams=hparams, sample_type="random_forced", run_budget=run_budget
+                )
+                i += 1
+
             self._log(
                 "start trial {}: {}, {} \n".format(
                     next_trial.trial_id, next_trial.params, next_trial.info_dict
                 )
             )
+            self.register_trial(next_trial)
 
             return next_trial
         else:
@@ -24,6 +24,7 @@ HpBandSter: https://github.com/automl/HpBandSter
 import numpy as np
 
 from maggy.pruner.abstractpruner import AbstractPruner
+from maggy.pruner.leaderboard import Leaderboard
 
 
 class Hyperband(AbstractPruner):
@@ -319,6 +320,10 @@ class SHIteration:
                         and the latter the `trial_id` of the trial with the same hparams - performed with the budget
                         of the current rung.
                         Having a `actual_trial_id` means that a trial has been started, but not neccessarily finished
+        leaderboards (dict): ranks the finished trials of each rung by their final metric, updated incrementally with
+                             the trials of `pending`
+        pending (dict): keeps track of the `actual_trial_id` of trials in each rung that have been started, but not
+                        finished yet
         n_rungs (int): number of rungs in the SH iteration
         state (str): current state of the iteration, can be "INIT", "RUNNING" or "FINISHED
 
@@ -368,6 +373,12 @@ class SHIteration:
         self.current_rung = 0
         self.actual_n_configs = [0] * len(self.n_configs)
         self.configs = {rung: [] for rung in range(0, self.n_rungs)}
+        self.leaderboards = {rung: Leaderboard() for rung in range(0, self.n_rungs)}
+        self.pending = {rung: [] for rung in range(0, self.n_rungs)}
+        # index of the first config in `current_rung` that has not been started yet
+        self._next_config = 0
+        # maps `original_trial_id` of promoted configs to their index in `configs[current_rung]`
+        self._config_idx = {}
 
         self.trial_metric_getter = trial_metric_getter
 
@@ -405,16 +416,21 @@ class SHIteration:
                 self.actual_n_configs[self.current_rung] += 1
                 return {"trial_id": None, "budget": self.budgets[self.current_rung]}
             else:
-                for trial in self.configs[self.current_rung]:
-                    # If an `actual_trial_id` has been added, the optimizer has already started that trial
-                    if trial["actual_trial_id"]:
-                        continue
-
+                configs = self.configs[self.current_rung]
+                # If an `actual_trial_id` has been added, the optimizer has already started that trial.
+                # Configs are started in order, so skip them once instead of looping over them on every call
+                while (
+                    self._next_config < len(configs)
+                    and configs[self._next_config]["actual_trial_id"]
+                ):
+                    self._next_config += 1
+
+                if self._next_config < len(configs):
                     # Return trial id of promoted trial to optimizer, the optimizer will start a trial with the same
                     # params and add its trial_id as `actual_trial_id` to the `configs` dict
                     self.actual_n_configs[self.current_rung] += 1
                     return {
-                        "trial_id": trial["original_trial_id"],
+                        "trial_id": configs[self._next_config]["original_trial_id"],
                         "budget": self.budgets[self.current_rung],
                     }
 
@@ -465,15 +481,9 @@ class SHIteration:
             )
         else:
             # find index of trial and insert actual trial id
-            trial_idx = next(
-                (
-                    index
-                    for (index, d) in enumerate(self.configs[self.current_rung])
-                    if d["original_trial_id"] == original_trial_id
-                ),
-                None,
-            )
+            trial_idx = self._config_idx[original_trial_id]
             self.configs[self.current_rung][trial_idx]["actual_trial_id"] = new_trial_id
+        self.pending[self.current_rung].append(new_trial_id)
 
         self._log(
             "{}. Iteration, {}. Rung. Started Trial {}/{}".format(
@@ -492,22 +502,9 @@ class SHIteration:
         :return: list of trial ids that are advancing to the next rung
         :rtype: list[str]
         """
-        # get trial ids of current rung
-        trial_ids = [
-            trial["actual_trial_id"] for trial in self.configs[self.current_rung]
-        ]
-
-        # get trials from `final_store` of optimizer
-        trial_metrics = self.trial_metric_getter(
-            trial_ids
-        )  # {`trial_id`: `metric`, ... }
-
-        # sort trials
-        sorted_trials = list(
-            {
-                k: v for k, v in sorted(trial_metrics.items(), key=lambda item: item[1])
-            }.keys()
-        )
+        # finished trials of current rung, sorted by their metric
+        leaderboard = self.leaderboards[self.current_rung]
+        sorted_trials = leaderboard.top(len(leaderboard))
 
         # promoted trials
         n_promote = self.n_configs[self.current_rung + 1]
@@ -515,7 +512,10 @@ class SHIteration:
 
         # promote trials to next rung
         self.current_rung += 1
+        self._next_config = 0
+        self._config_idx = {}
         for trial in promoted_trials:
+            self._config_idx[trial] = len(self.configs[self.current_rung])
             self.configs[self.current_rung].append(
                 {"original_trial_id": trial, "actual_trial_id": None}
             )
@@ -555,15 +555,15 @@ class SHIteration:
             )
             return False
 
-        for trial in self.configs[self.current_rung]:
-            if not self.trial_metric_getter(trial["actual_trial_id"]):
-                # trial has not finished
-                self._log(
-                    "{}. Iteration, rung {} is not promotable. At least one trial ({}) is not finished yet".format(
-                        self.iteration_id, self.current_rung, trial["actual_trial_id"]
-                    )
+        unfinished_trial_id = self._update_leaderboard(self.current_rung)
+        if unfinished_trial_id is not None:
+            # trial has not finished
+            self._log(
+                "{}. Iteration, rung {} is not promotable. At least one trial ({}) is not finished yet".format(
+                    self.iteration_id, self.current_rung, unfinished_trial_id
                 )
-                return False
+            )
+            return False
 
         self._log(
             "{}. Iteration, rung {} is not promotable. Not all slots in rung filled yet".format(
@@ -586,9 +586,37 @@ class SHIteration:
             # current rung is not the last rung in the iteration
             return False
 
-        for trial in self.configs[self.current_rung]:
-            if not self.trial_metric_getter(trial["actual_trial_id"]):
-                # trial has not finished
-                return False
+        if self._update_leaderboard(self.current_rung) is not None:
+            # trial has not finished
+            return False
 
         return True
+
+    def _update_leaderboard(self, rung):
+        """adds the trials of `rung` that finished since the last call to the leaderboard of the rung
+
+        Only the started trials that were not finished at the last call are looked up with `trial_metric_getter`.
+
+        :param rung: index of the rung
+        :type rung: int
+        :return: `actual_trial_id` of the first trial of the rung that has not finished yet, None if all started trials
+                 have finished
+        :rtype: str|None
+        """
+        pending = self.pending[rung]
+        if not pending:
+            return None
+
+        # get metrics of finished trials from `final_store` of optimizer
+        trial_metrics = self.trial_metric_getter(
+            pending
+        )  # {`trial_id`: `metric`, ... }
+        if trial_metrics:
+            for trial_id in pending:
+                if trial_id in trial_metrics:
+                    self.leaderboards[rung].add(trial_id, trial_metrics[trial_id])
+            self.pending[rung] = [
+                trial_id for trial_id in pending if trial_id not in trial_metrics
+            ]
+
+        return self.pending[rung][0] if self.pending[rung] else None
@@ -0,0 +1,100 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import bisect
+import heapq
+
+
+class Leaderboard(object):
+    """Finalized trials of one rung, ranked by their final metric.
+
+    The leaderboard is updated incrementally whenever a trial of the rung finalizes, so promotion decisions do not
+    have to collect and sort all trials of the rung again. Trials are kept in a sorted list, with the best trial
+    first, and the trials that were not promoted yet in a heap, so the best promotion candidate is found in
+    O(log n).
+
+    Trials with equal metrics are ranked in the order they were added.
+    """
+
+    def __init__(self, direction="min"):
+        """
+        :param direction: direction of the optimization, if `max` the highest metric is the best, else the lowest
+        :type direction: str
+        """
+        self.direction = direction
+        self._multiplier = -1 if direction == "max" else 1
+        # sorted list of (key, seq, trial_id), the best trial first
+        self._ranking = []
+        # heap of the entries of trials that were not promoted yet
+        self._unpromoted = []
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._ranking)
+
+    def __contains__(self, trial_id):
+        return trial_id in self._entries
+
+    def add(self, trial_id, metric):
+        """adds a finalized trial, trials that were already added are ignored
+
+        :param trial_id: id of the trial
+        :type trial_id: str
+        :param metric: final metric of the trial
+        :type metric: float
+        """
+        if trial_id in self._entries:
+            return
+        entry = (metric * self._multiplier, len(self._entries), trial_id)
+        self._entries[trial_id] = entry
+        bisect.insort(self._ranking, entry)
+        heapq.heappush(self._unpromoted, entry)
+
+    def top(self, k):
+        """returns the ids of the `k` best trials, best first
+
+        :rtype: list[str]
+        """
+        return [trial_id for _, _, trial_id in self._ranking[: max(k, 0)]]
+
+    def rank(self, trial_id):
+        """returns the position of a trial in the leaderboard, 0 being the best"""
+        return bisect.bisect_left(self._ranking, self._entries[trial_id])
+
+    def promotion_candidate(self, k):
+        """returns the id of the best trial among the `k` best trials that was not promoted yet, or None
+
+        :param k: number of trials at the top of the leaderboard that can be promoted
+        :type k: int
+        :rtype: str|None
+        """
+        if not self._unpromoted:
+            return None
+        # the best unpromoted trial is the only candidate, if it is not in the top k, no other unpromoted trial is
+        trial_id = self._unpromoted[0][2]
+        if self.rank(trial_id) < k:
+            return trial_id
+        return None
+
+    def promote(self, trial_id):
+        """marks the best unpromoted trial, as returned by `promotion_candidate()`, as promoted"""
+        if not self._unpromoted or self._unpromoted[0][2] != trial_id:
+            raise ValueError(
+                "Only the best unpromoted trial can be promoted, got {}".format(
+                    trial_id
+                )
+            )
+        heapq.heappop(self._unpromoted)
@@ -15,6 +15,7 @@
 #
 
 import json
+import numbers
 import random
 
 import numpy as np
@@ -62,9 +63,14 @@ class Searchspace(object):
     DISCRETE = "DISCRETE"
     CATEGORICAL = "CATEGORICAL"
 
+    # ways to sample random configs, see `get_random_parameter_values()`
+    SAMPLING_METHODS = ["random", "halton", "lhs"]
+
     def __init__(self, **kwargs):
         self._hparam_types = {}
         self._names = []
+        # column layout for the batch transforms, built lazily
+        self._columns = None
         for name, value in kwargs.items():
             self.add(name, value)
 
@@ -138,6 +144,7 @@ class Searchspace(object):
                 self._hparam_types[name] = param_type
                 setattr(self, name, value[1])
                 self._names.append(name)
+                self._columns = None
             else:
                 raise ValueError(
                     "Hyperparameter type is not of type DOUBLE, "
@@ -177,35 +184,156 @@ class Searchspace(object):
 
         return default
 
-    def get_random_parameter_values(self, num):
+    def contains_params(self, params):
+        """Checks if a parameter dictionary is a point of the searchspace.
+
+        :param params: parameter dictionary, e.g. of a trial from a previous experiment.
+        :type params: dict
+        :return: True if `params` has exactly the hyperparameters of the searchspace
+            and every value lies in its feasible region.
+        :rtype: bool
+        """
+        if set(params.keys()) != set(self._hparam_types.keys()):
+            return False
+        for name, value_type in self._hparam_types.items():
+            feasible_region = self.get(name)
+            value = params[name]
+            if value_type in [Searchspace.DOUBLE, Searchspace.INTEGER]:
+                if isinstance(value, bool) or not isinstance(value, numbers.Real):
+                    return False
+                if value_type == Searchspace.INTEGER and value != int(value):
+                    return False
+                if not feasible_region[0] <= value <= feasible_region[1]:
+                    return False
+            elif value not in feasible_region:
+                return False
+        return True
+
+    def get_random_parameter_values(self, num, rng=None, method="random"):
         """Generate random parameter dictionaries, e.g. to be used for initializing an optimizer.
 
         :param num: number of random parameter dictionaries to be generated.
         :type num: int
-        :raises ValueError: `num` is not an int.
+        :param rng: random number generator or seed. If None, the generator is seeded from the `random` module, so
+            `random.seed()` makes the sampling reproducible.
+        :type rng: np.random.Generator|int|None
+        :param method: `random` for independent uniform samples, `halton` or `lhs` for a space-filling design of all
+            `num` configs, see `SAMPLING_METHODS`.
+        :type method: str
+        :raises ValueError: `method` is not a sampling method.
         :return: a list containing parameter dictionaries
         :rtype: list
         """
-        return_list = []
-        for _ in range(num):
-            params = {}
-            for name, value in self.names().items():
-                feasible_region = self.get(name)
-                if value == Searchspace.DOUBLE:
-                    params[name] = random.uniform(
-                        feasible_region[0], feasible_region[1]
-                    )
-                elif value == Searchspace.INTEGER:
-                    params[name] = random.randint(
-                        feasible_region[0], feasible_region[1]
-                    )
-                elif value == Searchspace.DISCRETE:
-                    params[name] = random.choice(feasible_region)
-                elif value == Searchspace.CATEGORICAL:
-                    params[name] = random.choice(feasible_region)
-            return_list.append(params)
+        unit = self._sample_unit(num, len(self._names), rng, method)
+        columns = [
+            self._unit_to_values(name, unit[:, col])
+            for col, name in enumerate(self._names)
+        ]
+        return [dict(zip(self._names, values)) for values in zip(*columns)]
+
+    def sample_batch(self, num, rng=None, method="random", normalize_categorical=False):
+        """Samples a matrix of random hparams in the transformed representation of `transform_batch()`.
+
+        Same distribution as transforming the configs of `get_random_parameter_values()`, but without creating a
+        dict per config, e.g. for the candidates of an acquisition function.
+
+        :param num: number of configs, i.e. rows of the matrix
+        :type num: int
+        :param rng: random number generator or seed, see `get_random_parameter_values()`
+        :type rng: np.random.Generator|int|None
+        :param method: sampling method, see `get_random_parameter_values()`
+        :type method: str
+        :param normalize_categorical: If True, the encoded categorical hparam is also max-min normalized between 0 and 1
+        :type normalize_categorical: bool
+        :return: transformed hparams, shape (num, n_hparams)
+        :rtype: np.ndarray[np.float]
+        """
+        columns = self._get_columns()
+        transformed = self._sample_unit(num, len(self._names), rng, method)
+
+        idx = columns["INTEGER"]
+        if len(idx):
+            n_values = columns["upper"][idx] - columns["lower"][idx]
+            transformed[:, idx] = (
+                np.minimum(np.floor(transformed[:, idx] * (n_values + 1)), n_values)
+                / n_values
+            )
+
+        for col, lookup in columns["CATEGORICAL"]:
+            n_choices = len(lookup["choices"])
+            codes = np.minimum(np.floor(transformed[:, col] * n_choices), n_choices - 1)
+            if normalize_categorical:
+                codes = codes / max(n_choices - 1, 1)
+            transformed[:, col] = codes
+
+        return transformed
+
+    def _unit_to_values(self, name, unit):
+        """Maps samples of the unit interval uniformly to values of the hparam `name`
+
+        :return: hparam values
+        :rtype: list
+        """
+        hparam_type = self._hparam_types[name]
+        feasible_region = self.get(name)
+        if hparam_type == Searchspace.DOUBLE:
+            lower, upper = feasible_region
+            return (lower + unit * (upper - lower)).tolist()
+        if hparam_type == Searchspace.INTEGER:
+            lower, upper = feasible_region
+            offsets = np.floor(unit * (upper - lower + 1)).astype(int)
+            return (lower + np.minimum(offsets, upper - lower)).tolist()
+        choices = np.empty(len(feasible_region), dtype=object)
+        choices[:] = feasible_region
+        codes = np.floor(unit * len(choices)).astype(int)
+        return choices[np.minimum(codes, len(choices) - 1)].tolist()
+
+    @staticmethod
+    def _sample_unit(num, n_dims, rng, method):
+        """Returns `num` points of the unit hypercube, independent uniform samples or a space-filling design
+
+        :return: points, shape (num, n_dims)
+        :rtype: np.ndarray[np.float]
+        """
+        if method not in Searchspace.SAMPLING_METHODS:
+            raise ValueError(
+                "expected sampling method to be in {}, got {}".format(
+                    Searchspace.SAMPLING_METHODS, method
+                )
+            )
+        if rng is None:
+            rng = random.getrandbits(64)
+        rng = np.random.default_rng(rng)
+
+        if method == "lhs":
+            # latin hypercube: every dimension has one point in each of its `num` strata, the strata are paired
+            # randomly across dimensions
+            strata = rng.random((num, n_dims)).argsort(axis=0)
+            return (strata + rng.random((num, n_dims))) / num
+        if method == "halton":
+            # radical inverses of 1..num in the first `n_dims` prime bases, randomly shifted modulo 1 so that
+            # repeated designs differ
+            points = np.zeros((num, n_dims))
+            for dim, base in enumerate(Searchspace._primes(n_dims)):
+                indices = np.arange(1, num + 1)
+                factor = 1.0 / base
+                while indices.any():
+                    points[:, dim] += indices % base * factor
+                    indices //= base
+                    factor /= base
+            return (points + rng.random(n_dims)) % 1.0
+        return rng.random((num, n_dims))
 
-        return return_list
+    @staticmethod
+    def _primes(num):
+        """Returns the first `num` prime numbers"""
+        primes = []
+        candidate = 2
+        while len(primes) < num:
+            if all(candidate % prime for prime in primes):
+                primes.append(candidate)
+            candidate += 1
+        return primes
 
     def __iter__(self):
         self._returned = self._names.copy()
@@ -352,6 +480,151 @@ class Searchspace(object):
 
         return hparams
 
+    def transform_batch(self, hparams, normalize_categorical=False):
+        """Transforms a matrix of hyperparameters, one row per trial, like `transform()`.
+
+        Instead of calling `transform()` for every row, every hparam type is transformed with one numpy expression
+        over all of its columns. Columns after the last hparam of the searchspace (e.g. the budget) are omitted.
+
+        :param hparams: hparams in original representation, shape (n_trials, n_hparams)
+        :type hparams: 2D np.ndarray
+        :param normalize_categorical: If True, the encoded categorical hparam is also max-min normalized between 0 and 1
+        `inverse_transform_batch()` must use the same value for this parameter
+        :type normalize_categorical: bool
+        :return: transformed hparams, shape (n_trials, n_hparams)
+        :rtype: np.ndarray[np.float]
+        """
+        columns = self._get_columns()
+        hparams = np.asarray(hparams)
+        if hparams.size == 0:
+            return np.empty((0, len(self._names)))
+
+        transformed = np.empty((hparams.shape[0], len(self._names)))
+
+        idx = columns["DOUBLE"]
+        if len(idx):
+            values = hparams[:, idx].astype(float)
+            transformed[:, idx] = self._normalize_columns(values, columns)
+
+        idx = columns["INTEGER"]
+        if len(idx):
+            values = np.trunc(hparams[:, idx].astype(float))
+            transformed[:, idx] = self._normalize_columns(values, columns, idx)
+
+        for col, lookup in columns["CATEGORICAL"]:
+            # look up the code of every distinct value once, without sorting the
+            # values, categories of mixed types (e.g. None) are not comparable
+            cache = {}
+            codes = np.empty(hparams.shape[0])
+            for row, value in enumerate(hparams[:, col]):
+                code = cache.get(value)
+                if code is None:
+                    code = cache[value] = Searchspace._lookup_categorical(lookup, value)
+                codes[row] = code
+            if normalize_categorical:
+                codes = np.clip(codes / (len(lookup["choices"]) - 1), 0.0, 1.0)
+            transformed[:, col] = codes
+
+        return transformed
+
+    def inverse_transform_batch(self, transformed_hparams, normalize_categorical=False):
+        """Returns hparams of several trials in the representation specified when instantiated, like
+        `inverse_transform()` for every row.
+
+        :param transformed_hparams: hparams in transformed representation, shape (n_trials, n_hparams)
+        :type transformed_hparams: 2D np.ndarray
+        :param normalize_categorical: If True, the encoded categorical hparam was also max-min normalized between 0 and 1
+        `transform_batch()` must use the same value for this parameter
+        :type normalize_categorical: bool
+        :return: hparams of every trial in list representation
+        :rtype: list[list]
+        """
+        columns = self._get_columns()
+        transformed_hparams = np.asarray(transformed_hparams, dtype=float)
+        if transformed_hparams.size == 0:
+            return []
+        n_rows = transformed_hparams.shape[0]
+        hparams = [None] * len(self._names)
+
+        for hparam_type in ["DOUBLE", "INTEGER"]:
+            idx = columns[hparam_type]
+            if not len(idx):
+                continue
+            values = (
+                transformed_hparams[:, idx]
+                * (columns["upper"][idx] - columns["lower"][idx])
+                + columns["lower"][idx]
+            )
+            if hparam_type == "INTEGER":
+                values = np.round(values).astype(int)
+            for i, col in enumerate(idx):
+                hparams[col] = values[:, i].tolist()
+
+        for col, lookup in columns["CATEGORICAL"]:
+            codes = transformed_hparams[:, col]
+            if normalize_categorical:
+                codes = np.round(codes * (len(lookup["choices"]) - 1))
+            hparams[col] = lookup["choices"][codes.astype(int)].tolist()
+
+        return [
+            [hparams[col][row] for col in range(len(hparams))] for row in range(n_rows)
+        ]
+
+    def _get_columns(self):
+        """Returns the column layout used by the batch transforms
+
+        Contains the column indices of DOUBLE and INTEGER hparams, vectors with their lower and upper bounds and the
+        lookup tables of the CATEGORICAL hparams.
+        """
+        if self._columns is None:
+            n_hparams = len(self._names)
+            columns = {
+                "DOUBLE": [],
+                "INTEGER": [],
+                "CATEGORICAL": [],
+                "lower": np.zeros(n_hparams),
+                "upper": np.ones(n_hparams),
+            }
+            for col, name in enumerate(self._names):
+                hparam_type = self._hparam_types[name]
+                values = self.get(name)
+                if hparam_type in [Searchspace.DOUBLE, Searchspace.INTEGER]:
+                    columns[hparam_type].append(col)
+                    columns["lower"][col], columns["upper"][col] = values
+                elif hparam_type == Searchspace.CATEGORICAL:
+                    choices = np.empty(len(values), dtype=object)
+                    choices[:] = values
+                    codes = {value: code for code, value in enumerate(values)}
+                    columns["CATEGORICAL"].append(
+                        (col, {"choices": choices, "codes": codes})
+                    )
+                else:
+                    raise NotImplementedError("Not Implemented other types yet")
+            columns["DOUBLE"] = np.array(columns["DOUBLE"], dtype=int)
+            columns["INTEGER"] = np.array(columns["INTEGER"], dtype=int)
+            self._columns = columns
+        return self._columns
+
+    @staticmethod
+    def _normalize_columns(values, columns, idx=None):
+        """Returns max-min normalized columns of DOUBLE (default) or INTEGER hparams, clipped to [0, 1]"""
+        if idx is None:
+            idx = columns["DOUBLE"]
+        lower = columns["lower"][idx]
+        upper = columns["upper"][idx]
+        return np.clip((values - lower) / (upper - lower), 0.0, 1.0)
+
+    @staticmethod
+    def _lookup_categorical(lookup, value):
+        """Returns the code of a category, also matching categories that were converted to strings by numpy"""
+        codes = lookup["codes"]
+        if value in codes:
+            return codes[value]
+        for choice, code in codes.items():
+            if str(choice) == str(value):
+                return code
+        raise ValueError("{} is not a valid category".format(value))
+
     @staticmethod
     def _encode_categorical(choices, value):
         """Encodes category to integer. The encoding is the list index of the category
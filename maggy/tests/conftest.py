@@ -30,6 +30,15 @@ from pyspark import SparkConf
 from pyspark import SparkContext
 from pyspark.streaming import StreamingContext
 
+from maggy.core.environment.base import BaseEnv
+
+
+class LocalEnv(BaseEnv):
+    """ base environment without an experiment log dir in the working dir """
+
+    def __init__(self, log_dir):
+        self.log_dir = log_dir
+
 
 def quiet_py4j():
     """ turn down spark logging for the test context """
@@ -86,3 +95,14 @@ def hive_context(sc):
 @pytest.fixture(scope="session")
 def streaming_context(sc):
     return StreamingContext(sc, 1)
+
+
+@pytest.fixture
+def local_env(tmpdir):
+    """fixture for a local environment that logs to a temporary directory
+    Args:
+        tmpdir: pytest tmpdir fixture
+    Returns:
+        LocalEnv for tests
+    """
+    return LocalEnv(str(tmpdir))
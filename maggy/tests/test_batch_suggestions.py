@@ -0,0 +1,72 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+
+import random
+
+from maggy import Searchspace
+from maggy.optimizer import RandomSearch, bayes
+from maggy.trial import Trial
+
+
+def test_get_suggestions_tpe():
+
+    random.seed(2)
+    tpe = bayes.TPE(num_warmup_trials=15, random_fraction=0.0)
+    tpe.searchspace = Searchspace(x=("DOUBLE", [0.0, 1.0]), y=("DOUBLE", [0.0, 1.0]))
+    tpe.num_trials = 50
+    tpe.trial_store = {}
+    tpe.final_store = []
+    tpe.direction = "min"
+    priors = []
+    for params in tpe.searchspace.get_random_parameter_values(20):
+        trial = Trial(params)
+        trial.status = Trial.FINALIZED
+        trial.final_metric = params["x"] + params["y"]
+        priors.append(trial)
+    tpe.warm_start(priors)
+    tpe.initialize()
+
+    num_updates = []
+    update_model = tpe.update_model
+
+    def counting_update_model(budget=0):
+        num_updates.append(budget)
+        update_model(budget)
+
+    tpe.update_model = counting_update_model
+    trials = tpe.get_suggestions(8)
+
+    # one model for the whole batch
+    assert num_updates == [0]
+    assert len({trial.trial_id for trial in trials}) == 8
+    assert all(trial.info_dict["sample_type"] == "model" for trial in trials)
+    assert not tpe.in_batch()
+
+
+def test_get_suggestions_ends_early():
+
+    rs = RandomSearch()
+    rs.searchspace = Searchspace(lr=("DOUBLE", [0.0, 1.0]))
+    rs.num_trials = 2
+    rs.trial_store = {}
+    rs.final_store = []
+    rs.initialize()
+
+    suggestions = rs.get_suggestions(4)
+    assert len(suggestions) == 3
+    assert all(isinstance(trial, Trial) for trial in suggestions[:2])
+    assert suggestions[2] is None
@@ -0,0 +1,286 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import itertools
+import queue
+import socket
+import threading
+import time
+
+from maggy import Searchspace, util
+from maggy.core import rpc
+from maggy.core.environment.singleton import EnvSing
+from maggy.core.experiment_driver.driver import DispatchStats, Driver
+from maggy.core.experiment_driver.optimization_driver import OptimizationDriver
+from maggy.experiment_config import OptimizationConfig
+from maggy.trial import Trial
+
+
+class QueueDriver(Driver):
+    """Driver with only the message digestion, without Spark and RPC server."""
+
+    MAX_QUEUE_WAIT = 10.0
+
+    def __init__(self):
+        self._message_q = queue.Queue()
+        self._deferred_msgs = []
+        self._deferred_lock = threading.Lock()
+        self._deferred_count = itertools.count()
+        self._digest_thread = None
+        self.dispatch_stats = DispatchStats()
+        self.message_callbacks = {}
+        self._register_msg_callbacks()
+        self.worker_done = False
+        self.exception = None
+        self.received = queue.Queue()
+
+    def _register_msg_callbacks(self):
+        self.message_callbacks["TEST"] = lambda msg: self.received.put(
+            (time.time(), msg["id"])
+        )
+
+    def _exp_startup_callback(self):
+        pass
+
+    def _exp_final_callback(self, job_end, exp_json):
+        pass
+
+    def _exp_exception_callback(self, exc):
+        pass
+
+    def _patching_fn(self, train_fn):
+        pass
+
+    def stop_worker(self):
+        self.worker_done = True
+        self._message_q.put(None)
+        self._digest_thread.join(5)
+
+
+def test_deferred_due_time():
+
+    driver = QueueDriver()
+    driver._start_worker()
+    start = time.time()
+    driver.add_deferred_message({"type": "TEST", "id": 2}, 0.2)
+    driver.add_deferred_message({"type": "TEST", "id": 1}, 0.1)
+    driver.add_message({"type": "TEST", "id": 0})
+
+    received = [driver.received.get(timeout=5) for _ in range(3)]
+    driver.stop_worker()
+    assert [msg_id for _, msg_id in received] == [0, 1, 2]
+    # the worker waits for the next due time, not for MAX_QUEUE_WAIT
+    assert 0.1 <= received[1][0] - start < 1.0
+    assert 0.2 <= received[2][0] - start < 1.0
+    assert driver.dispatch_stats.num_dispatched == 3
+    assert driver.dispatch_stats.num_deferred == 2
+
+
+def test_deferred_wakeup():
+
+    driver = QueueDriver()
+    driver.add_deferred_message({"type": "TEST", "id": 0}, 60)
+    driver.add_deferred_message({"type": "TEST", "id": 1}, 5, wakeup=False)
+    driver.add_deferred_message({"type": "TEST", "id": 2}, 60)
+    driver._start_worker()
+    driver.wakeup_deferred()
+
+    received = [driver.received.get(timeout=5)[1] for _ in range(2)]
+    assert received == [0, 2]
+    # timers that are not woken up stay in the heap
+    assert [entry[2]["id"] for entry in driver._deferred_msgs] == [1]
+    assert 4 < driver._release_deferred_messages() <= 5
+    driver.stop_worker()
+
+
+def test_deferred_timeout_recomputed():
+
+    driver = QueueDriver()
+    driver._start_worker()
+    # let the worker block with the full MAX_QUEUE_WAIT timeout
+    time.sleep(0.1)
+    start = time.time()
+    threading.Thread(
+        target=driver.add_deferred_message, args=({"type": "TEST", "id": 0}, 0.1)
+    ).start()
+
+    done, msg_id = driver.received.get(timeout=5)
+    driver.stop_worker()
+    assert msg_id == 0
+    assert 0.1 <= done - start < 1.0
+
+
+class _Closable:
+    def __init__(self):
+        self.closed = False
+
+    def stop(self):
+        self.closed = True
+
+    close = stop
+    flush = stop
+
+
+def test_stop_joins_worker():
+
+    driver = QueueDriver()
+    driver.server = _Closable()
+    driver.writer = _Closable()
+    driver.log_file_handle = _Closable()
+    driver.logs = []
+    driver.log = driver.logs.append
+    driver._start_worker()
+    driver.add_message({"type": "TEST", "id": 0})
+    driver.received.get(timeout=5)
+
+    worker_alive = []
+    driver.writer.close = lambda: worker_alive.append(driver._digest_thread.is_alive())
+
+    driver.stop()
+    # the stats are logged once the worker recorded its CPU time
+    assert not driver._digest_thread.is_alive()
+    # callbacks cannot write anymore once the writer is closed
+    assert worker_alive == [False]
+    assert "digest_cpu_util" in driver.logs[-1]
+    assert driver.dispatch_stats.num_dispatched == 1
+
+
+def test_dispatch_stats():
+
+    stats = DispatchStats()
+    stats.record(0.01, 0.002)
+    stats.record(0.03, 0.004)
+    stats.record_assignment(0.5)
+
+    summary = stats.to_dict()
+    assert summary["dispatched"] == 2
+    assert abs(summary["avg_latency_ms"] - 20) < 1e-6
+    assert abs(summary["max_latency_ms"] - 30) < 1e-6
+    assert abs(summary["avg_handling_ms"] - 3) < 1e-6
+    assert abs(summary["avg_assign_to_start_ms"] - 500) < 1e-6
+
+
+class FakeSpark:
+    sparkContext = None
+
+
+def _optimization_driver(monkeypatch, local_env, num_executors):
+    monkeypatch.setattr(util, "find_spark", FakeSpark)
+    monkeypatch.setattr(util, "num_executors", lambda sc: num_executors)
+    monkeypatch.setattr(EnvSing, "get_instance", lambda: local_env)
+    local_env.create_experiment_dir("app", 1)
+    config = OptimizationConfig(
+        num_trials=4,
+        optimizer="randomsearch",
+        searchspace=Searchspace(x=("DOUBLE", [0, 1])),
+        es_policy="none",
+    )
+    driver = OptimizationDriver(config, "app", 1)
+    driver.logs = []
+    driver.log = driver.logs.append
+    for partition_id in range(num_executors):
+        driver.server.reservations.add(
+            {
+                "partition_id": partition_id,
+                "host_port": ("127.0.0.1", 0),
+                "task_attempt": 0,
+                "trial_id": None,
+            }
+        )
+        driver._register_msg_callback({"partition_id": partition_id})
+    driver._idle_msg_callback({"type": "IDLE"})
+    return driver
+
+
+def test_departed_executor_requeue(monkeypatch, local_env):
+
+    driver = _optimization_driver(monkeypatch, local_env, 2)
+    reservations = driver.server.reservations
+    lost_id = reservations.get_assigned_trial(0)
+    other_id = reservations.get_assigned_trial(1)
+    assert lost_id is not None and other_id is not None
+
+    # executor 0 stops sending heartbeats
+    reservations.get()[0]["last_seen"] = time.time() - 60
+    driver._check_msg_callback({"type": "CHECK"})
+    lost = driver.get_trial(lost_id)
+    assert lost.status == Trial.PENDING
+    assert list(driver._resumed_trials) == [lost]
+
+    # the requeued trial runs before any new one on the remaining executor
+    driver._final_msg_callback({"partition_id": 1, "trial_id": other_id, "data": 0.5})
+    assert reservations.get_assigned_trial(1) == lost_id
+    assert lost.status == Trial.SCHEDULED
+    assert not driver._resumed_trials
+
+    # the late result of the departed executor is dropped
+    num_queued = driver._message_q.qsize()
+    resp = {}
+    driver.server._final_callback(
+        resp, {"partition_id": 0, "trial_id": lost_id, "data": 1.0}, driver
+    )
+    assert resp["type"] == "OK"
+    assert driver._message_q.qsize() == num_queued
+    resp = {}
+    driver.server._get_callback(resp, {"partition_id": 0}, driver)
+    assert resp["type"] == "GSTOP"
+    assert [trial.trial_id for trial in driver._final_store] == [other_id]
+    driver.journal.close()
+    driver.writer.close()
+
+
+def test_requeue_without_executors(monkeypatch, local_env):
+
+    driver = _optimization_driver(monkeypatch, local_env, 1)
+    trial_id = driver.server.reservations.get_assigned_trial(0)
+    driver.server.reservations.get()[0]["last_seen"] = time.time() - 60
+    driver._check_msg_callback({"type": "CHECK"})
+
+    assert [trial.trial_id for trial in driver._resumed_trials] == [trial_id]
+    assert not driver.experiment_done
+    assert any("No executor left" in log for log in driver.logs)
+    driver.journal.close()
+    driver.writer.close()
+
+
+def test_held_get_answered_on_assignment(monkeypatch, local_env):
+
+    driver = _optimization_driver(monkeypatch, local_env, 1)
+    server = driver.server
+    # server state of start(), without listening
+    server._exp_driver = driver
+    server._wakeup_r, server._wakeup_w = socket.socketpair()
+    first_id = server.reservations.get_assigned_trial(0)
+    resp = {}
+    final = {"partition_id": 0, "trial_id": first_id, "data": 0.5}
+    server._final_callback(resp, final, driver)
+
+    # the executor asks for its next trial before the driver assigned it
+    get = {"partition_id": 0, "type": "GET", "data": {"wait": 30.0}}
+    assert server._process(None, get, driver) is None
+    driver._final_msg_callback(final)
+
+    # the trial is stored before the assignment answers the held GET
+    _, data = server._responses.popleft()
+    resp = server.decode(memoryview(data)[rpc.HEADER.size :])
+    next_id = server.reservations.get_assigned_trial(0)
+    assert resp["type"] == "TRIAL"
+    assert resp["trial_id"] == next_id != first_id
+    assert resp["data"] == driver.get_trial(next_id).params
+    server._wakeup_r.close()
+    server._wakeup_w.close()
+    driver.journal.close()
+    driver.writer.close()
@@ -0,0 +1,90 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import io
+
+import numpy as np
+import pytest
+
+from maggy import Searchspace
+from maggy.optimizer import bayes
+from maggy.trial import Trial
+
+
+def _gp(**acq_optimizer_kwargs):
+    gp = bayes.GP(
+        num_warmup_trials=5,
+        acq_optimizer_kwargs=dict(n_points=500, **acq_optimizer_kwargs),
+        seed=0,
+    )
+    gp.searchspace = Searchspace(x=("DOUBLE", [0.0, 1.0]), y=("DOUBLE", [0.0, 1.0]))
+    gp.num_trials = 50
+    gp.trial_store = {}
+    gp.final_store = []
+    gp.direction = "min"
+    priors = []
+    for params in gp.searchspace.get_random_parameter_values(
+        20, rng=np.random.default_rng(1)
+    ):
+        trial = Trial(params)
+        trial.status = Trial.FINALIZED
+        trial.final_metric = (params["x"] - 0.3) ** 2 + params["y"]
+        priors.append(trial)
+    gp.warm_start(priors)
+    gp.initialize()
+    return gp
+
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_gp_n_jobs(backend):
+
+    serial = _gp()
+    serial.update_model(0)
+    parallel = _gp(n_jobs=2, backend=backend, chunk_size=64)
+    # the same fitted model, so only the evaluation differs
+    parallel.models = serial.models
+
+    X = serial.searchspace.sample_batch(
+        500, rng=np.random.default_rng(2), normalize_categorical=True
+    )
+    y_opt = serial.ybest(0)
+    expected = serial._evaluate_candidates(X, 0, y_opt)
+    assert np.allclose(parallel._evaluate_candidates(X, 0, y_opt), expected)
+    assert parallel._executor is not None
+
+    # the concurrent lbfgs restarts find the same next config
+    serial.rng = np.random.default_rng(3)
+    parallel.rng = np.random.default_rng(3)
+    expected = serial.sampling_routine(0)
+    actual = parallel.sampling_routine(0)
+    assert expected.keys() == actual.keys()
+    assert np.allclose(list(actual.values()), list(expected.values()))
+
+    executor = parallel._executor
+    parallel.finalize_experiment([])
+    assert parallel._executor is None
+    with pytest.raises(RuntimeError):
+        executor.submit(abs, 1)
+
+    # a failed experiment is not finalized, the pool is released on shutdown
+    parallel._evaluate_candidates(X, 0, y_opt)
+    executor = parallel._executor
+    parallel.fd = io.StringIO()
+    parallel._shutdown()
+    assert parallel._executor is None
+    assert parallel.fd.closed
+    with pytest.raises(RuntimeError):
+        executor.submit(abs, 1)
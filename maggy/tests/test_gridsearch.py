@@ -0,0 +1,82 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import itertools
+import math
+
+import pytest
+
+from maggy import Searchspace
+from maggy.optimizer import GridSearch
+from maggy.optimizer.gridsearch import Grid
+
+
+def make_searchspace(n_hparams=3):
+    return Searchspace(
+        **{
+            "hparam{}".format(i): ("CATEGORICAL", list(range(i + 2)))
+            for i in range(n_hparams)
+        }
+    )
+
+
+def test_grid():
+
+    sp = make_searchspace()
+    product = [
+        sp.list_to_dict(hparams)
+        for hparams in itertools.product(*[item["values"] for item in sp.items()])
+    ]
+    grid = Grid(sp)
+    assert len(grid) == 24
+    assert [grid[index] for index in range(len(grid))] == product
+    with pytest.raises(IndexError):
+        grid[24]
+
+    # every order visits each config once
+    for order in Grid.ORDERS:
+        grid = Grid(sp, order=order, seed=7)
+        indices = [grid.get_index(position) for position in range(len(grid))]
+        assert sorted(indices) == list(range(24))
+    assert indices == [Grid(sp, "shuffled", 7).get_index(p) for p in range(24)]
+    assert indices != [Grid(sp, "shuffled", 8).get_index(p) for p in range(24)]
+
+    # the size is computed without enumerating the grid
+    grid = Grid(make_searchspace(20), order="shuffled")
+    assert grid.size == math.factorial(21)
+    assert grid.get_index(grid.size - 1) < grid.size
+
+
+def test_gridsearch_shards():
+
+    sp = make_searchspace()
+    suggested = []
+    for shard in range(5):
+        optimizer = GridSearch(order="strided", shard=shard, num_shards=5)
+        optimizer.searchspace = sp
+        optimizer.num_trials = optimizer.get_num_trials(sp)
+        optimizer.initialize()
+        trials = []
+        trial = optimizer.get_suggestion()
+        while trial is not None:
+            trials.append(trial)
+            trial = optimizer.get_suggestion()
+        assert len(trials) == optimizer.num_trials
+        suggested += [trial.params for trial in trials]
+
+    # the shards split the grid
+    assert len(suggested) == 24
+    assert sorted(suggested, key=sp.dict_to_list) == [Grid(sp)[i] for i in range(24)]
@@ -0,0 +1,63 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+from maggy import Searchspace
+from maggy.core.journal import Journal
+from maggy.optimizer import RandomSearch
+from maggy.trial import Trial
+
+
+def test_journal(tmpdir, local_env):
+
+    log_dir = str(tmpdir)
+    journal = Journal(local_env, log_dir)
+    trial = Trial({"lr": 0.1, "budget": 3}, info_dict={"sample_type": "random"})
+    journal.trial_created(trial)
+    journal.trial_assigned(trial.trial_id, 2)
+    journal.trial_metrics(trial.trial_id, [0, 1], [0.5, 0.25])
+    trial.final_metric = 0.25
+    journal.trial_finalized(trial)
+    journal.close()
+
+    # a record that was cut off when the driver died is ignored
+    with open(Journal.get_path(log_dir), "ab") as fd:
+        fd.write(b"\x00\x00\x01\x00\x12")
+
+    records = Journal.read(local_env, log_dir)
+    assert [record["type"] for record in records] == [
+        Journal.CREATE,
+        Journal.ASSIGN,
+        Journal.METRIC,
+        Journal.FINAL,
+    ]
+    restored = Journal.to_trial(records[0])
+    assert restored.trial_id == trial.trial_id
+    assert restored.params == trial.params
+    assert restored.info_dict == trial.info_dict
+    assert records[3]["final_metric"] == 0.25
+
+
+def test_replay_suggestion():
+
+    optimizer = RandomSearch()
+    optimizer.searchspace = Searchspace(lr=("DOUBLE", [0.0, 1.0]))
+    optimizer.num_trials = 2
+    optimizer.initialize()
+
+    trial = Trial({"lr": 0.5})
+    assert optimizer.replay_suggestion(trial) is trial
+    assert optimizer.get_suggestion() is not trial
+    assert optimizer.get_suggestion() is None
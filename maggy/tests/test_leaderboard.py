@@ -0,0 +1,57 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+from maggy import Searchspace
+from maggy.optimizer.asha import Asha
+from maggy.pruner.leaderboard import Leaderboard
+from maggy.trial import Trial
+
+
+def test_leaderboard():
+
+    leaderboard = Leaderboard("max")
+    for trial_id, metric in [("a", 0.5), ("b", 0.9), ("c", 0.1), ("d", 0.9)]:
+        leaderboard.add(trial_id, metric)
+    leaderboard.add("a", 1.0)
+
+    assert len(leaderboard) == 4
+    assert leaderboard.top(3) == ["b", "d", "a"]
+    assert leaderboard.rank("c") == 3
+
+    assert leaderboard.promotion_candidate(1) == "b"
+    leaderboard.promote("b")
+    # best unpromoted trial "d" is not in the top 1 anymore
+    assert leaderboard.promotion_candidate(1) is None
+    assert leaderboard.promotion_candidate(2) == "d"
+
+
+def test_asha_promotes_by_direction():
+
+    for direction, best in [("min", 0.0), ("max", 8.0)]:
+        asha = Asha(reduction_factor=3, resource_min=1, resource_max=3)
+        asha.searchspace = Searchspace(lr=("DOUBLE", [0.0, 1.0]))
+        asha.num_trials = 9
+        asha.direction = direction
+        asha.initialize()
+
+        trials = [asha.get_suggestion() for _ in range(3)]
+        for metric, trial in enumerate(trials):
+            trial.status = Trial.FINALIZED
+            trial.final_metric = float(metric * 4)
+
+        promoted = asha.get_suggestion(trials[-1])
+        assert promoted.params["budget"] == 3
+        assert promoted.params["lr"] == trials[int(best) // 4].params["lr"]
@@ -0,0 +1,51 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+from maggy.core import logbuffer, wire
+from maggy.core.logbuffer import LogBuffer
+
+
+def test_log_buffer():
+
+    buffer = LogBuffer(max_lines=3, max_line_length=5)
+    buffer.extend("0: a\n0: b\n")
+    buffer.append("0: long line")
+    assert buffer.drain() == "0: a\n0: b\n0: lo" + LogBuffer.TRUNCATED + "\n"
+    assert buffer.drain() == ""
+
+    buffer.extend("\n".join(str(i) for i in range(10)))
+    buffer.append("10")
+    assert len(buffer) == 3
+    assert buffer.drain() == "[8 log lines dropped]\n8\n9\n10\n"
+
+
+def test_compressed_logs():
+
+    logs = "0: epoch done\n" * 1000
+    assert logbuffer.compress("", 10) is None
+    assert logbuffer.compress(logs, None) == logs
+    packed = logbuffer.compress(logs, 10)
+    assert isinstance(packed, bytes) and len(packed) < len(logs)
+
+    msg = {
+        "partition_id": 0,
+        "type": "FINAL",
+        "secret": "abc",
+        "trial_id": "f00",
+        "logs": packed,
+        "data": 0.5,
+    }
+    assert logbuffer.decompress(wire.decode(wire.encode(msg))["logs"]) == logs
@@ -0,0 +1,98 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import random
+import statistics
+
+import pytest
+
+from maggy.earlystop import MedianStoppingRule
+from maggy.trial import Trial
+
+
+def _trial(rng, num, length):
+    trial = Trial({"num": num})
+    trial.append_metric(
+        {"steps": list(range(length)), "values": [rng.random() for _ in range(length)]}
+    )
+    return trial
+
+
+def _reference_check(to_check, finalized_trials, direction):
+    """The previous implementation, rescanning all finalized trials."""
+    step = len(to_check.metric_history)
+    results = [
+        sum(trial.metric_history[:step]) / float(step)
+        for trial in finalized_trials
+        if len(trial.metric_history) >= step
+    ]
+    median = statistics.median(results)
+    if direction == "max" and max(to_check.metric_history) < median:
+        return to_check.trial_id
+    if direction == "min" and min(to_check.metric_history) > median:
+        return to_check.trial_id
+    return None
+
+
+def test_median_rule_reference():
+
+    rng = random.Random(0)
+    for direction in ["max", "min"]:
+        rule = MedianStoppingRule()
+        finalized = []
+        num_stopped = 0
+        for num in range(60):
+            trial = _trial(rng, num, rng.randint(1, 30))
+            finalized.append(trial)
+            rule.trial_finalized(trial, direction)
+            to_check = _trial(rng, -1, rng.randint(1, 5))
+            expected = _reference_check(to_check, finalized, direction)
+            assert rule.earlystop_check(to_check, finalized, direction) == expected
+            num_stopped += expected is not None
+        assert 0 < num_stopped < 60
+
+
+def test_median_rule_lazy_index():
+
+    rng = random.Random(1)
+    finalized = [_trial(rng, num, rng.randint(3, 10)) for num in range(10)]
+    rule = MedianStoppingRule()
+    # trials finalized without calling the hook are indexed on the first check
+    for _ in range(20):
+        to_check = _trial(rng, -1, rng.randint(1, 3))
+        expected = _reference_check(to_check, finalized, "max")
+        assert rule.earlystop_check(to_check, finalized, "max") == expected
+        finalized.append(_trial(rng, len(finalized), rng.randint(3, 10)))
+
+    # a replaced list of finalized trials is indexed again
+    replaced = finalized[5:12]
+    for _ in range(20):
+        to_check = _trial(rng, -1, rng.randint(1, 3))
+        expected = _reference_check(to_check, replaced, "min")
+        assert rule.earlystop_check(to_check, replaced, "min") == expected
+
+
+def test_median_rule_no_median():
+
+    rng = random.Random(2)
+    finalized = [_trial(rng, num, 3) for num in range(3)]
+    rule = MedianStoppingRule()
+    with pytest.raises(Exception, match="no median"):
+        rule.earlystop_check(_trial(rng, -1, 4), finalized, "max")
+    with pytest.raises(Exception, match="no median"):
+        MedianStoppingRule().earlystop_check(_trial(rng, -1, 1), [], "max")
+    # no metrics to compare yet
+    assert rule.earlystop_check(Trial({"num": -1}), finalized, "max") is None
@@ -0,0 +1,66 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import numpy as np
+
+from maggy import Searchspace
+from maggy.optimizer.observations import ConfigIndex, ObservationStore
+from maggy.trial import Trial
+
+
+def test_observation_store():
+
+    sp = Searchspace(lr=("DOUBLE", [0.0, 1.0]), optimizer=("CATEGORICAL", ["a", "b"]))
+    final_store = []
+    store = ObservationStore()
+
+    for i in range(40):
+        trial = Trial({"lr": i / 40, "optimizer": "ab"[i % 2], "budget": 1 + i % 2})
+        trial.final_metric = float(i)
+        final_store.append(trial)
+        if i in [0, 16, 39]:
+            store.sync(final_store, "max", sp)
+
+    assert len(store) == 40
+    assert store.metrics().tolist() == [-float(i) for i in range(40)]
+    assert store.metrics(budget=2).tolist() == [-float(i) for i in range(1, 40, 2)]
+    assert store.hparams(budget=1)[1].tolist() == [2 / 40, "a", 1]
+    assert not store.metrics().flags.writeable
+
+    transformed = store.transformed_hparams(budget=2, normalize_categorical=True)
+    assert np.array_equal(
+        transformed, sp.transform_batch(store.hparams(budget=2), True)
+    )
+    assert store.get_trial(final_store[3].trial_id) is final_store[3]
+
+    # a new final store rebuilds the observations
+    store.sync(final_store[:2], "min", sp)
+    assert store.metrics().tolist() == [0.0, 1.0]
+
+
+def test_config_index():
+
+    sp = Searchspace(lr=("DOUBLE", [0.0, 1.0]), layers=("INTEGER", [1, 8]))
+    index = ConfigIndex(sp)
+    trial = Trial({"lr": 0.1, "layers": 3, "budget": 1})
+    index.add(trial)
+    index.add(Trial({"lr": 0.1, "layers": 3, "budget": 9}))
+
+    assert len(index) == 1
+    # budget is ignored and numbers are normalized
+    assert index.get({"lr": np.float64(0.1), "layers": 3.0}) == trial.trial_id
+    assert index.get({"lr": 0.1 + 1e-17, "layers": 3, "budget": 3}) == trial.trial_id
+    assert index.get({"lr": 0.2, "layers": 3}) is None
@@ -0,0 +1,43 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+from maggy.core import wire
+from maggy.core.reporter import MetricBuffer
+from maggy.trial import Trial
+
+
+def test_metric_buffer_batch():
+
+    buffer = MetricBuffer(4)
+    for step in range(6):
+        buffer.append(step, step / 10, 0.0)
+    # repeated step overwrites the latest value
+    buffer.append(5, 0.9, 0.0)
+    assert buffer.dropped == 2
+
+    steps, values = buffer.drain()
+    assert list(steps) == [2, 3, 4, 5]
+    assert list(values) == [0.2, 0.3, 0.4, 0.9]
+    assert len(buffer) == 0
+
+    data = wire.decode(
+        wire.encode({"type": "OK", "data": {"steps": steps, "values": values}})
+    )["data"]
+    trial = Trial({"x": 1})
+    trial.append_metric({"step": 2, "value": 0.5})
+    assert trial.append_metric(data) == 5
+    assert trial.step_history == [2, 3, 4, 5]
+    assert trial.metric_history == [0.5, 0.3, 0.4, 0.9]
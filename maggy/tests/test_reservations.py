@@ -0,0 +1,61 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+
+import time
+
+from maggy.core import rpc
+
+
+def _meta(partition_id):
+    return {
+        "partition_id": partition_id,
+        "host_port": ("127.0.0.1", 0),
+        "task_attempt": 0,
+        "trial_id": None,
+    }
+
+
+def test_elastic_reservations():
+
+    reservations = rpc.Reservations(4, elastic=True)
+    reservations.add(_meta(0))
+    # scheduling starts with the first executor
+    assert reservations.done()
+    reservations.add(_meta(1))
+    assert reservations.assign_trial(0, "a")
+
+    # executor 0 stops sending heartbeats
+    reservations.get()[0]["last_seen"] = time.time() - 10
+    assert reservations.touch(1)
+    assert reservations.remove_departed(5) == {0: "a"}
+    assert not reservations.touch(0)
+    assert not reservations.assign_trial(0, "b")
+
+    # a retried task registers again
+    reservations.add(_meta(0))
+    assert reservations.touch(0)
+    assert reservations.remove_departed(5) == {}
+
+
+def test_fixed_reservations():
+
+    reservations = rpc.Reservations(2)
+    reservations.add(_meta(0))
+    assert not reservations.done()
+    assert reservations.remaining() == 1
+    reservations.add(_meta(1))
+    assert reservations.done()
@@ -0,0 +1,45 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+from maggy.core.result_cache import ResultCache
+from maggy.trial import Trial
+
+
+def test_result_cache(tmpdir, local_env):
+
+    cache_dir = str(tmpdir) + "/cache"
+    trial = Trial({"lr": 0.1, "layers": 2})
+    trial.append_metric({"steps": [0, 1], "values": [0.5, 0.75]})
+    trial.final_metric = 0.75
+
+    cache = ResultCache(local_env, cache_dir, version="v1")
+    assert cache.get(trial) is None
+    cache.put(trial)
+
+    # the same hparams in a new experiment
+    entry = ResultCache(local_env, cache_dir, version="v1").get(
+        Trial({"layers": 2, "lr": 0.1})
+    )
+    assert entry["final_metric"] == 0.75
+    assert entry["steps"] == [0, 1] and entry["values"] == [0.5, 0.75]
+
+    # other code versions and metrics are cached separately
+    assert ResultCache(local_env, cache_dir, version="v2").get(trial) is None
+    assert ResultCache(local_env, cache_dir, "v1", "accuracy").get(trial) is None
+    assert (
+        ResultCache(local_env, cache_dir, "v1").get(Trial({"lr": 0.2, "layers": 2}))
+        is None
+    )
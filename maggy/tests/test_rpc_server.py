@@ -0,0 +1,230 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import queue
+import socket
+import time
+
+import pytest
+
+from maggy.core import rpc
+from maggy.core.environment.singleton import EnvSing
+
+
+class FakeTrial:
+    params = {"x": 1}
+    status = None
+    start = None
+
+    def get_early_stop(self):
+        return False
+
+
+class FakeDriver:
+    """Driver interface used by the OptimizationServer callbacks."""
+
+    _secret = "secret"
+    experiment_done = False
+
+    def __init__(self):
+        self.messages = queue.Queue()
+        self.trial = FakeTrial()
+
+    def add_message(self, msg):
+        self.messages.put(msg)
+
+    def get_trial(self, _):
+        return self.trial
+
+    def log(self, msg):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch, local_env):
+    monkeypatch.setattr(EnvSing, "get_instance", lambda: local_env)
+    monkeypatch.setattr(local_env, "get_ip_address", lambda: "127.0.0.1")
+    monkeypatch.setattr(rpc, "SERVER_HOST_PORT", None)
+    server = rpc.OptimizationServer(2)
+    driver = FakeDriver()
+    server.addr = server.start(driver)
+    server.driver = driver
+    yield server
+    server.stop()
+
+
+def _connect(server):
+    sock = socket.create_connection(server.addr)
+    sock.settimeout(10)
+    return sock
+
+
+def _metric(partition_id, secret="secret"):
+    return {
+        "partition_id": partition_id,
+        "type": "METRIC",
+        "secret": secret,
+        "trial_id": None,
+        "logs": None,
+        "data": None,
+    }
+
+
+def test_connection_partial_read():
+
+    client, server_sock = socket.socketpair()
+    server_sock.setblocking(False)
+    conn = rpc._Connection(server_sock)
+    msg_socket = rpc.MessageSocket()
+    small = msg_socket.frame(msg_socket.encode({"type": "OK", "data": 1}))
+    large_msg = {"type": "OK", "data": "x" * (3 * rpc.BUFSIZE)}
+    large = msg_socket.frame(msg_socket.encode(large_msg))
+
+    assert conn.read_payload() is None
+    # framing across recv boundaries, the header and payload in pieces
+    client.sendall(small[:2])
+    assert conn.read_payload() is None
+    client.sendall(small[2:7])
+    assert conn.read_payload() is None
+    client.sendall(small[7:])
+    assert msg_socket.decode(conn.read_payload()) == {"type": "OK", "data": 1}
+
+    # several messages in one recv, a larger one grows the buffer
+    client.sendall(small + large + small[:3])
+    assert msg_socket.decode(conn.read_payload()) == {"type": "OK", "data": 1}
+    assert msg_socket.decode(conn.read_payload()) == large_msg
+    assert len(conn.buffer) >= len(large) - rpc.HEADER.size
+    assert conn.read_payload() is None
+    client.sendall(small[3:])
+    assert msg_socket.decode(conn.read_payload()) == {"type": "OK", "data": 1}
+
+    client.close()
+    with pytest.raises(ConnectionError):
+        conn.read_payload()
+    server_sock.close()
+
+
+def test_connection_partial_write():
+
+    client, server_sock = socket.socketpair()
+    server_sock.setblocking(False)
+    conn = rpc._Connection(server_sock)
+    data = bytes(range(256)) * 8192
+    conn.queue(data[:1000])
+    conn.queue(data[1000:])
+
+    # the peer does not read, the rest stays queued
+    assert not conn.flush()
+    assert conn.out
+    received = bytearray()
+    client.settimeout(10)
+    while len(received) < len(data):
+        received += client.recv(1 << 16)
+        conn.flush()
+    assert conn.flush()
+    assert not conn.out
+    assert received == data
+    client.close()
+    server_sock.close()
+
+
+def test_server_close_handling(server):
+
+    # a client leaving in the middle of a message does not affect the others
+    broken = _connect(server)
+    broken.sendall(server.frame(server.encode(_metric(0)))[:6])
+    broken.close()
+
+    sock = _connect(server)
+    for _ in range(3):
+        server.send(sock, _metric(0))
+    for _ in range(3):
+        assert server.receive(sock)["type"] == "GSTOP"
+
+    # a wrong secret closes the connection
+    server.send(sock, _metric(0, secret="wrong"))
+    assert sock.recv(1) == b""
+    sock.close()
+
+
+def _get(partition_id, wait):
+    return {
+        "partition_id": partition_id,
+        "type": "GET",
+        "secret": "secret",
+        "data": {"wait": wait},
+    }
+
+
+def _register(server, partition_id):
+    server.reservations.add(
+        {
+            "partition_id": partition_id,
+            "host_port": ("127.0.0.1", 0),
+            "task_attempt": 0,
+            "trial_id": None,
+        }
+    )
+
+
+def test_long_poll_assignment(server):
+
+    _register(server, 0)
+    sock = _connect(server)
+    server.send(sock, _get(0, 30.0))
+    # the request is held while no trial is assigned
+    sock.settimeout(0.3)
+    with pytest.raises(socket.timeout):
+        sock.recv(1)
+    sock.settimeout(10)
+
+    server.reservations.assign_trial(0, "t1")
+    resp = server.receive(sock)
+    assert resp["type"] == "TRIAL"
+    assert resp["trial_id"] == "t1"
+    assert resp["data"] == {"x": 1}
+    sock.close()
+
+
+def test_long_poll_timeout(server):
+
+    _register(server, 0)
+    sock = _connect(server)
+    start = time.time()
+    server.send(sock, _get(0, 0.3))
+    resp = server.receive(sock)
+    # answered like a plain GET once the wait expired
+    assert 0.3 <= time.time() - start < 5
+    assert resp["type"] == "TRIAL"
+    assert resp["trial_id"] is None
+    sock.close()
+
+
+def test_long_poll_experiment_done(server):
+
+    _register(server, 0)
+    _register(server, 1)
+    socks = [_connect(server), _connect(server)]
+    for partition_id, sock in enumerate(socks):
+        server.send(sock, _get(partition_id, 30.0))
+    time.sleep(0.2)
+
+    # the driver sets experiment_done before it frees the last executor
+    server.driver.experiment_done = True
+    server.reservations.assign_trial(0, None)
+    for sock in socks:
+        assert server.receive(sock)["type"] == "GSTOP"
+        sock.close()
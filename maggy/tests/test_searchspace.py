@@ -18,6 +18,8 @@ import pytest
 import time
 import random
 
+import numpy as np
+
 from maggy import Searchspace
 
 
@@ -75,3 +77,101 @@ def test_searchspace_add():
         # Non numeric interval boundaries
         sp.add("param2", ("DOUBLE", ["lower", 5]))
     assert "type DOUBLE need to be integer or float:" in str(excinfo.value)
+
+
+def test_searchspace_transform_batch():
+
+    sp = Searchspace(
+        lr=("DOUBLE", [-3, 3]),
+        layers=("INTEGER", [2, 64]),
+        optimizer=("CATEGORICAL", ["adam", "sgd", "rmsprop"]),
+    )
+    hparams = np.array(
+        [sp.dict_to_list(params) for params in sp.get_random_parameter_values(50)]
+    )
+
+    for normalize_categorical in [False, True]:
+        transformed = sp.transform_batch(
+            hparams, normalize_categorical=normalize_categorical
+        )
+        expected = np.array(
+            [
+                sp.transform(row, normalize_categorical=normalize_categorical)
+                for row in hparams
+            ]
+        )
+        assert np.array_equal(transformed, expected)
+        assert sp.inverse_transform_batch(
+            transformed, normalize_categorical=normalize_categorical
+        ) == [
+            sp.inverse_transform(row, normalize_categorical=normalize_categorical)
+            for row in transformed
+        ]
+
+    # numeric categories are matched although numpy converted them to strings
+    sp.add("units", ("CATEGORICAL", [16, 32]))
+    transformed = sp.transform_batch(np.array([[0.0, 2, "sgd", 32]]))
+    assert transformed.tolist() == [[0.5, 0.0, 1.0, 1.0]]
+    assert sp.inverse_transform_batch(transformed) == [[0.0, 2, "sgd", 32]]
+
+    # categories of mixed types cannot be sorted
+    sp = Searchspace(
+        lr=("DOUBLE", [-3, 3]),
+        penalty=("CATEGORICAL", ["l2", None]),
+        mixed=("CATEGORICAL", [1, "a", None]),
+    )
+    hparams = np.empty((30, 3), dtype=object)
+    hparams[:] = [
+        sp.dict_to_list(params) for params in sp.get_random_parameter_values(30)
+    ]
+    for normalize_categorical in [False, True]:
+        transformed = sp.transform_batch(
+            hparams, normalize_categorical=normalize_categorical
+        )
+        expected = [
+            sp.transform(row, normalize_categorical=normalize_categorical)
+            for row in hparams
+        ]
+        assert transformed.tolist() == expected
+
+
+def test_searchspace_sampling():
+
+    sp = Searchspace(
+        lr=("DOUBLE", [0.0, 2.0]),
+        layers=("INTEGER", [1, 4]),
+        optimizer=("CATEGORICAL", ["adam", "sgd"]),
+    )
+
+    for method in Searchspace.SAMPLING_METHODS:
+        configs = sp.get_random_parameter_values(40, rng=3, method=method)
+        assert configs == sp.get_random_parameter_values(40, rng=3, method=method)
+        assert all(sp.contains_params(params) for params in configs)
+        assert {params["layers"] for params in configs} == {1, 2, 3, 4}
+        assert {params["optimizer"] for params in configs} == {"adam", "sgd"}
+
+        # the batch sampler draws the same configs in transformed representation
+        for normalize_categorical in [False, True]:
+            transformed = sp.sample_batch(
+                40,
+                rng=3,
+                method=method,
+                normalize_categorical=normalize_categorical,
+            )
+            assert np.allclose(
+                transformed,
+                sp.transform_batch(
+                    np.array([sp.dict_to_list(params) for params in configs]),
+                    normalize_categorical=normalize_categorical,
+                ),
+            )
+
+    # a latin hypercube has one config in each of the 40 strata of every hparam
+    configs = sp.get_random_parameter_values(40, method="lhs")
+    strata = np.floor(np.array([params["lr"] for params in configs]) * 20)
+    assert sorted(strata.tolist()) == list(range(40))
+    layers = [params["layers"] for params in configs]
+    assert [layers.count(value) for value in range(1, 5)] == [10, 10, 10, 10]
+
+    with pytest.raises(ValueError):
+        sp.get_random_parameter_values(1, method="sobol")
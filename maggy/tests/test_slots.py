@@ -0,0 +1,111 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import os
+
+import pytest
+
+from maggy import util
+from maggy.core import rpc
+from maggy.core.environment.singleton import EnvSing
+from maggy.core.executors.trial_executor import trial_executor_fn
+
+
+class StubClient(object):
+    """Client that gets one trial per slot, without a driver."""
+
+    def __init__(self, server_addr, partition_id, task_attempt, hb_interval, secret):
+        self.partition_id = partition_id
+        self.client_addr = ("127.0.0.1", 0)
+        self.done = False
+        self.num_suggestions = 0
+
+    def register(self, registration):
+        pass
+
+    def start_heartbeat(self, reporter):
+        pass
+
+    def get_suggestion(self, reporter):
+        self.num_suggestions += 1
+        if self.num_suggestions > 1:
+            self.done = True
+            return None, None
+        return "t{}".format(self.partition_id), {"slot_id": self.partition_id}
+
+    def finalize_metric(self, metric, reporter):
+        pass
+
+    def stop(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_slot_reservations():
+
+    trials_per_executor = 2
+    reservations = rpc.Reservations(2 * trials_per_executor)
+    for partition_id in range(2):
+        for slot in range(trials_per_executor):
+            reservations.add(
+                {
+                    "partition_id": rpc.slot_id(
+                        partition_id, slot, trials_per_executor
+                    ),
+                    "executor_id": partition_id,
+                    "host_port": ("127.0.0.1", 0),
+                    "task_attempt": 0,
+                    "trial_id": None,
+                }
+            )
+
+    assert reservations.done()
+    assert {slot: meta["executor_id"] for slot, meta in reservations.get().items()} == {
+        0: 0,
+        1: 0,
+        2: 1,
+        3: 1,
+    }
+    assert rpc.slot_id(3, 0, 1) == 3
+
+
+def test_slot_failures(monkeypatch, local_env, tmpdir):
+
+    monkeypatch.setattr(EnvSing, "get_instance", lambda: local_env)
+    monkeypatch.setattr(util, "get_partition_attempt_id", lambda: (1, 0))
+    monkeypatch.setattr(rpc, "Client", StubClient)
+    log_dir = str(tmpdir)
+
+    def train(slot_id):
+        if slot_id == 3:
+            raise ValueError("slot 3 failed")
+        return 0.5
+
+    wrapper = trial_executor_fn(
+        train, "optimization", 1, 1, None, 1, "secret", "metric", log_dir, 2
+    )
+    # slot 2 finishes its trial, slot 3 fails
+    with pytest.raises(RuntimeError, match="1 of 2 trial slots of executor 1"):
+        wrapper(None)
+
+    # every slot logs to its own file
+    with open(os.path.join(log_dir, "executor_2_0.log")) as fd:
+        assert "Finished Trial: t2" in fd.read()
+    with open(os.path.join(log_dir, "executor_3_0.log")) as fd:
+        assert "ValueError: slot 3 failed" in fd.read()
+    assert os.path.exists(os.path.join(log_dir, "t2", ".hparams.json"))
@@ -0,0 +1,141 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from maggy import Searchspace
+from maggy.core.suggestion_service import SuggestionService
+from maggy.optimizer import RandomSearch
+from maggy.trial import Trial
+
+
+class FailingSearch(RandomSearch):
+    def get_suggestion(self, trial=None):
+        raise ValueError("no suggestion")
+
+
+class RecordingSearch(RandomSearch):
+    def finalize_experiment(self, trials):
+        # runs in the worker process
+        with open(self.log_file + ".final", "w") as fd:
+            fd.write(" ".join(trial.trial_id for trial in trials))
+
+
+def _optimizer(tmpdir, optimizer, num_trials):
+    optimizer.searchspace = Searchspace(lr=("DOUBLE", [0.0, 1.0]))
+    optimizer.num_trials = num_trials
+    optimizer.trial_store = {}
+    optimizer.final_store = []
+    optimizer.direction = "max"
+    optimizer._initialize(exp_dir=str(tmpdir))
+    return optimizer
+
+
+def _wait_for(condition, timeout=30):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_suggestion_service(tmpdir):
+
+    optimizer = _optimizer(tmpdir, RandomSearch(), 5)
+
+    service = SuggestionService(optimizer, 2)
+    service.start()
+    trials = []
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        suggestions = service.get_suggestions(2)
+        for suggestion in suggestions:
+            if isinstance(suggestion, Trial):
+                trial = suggestion
+                trial.status = Trial.FINALIZED
+                trial.final_metric = trial.params["lr"]
+                service.trial_finalized(trial)
+                trials.append(trial)
+        if suggestions[-1] is None:
+            break
+        time.sleep(0.01)
+    service.stop()
+
+    assert len(trials) == 5
+    assert len({trial.trial_id for trial in trials}) == 5
+    # the controller runs in the worker process, not in the driver
+    assert optimizer.trial_store == {}
+    assert optimizer.fd.closed
+
+
+def test_suggestion_service_taken(tmpdir):
+
+    optimizer = _optimizer(tmpdir, RecordingSearch(), 20)
+    notified = threading.Semaphore(0)
+    service = SuggestionService(optimizer, 3)
+    service.start(notified.release)
+    _wait_for(lambda: len(service._ready) == 3)
+    # the driver is woken up once, when the first suggestion is ready
+    assert notified.acquire(timeout=1)
+    assert not notified.acquire(timeout=0.2)
+
+    # the worker only refills the suggestions that were taken
+    taken = service.get_suggestions(2)
+    assert all(isinstance(trial, Trial) for trial in taken)
+    _wait_for(lambda: len(service._ready) == 3)
+    time.sleep(0.2)
+    assert len(service._ready) == 3
+
+    for trial in taken:
+        trial.status = Trial.FINALIZED
+        trial.final_metric = trial.params["lr"]
+        service.trial_finalized(trial)
+    service.stop()
+
+    # the controller is finalized in the worker, with the reported trials
+    with open(optimizer.log_file + ".final") as fd:
+        assert fd.read().split() == [trial.trial_id for trial in taken]
+    assert optimizer.fd.closed
+
+
+def test_suggestion_service_error(tmpdir):
+
+    optimizer = _optimizer(tmpdir, FailingSearch(), 5)
+    notified = threading.Event()
+    service = SuggestionService(optimizer, 2)
+    service.start(notified.set)
+    assert notified.wait(30)
+    with pytest.raises(RuntimeError, match="no suggestion"):
+        service.get_suggestions(1)
+    service.stop()
+
+
+def test_suggestion_service_exit(tmpdir):
+
+    optimizer = _optimizer(tmpdir, RandomSearch(), 5)
+    service = SuggestionService(optimizer, 2)
+    service.start()
+    _wait_for(lambda: len(service._ready) == 2)
+    os.kill(service._process.pid, signal.SIGKILL)
+
+    _wait_for(lambda: service._error is not None)
+    with pytest.raises(RuntimeError, match="exited"):
+        service.get_suggestions(1)
+    service.stop()
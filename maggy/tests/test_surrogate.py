@@ -0,0 +1,63 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import numpy as np
+from sklearn.base import clone
+from skopt.learning.gaussian_process import GaussianProcessRegressor
+from skopt.learning.gaussian_process.kernels import ConstantKernel, Matern
+
+from maggy.optimizer.bayes.surrogate import IncrementalGP
+
+
+def test_incremental_gp():
+
+    rng = np.random.RandomState(0)
+    n_dims = 3
+    base_model = GaussianProcessRegressor(
+        kernel=ConstantKernel(1.0, (0.01, 1000.0))
+        * Matern(np.ones(n_dims), [(0.01, 100)] * n_dims, nu=2.5),
+        normalize_y=True,
+        noise="gaussian",
+        n_restarts_optimizer=0,
+        random_state=0,
+    )
+    surrogate = IncrementalGP(base_model, refit_interval=5)
+
+    X = rng.rand(10, n_dims)
+    assert surrogate.update(X, np.sin(X.sum(axis=1)), n_observations=10)
+
+    for _ in range(4):
+        # one new observation, liars for three busy locations
+        X = np.concatenate((X, rng.rand(1, n_dims)))
+        y = np.sin(X.sum(axis=1))
+        X_busy = np.concatenate((X, rng.rand(3, n_dims)))
+        y_busy = np.concatenate((y, np.full(3, y.min())))
+        assert not surrogate.update(X_busy, y_busy, n_observations=len(X))
+
+        # same posterior as a full fit with fixed hyperparameters
+        reference = clone(base_model).set_params(
+            kernel=surrogate._warm_start_kernel(), optimizer=None
+        )
+        reference.fit(X_busy, y_busy)
+        X_test = rng.rand(20, n_dims)
+        mean, std = surrogate.model.predict(X_test, return_std=True)
+        ref_mean, ref_std = reference.predict(X_test, return_std=True)
+        assert np.allclose(mean, ref_mean)
+        assert np.allclose(std, ref_std)
+
+    X = np.concatenate((X, rng.rand(1, n_dims)))
+    assert surrogate.update(X, np.sin(X.sum(axis=1)), n_observations=len(X))
+    assert surrogate.n_fit == 15
@@ -0,0 +1,80 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import numpy as np
+import statsmodels.api as sm
+
+from maggy import Searchspace
+from maggy.optimizer.bayes.tpe import TPE
+
+
+def _kdes(tpe, rng, n_observations):
+    var_type = tpe._get_statsmodel_vartype()
+    kdes = []
+    for _ in range(2):
+        data = np.column_stack(
+            [rng.rand(n_observations, 2), rng.randint(0, 3, size=n_observations)]
+        )
+        kdes.append(
+            sm.nonparametric.KDEMultivariate(
+                data=data, var_type=var_type, bw=tpe.bw_estimation
+            )
+        )
+    return kdes
+
+
+def test_tpe_kde_pdf():
+
+    tpe = TPE()
+    tpe.searchspace = Searchspace(
+        lr=("DOUBLE", [0.0001, 0.1]),
+        layers=("INTEGER", [1, 8]),
+        optimizer=("CATEGORICAL", ["adam", "sgd", "rmsprop"]),
+    )
+    rng = np.random.RandomState(0)
+    kde_good, kde_bad = _kdes(tpe, rng, 30)
+    x = np.column_stack([rng.rand(200, 2), rng.randint(0, 3, size=200)])
+
+    expected = np.array([kde_good.pdf(point) for point in x])
+    assert np.allclose(TPE._kde_pdf(kde_good, x), expected)
+    # chunks of a few points give the same densities
+    assert np.allclose(TPE._kde_pdf(kde_good, x, chunk_size=100), expected)
+
+    # expected improvement of the previous per-candidate loop
+    expected = [
+        max(1e-32, kde_good.pdf(point)) / max(kde_bad.pdf(point), 1e-32) for point in x
+    ]
+    assert np.allclose(TPE._calculate_ei(x, kde_good, kde_bad), expected)
+
+
+def test_tpe_sample_candidates_seeded():
+
+    samples = []
+    for _ in range(2):
+        tpe = TPE(seed=1)
+        tpe.searchspace = Searchspace(
+            lr=("DOUBLE", [0.0001, 0.1]),
+            layers=("INTEGER", [1, 8]),
+            optimizer=("CATEGORICAL", ["adam", "sgd", "rmsprop"]),
+        )
+        kde_good, _ = _kdes(tpe, np.random.RandomState(0), 30)
+        state = np.random.get_state()[1].copy()
+        samples.append(tpe._sample_candidates(kde_good, 50))
+        # the global numpy generator is left alone
+        assert np.array_equal(np.random.get_state()[1], state)
+
+    assert np.array_equal(samples[0], samples[1])
+    assert set(samples[0][:, 2]) <= {0, 1, 2}
@@ -18,7 +18,7 @@ import pytest
 import time
 import random
 
-from maggy import Trial
+from maggy.trial import Trial
 
 
 def test_trial_init():
@@ -46,3 +46,55 @@ def test_trial_serialization():
     assert new_trial.params == exp
     assert new_trial.status == Trial.PENDING
     assert new_trial.trial_id == "3d1cc9fdb1d4d001"
+
+
+def test_trial_metrics():
+
+    trial = Trial({"param1": 5, "param2": "ada"})
+
+    assert trial.append_metric({"step": 0, "value": 0.5}) == 0
+    assert trial.append_metric({"step": 0, "value": 0.7}) is None
+    assert trial.append_metric({"step": 1, "value": None}) is None
+    assert (
+        trial.append_metric({"steps": [1.0, 2.0, 1.0], "values": [0.4, 0.3, 0.1]}) == 2
+    )
+    # a step out of order is recorded once
+    assert trial.append_metric({"step": -1, "value": 0.9}) == -1
+    assert trial.append_metric({"steps": [-1.0, 3.0], "values": [0.8, 0.2]}) == 3
+
+    assert trial.step_history == [0, 1, 2, -1, 3]
+    assert trial.metric_history == [0.5, 0.4, 0.3, 0.9, 0.2]
+    assert trial.metric_dict == {0: 0.5, 1: 0.4, 2: 0.3, -1: 0.9, 3: 0.2}
+    assert trial.get_history(3) == ([-1, 3], [0.9, 0.2])
+
+    new_trial = Trial.from_json(trial.to_json())
+    assert new_trial.step_history == trial.step_history
+    assert new_trial.metric_history == trial.metric_history
+
+    trial.clear_metrics()
+    assert trial.metric_history == []
+    assert trial.append_metric({"step": 0, "value": 0.1}) == 0
+
+
+def test_trial_step_types():
+
+    trial = Trial({"param1": 5, "param2": "ada"})
+
+    # integral steps of a batch are reported as ints
+    trial.append_metric({"steps": [0.0, 1.0], "values": [0.5, 0.4]})
+    assert trial.step_history == [0, 1]
+    assert isinstance(trial.to_dict()["step_history"][0], int)
+
+    # float steps keep their type, also after a round trip through json
+    trial.append_metric({"step": 2.0, "value": 0.3})
+    assert trial.step_history == [0.0, 1.0, 2.0]
+    assert all(isinstance(step, float) for step in trial.step_history)
+    new_trial = Trial.from_json(trial.to_json())
+    assert all(isinstance(step, float) for step in new_trial.step_history)
+
+    trial.clear_metrics()
+    trial.append_metric({"steps": [0.0, 0.5], "values": [0.5, 0.4]})
+    assert trial.step_history == [0.0, 0.5]
+
+    with pytest.raises(ValueError):
+        trial.append_metric({"steps": [1.0, 2.0], "values": [0.3]})
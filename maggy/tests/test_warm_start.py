@@ -0,0 +1,93 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import random
+
+from maggy import Searchspace
+from maggy.optimizer import RandomSearch, bayes
+from maggy.trial import Trial
+
+
+def _prior_trial(params, metric):
+    trial = Trial(params)
+    trial.status = Trial.FINALIZED
+    trial.final_metric = metric
+    return trial
+
+
+def test_searchspace_contains_params():
+
+    sp = Searchspace(
+        x=("DOUBLE", [0.0, 1.0]), n=("INTEGER", [1, 4]), c=("CATEGORICAL", ["a", "b"])
+    )
+    assert sp.contains_params({"x": 1, "n": 2.0, "c": "a"})
+    assert not sp.contains_params({"x": 0.5, "n": 2})
+    assert not sp.contains_params({"x": 1.5, "n": 2, "c": "a"})
+    assert not sp.contains_params({"x": 0.5, "n": 2.5, "c": "a"})
+    assert not sp.contains_params({"x": 0.5, "n": 2, "c": "z"})
+
+
+def test_warm_start_tpe():
+
+    random.seed(1)
+    tpe = bayes.TPE(num_warmup_trials=15, random_fraction=0.0)
+    tpe.searchspace = Searchspace(x=("DOUBLE", [0.0, 1.0]), y=("DOUBLE", [0.0, 1.0]))
+    tpe.num_trials = 5
+    tpe.trial_store = {}
+    tpe.final_store = []
+    tpe.direction = "min"
+
+    priors = [
+        _prior_trial({"y": params["y"], "x": params["x"]}, params["x"] + params["y"])
+        for params in tpe.searchspace.get_random_parameter_values(20)
+    ]
+    incompatible = [
+        _prior_trial({"x": 2.0, "y": 0.5}, 0.0),
+        _prior_trial({"x": 0.5, "y": 0.5, "z": 1}, 0.0),
+        _prior_trial({"x": 0.5, "y": 0.5, "budget": 1}, 0.0),
+        Trial({"x": 0.5, "y": 0.25}),
+    ]
+    assert tpe.warm_start(priors + incompatible + priors[:1]) == 5
+    assert len(tpe.prior_trials) == 20
+    # hparams are stored in the order of the searchspace
+    assert list(tpe.prior_trials[0].params) == ["x", "y"]
+
+    tpe.initialize()
+    assert tpe.warmup_configs == []
+    assert len(tpe.get_observations()) == 20
+
+    trial = tpe.get_suggestion()
+    assert trial.info_dict["sample_type"] == "model"
+    assert tpe.find_duplicate(priors[0]) == priors[0].trial_id
+
+
+def test_warm_start_random_search():
+
+    rs = RandomSearch()
+    rs.searchspace = Searchspace(n=("INTEGER", [1, 2]), c=("CATEGORICAL", ["a"]))
+    rs.num_trials = 1
+    rs.trial_store = {}
+    rs.final_store = []
+    rs.direction = "max"
+    rs.warm_start([_prior_trial({"n": 1, "c": "a"}, 0.5)])
+    rs.initialize()
+
+    random.seed(0)
+    rs.config_buffer = [{"n": 1, "c": "a"}]
+    trial = rs.get_suggestion()
+    # the config of the prior trial is not evaluated again
+    assert trial.params == {"n": 2, "c": "a"}
+    assert trial.info_dict["sample_type"] == "random_forced"
@@ -0,0 +1,100 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+from array import array
+
+import pytest
+
+from maggy.core import wire
+
+
+def test_wire_roundtrip():
+
+    msgs = [
+        {
+            "partition_id": 3,
+            "type": "METRIC",
+            "secret": "abc",
+            "trial_id": "f00",
+            "logs": "line\n",
+            "data": {
+                "value": 0.25,
+                "step": 7,
+                "steps": array("d", [6.0, 7.0]),
+                "values": array("d", [0.5, 0.25]),
+                "logs": None,
+            },
+        },
+        {"partition_id": 3, "type": "GET", "secret": "abc", "data": None},
+        {"partition_id": 3, "type": "GET", "secret": "abc", "data": {"wait": 1.0}},
+        {
+            "partition_id": 3,
+            "type": "FINAL",
+            "secret": "abc",
+            "trial_id": None,
+            "logs": None,
+            "data": 0.5,
+        },
+        {"type": "TRIAL", "trial_id": "f00", "data": {"lr": 1e-3, "opt": "adam"}},
+        {"type": "QUERY", "data": True},
+        {"type": "REG", "data": {"host_port": ("127.0.0.1", 80), "trial_id": None}},
+        {"type": "OK", "custom": [1, b"x", 2**70]},
+        {"type": "BLACK", "trial_id": "f00", "partition_id": 1},
+    ]
+    for msg in msgs:
+        assert wire.decode(wire.encode(msg)) == msg
+    # heartbeats with a single metric use the fixed layout
+    assert wire.encode(msgs[3])[wire.HEADER.size - 1] == wire.Layout.HEARTBEAT
+
+
+def test_wire_version_mismatch():
+
+    data = bytearray(wire.encode({"type": "OK"}))
+    data[2] = wire.VERSION + 1
+    with pytest.raises(ValueError) as excinfo:
+        wire.decode(data)
+    assert "Unsupported message protocol" in str(excinfo.value)
+
+
+def test_wire_arrays():
+
+    steps = array("d", range(100, 612, 2))
+    values = array("d", [0.5 + i / 1000 for i in range(len(steps))])
+    msg = {
+        "type": "METRIC",
+        "partition_id": 1,
+        "trial_id": "f00",
+        "data": {"steps": steps, "values": values},
+    }
+    encoded = wire.encode(msg)
+    assert wire.decode(encoded) == msg
+    # the steps take one byte each, the values eight
+    assert len(encoded) < 9 * len(steps) + 100
+
+    for value in [
+        array("q", [5, 2**62, -(2**62)]),
+        array("i", [3, 3, 3, 70000]),
+        array("d", [1.0, 2.5, 3.0]),
+        array("d", [-0.0, 1.0]),
+        array("d", [1.0, 1e300]),
+        array("d", [float("inf"), 1.0]),
+        array("Q", [2**64 - 1, 0]),
+        array("d", [7.0]),
+        array("b"),
+    ]:
+        decoded = wire.decode(wire.encode({"type": "OK", "data": value}))["data"]
+        assert decoded.typecode == value.typecode
+        assert decoded.tobytes() == value.tobytes()
@@ -0,0 +1,64 @@
+#
+#   Copyright 2021 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import os
+import threading
+
+import pytest
+
+from maggy.core.environment.base import BaseEnv
+from maggy.core.environment.writer import AsyncWriter
+
+
+class SlowEnv(BaseEnv):
+    """writes files only once `release` is set"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.written = []
+
+    def dump(self, data, hdfs_path):
+        self.release.wait()
+        if data is None:
+            raise IOError("cannot write " + hdfs_path)
+        super().dump(data, hdfs_path)
+        self.written.append(hdfs_path)
+
+
+def test_async_writer(tmpdir):
+
+    env = SlowEnv()
+    errors = []
+    writer = AsyncWriter(env, error_callback=lambda path, exc: errors.append(path))
+    paths = [os.path.join(str(tmpdir), name) for name in ["a", "b", "c"]]
+
+    writer.dump("first", paths[0])
+    writer.dump("1", paths[1])
+    writer.dump("2", paths[1])
+    writer.dump(None, paths[2])
+    assert env.written == []
+
+    env.release.set()
+    failures = writer.flush()
+    assert [path for path, _ in failures] == [paths[2]]
+    assert errors == [paths[2]]
+    with open(paths[1]) as f:
+        assert f.read() == "2"
+    assert paths[0] in env.written and paths[1] in env.written
+
+    assert writer.close() == []
+    with pytest.raises(RuntimeError):
+        writer.dump("late", paths[0])
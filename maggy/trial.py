@@ -17,6 +17,8 @@
 import json
 import threading
 import hashlib
+import operator
+from array import array
 
 from maggy import util
 
@@ -28,8 +30,29 @@ class Trial(object):
     It is used as shared memory between
     the worker thread and rpc server thread. The server thread performs only
     lookups on the `early_stop` and `params` attributes.
+
+    The metric curve is stored in two typed arrays of steps and values, and
+    the attributes are slotted, to keep the driver memory low with many
+    trials of many steps.
     """
 
+    __slots__ = (
+        "trial_type",
+        "trial_id",
+        "params",
+        "status",
+        "early_stop",
+        "final_metric",
+        "_steps",
+        "_values",
+        "_step_set",
+        "_int_steps",
+        "start",
+        "duration",
+        "lock",
+        "info_dict",
+    )
+
     PENDING = "PENDING"
     SCHEDULED = "SCHEDULED"
     RUNNING = "RUNNING"
@@ -69,9 +92,13 @@ class Trial(object):
         self.status = Trial.PENDING
         self.early_stop = False
         self.final_metric = None
-        self.metric_history = []
-        self.step_history = []
-        self.metric_dict = {}
+        self._steps = array("d")
+        self._values = array("d")
+        # steps as a set, only built if a step arrives out of order
+        self._step_set = None
+        # steps are stored as doubles, but reported as ints unless a
+        # fractional or float step was recorded
+        self._int_steps = True
         self.start = None
         self.duration = None
         self.lock = threading.RLock()
@@ -90,23 +117,130 @@ class Trial(object):
         with self.lock:
             self.early_stop = True
 
+    @property
+    def metric_history(self):
+        """List of the metric values, in the order of their steps."""
+        return self._values.tolist()
+
+    @metric_history.setter
+    def metric_history(self, values):
+        self._values = array("d", values)
+
+    @property
+    def step_history(self):
+        """List of the steps with a metric value."""
+        return self._step_list(self._steps)
+
+    @step_history.setter
+    def step_history(self, steps):
+        self._steps = array("d", steps)
+        self._step_set = None
+        self._int_steps = all(isinstance(step, int) for step in steps)
+
+    @property
+    def metric_dict(self):
+        """Dictionary of the metric values by step."""
+        return dict(zip(self.step_history, self._values))
+
+    @property
+    def metric_array(self):
+        """The metric values as `array('d')`, without copying them. Must not
+        be modified."""
+        return self._values
+
+    def get_history(self, start=0):
+        """Return the steps and metric values from position `start` on.
+
+        :returns: Tuple of the steps and values lists.
+        """
+        with self.lock:
+            return self._step_list(self._steps[start:]), self._values[start:].tolist()
+
+    def _step_list(self, steps):
+        """Returns `steps` as list of ints, or of floats if any recorded step
+        was a float."""
+        if self._int_steps:
+            return [int(step) for step in steps]
+        return steps.tolist()
+
+    def clear_metrics(self):
+        """Remove all metric values, e.g. to run the trial again."""
+        with self.lock:
+            self._steps = array("d")
+            self._values = array("d")
+            self._step_set = None
+            self._int_steps = True
+
     def append_metric(self, metric_data):
-        """Append a metric from the heartbeats to the history."""
+        """Append a metric from the heartbeats to the history.
+
+        `metric_data` either contains a single "step" and "value" or a batch of
+        metrics as "steps" and "values" sequences. Steps already recorded are
+        ignored.
+
+        :returns: The last new step or None if there is no new step.
+        """
         with self.lock:
-            # from python 3.7 dicts are insertion ordered,
-            # so two of these data structures can be removed
-            if (
-                metric_data["step"] not in self.metric_dict
-                and metric_data["value"] is not None
+            if "steps" in metric_data:
+                return self._append_batch(metric_data["steps"], metric_data["values"])
+            if metric_data["value"] is not None and self._append(
+                metric_data["step"], metric_data["value"]
             ):
-                self.metric_dict[metric_data["step"]] = metric_data["value"]
-                self.metric_history.append(metric_data["value"])
-                self.step_history.append(metric_data["step"])
                 # return step number to indicate that it was a new unique step
                 return metric_data["step"]
             # return None to indicate that no new step has finished
             return None
 
+    def _append_batch(self, steps, values):
+        if len(steps) != len(values):
+            raise ValueError(
+                "Got {} steps but {} metric values.".format(len(steps), len(values))
+            )
+        new_steps = array("d", steps)
+        if (
+            new_steps
+            and (not self._steps or new_steps[0] > self._steps[-1])
+            and all(map(operator.lt, new_steps, new_steps[1:]))
+        ):
+            # increasing steps after the last one, nothing to look up
+            if self._step_set is not None:
+                self._step_set.update(new_steps)
+            if self._int_steps and not all(map(float.is_integer, new_steps)):
+                self._int_steps = False
+            self._steps.extend(new_steps)
+            self._values.extend(values)
+            last_step = new_steps[-1]
+            return int(last_step) if last_step.is_integer() else last_step
+        last_step = None
+        for step, value in zip(steps, values):
+            # steps are transported as doubles
+            if isinstance(step, float) and step.is_integer():
+                step = int(step)
+            if self._append(step, value):
+                last_step = step
+        return last_step
+
+    def _append(self, step, value):
+        """Appends `step` and `value` unless the step was recorded before.
+
+        Steps are reported in increasing order, so only a step that is not
+        greater than the last one has to be looked up.
+
+        :returns: True if the step is new.
+        """
+        if self._steps and step <= self._steps[-1]:
+            if self._step_set is None:
+                self._step_set = set(self._steps)
+            if step in self._step_set:
+                return False
+        if self._step_set is not None:
+            self._step_set.add(step)
+        if self._int_steps and not isinstance(step, int):
+            self._int_steps = False
+        self._steps.append(step)
+        self._values.append(value)
+        return True
+
     @classmethod
     def _generate_id(cls, params):
         """
@@ -139,15 +273,22 @@ class Trial(object):
         return json.dumps(self.to_dict(), default=util.json_default_numpy)
 
     def to_dict(self):
-        obj_dict = {"__class__": self.__class__.__name__}
-
-        temp_dict = self.__dict__.copy()
-        temp_dict.pop("lock")
-        temp_dict.pop("start")
-
-        obj_dict.update(temp_dict)
-
-        return obj_dict
+        with self.lock:
+            step_history, metric_history = self.get_history()
+            return {
+                "__class__": self.__class__.__name__,
+                "trial_type": self.trial_type,
+                "trial_id": self.trial_id,
+                "params": self.params,
+                "status": self.status,
+                "early_stop": self.early_stop,
+                "final_metric": self.final_metric,
+                "metric_history": metric_history,
+                "step_history": step_history,
+                "metric_dict": dict(zip(step_history, metric_history)),
+                "duration": self.duration,
+                "info_dict": self.info_dict,
+            }
 
     @classmethod
     def from_json(cls, json_str):
@@ -171,6 +312,10 @@ class Trial(object):
             instance.early_stop = temp_dict.get("early_stop", False)
             instance.final_metric = temp_dict["final_metric"]
             instance.metric_history = temp_dict["metric_history"]
+            # trials serialized without steps count them from zero
+            instance.step_history = temp_dict.get("step_history") or range(
+                len(instance.metric_history)
+            )
             instance.duration = temp_dict["duration"]
 
         return instance